@@ -1,5 +1,7 @@
 import logging
 
+from enum import Enum
+
 logger = logging.getLogger(__name__) 
 
 def registerIngredientLogger(Logger):
@@ -10,26 +12,67 @@ def registerIngredientLogger(Logger):
 #
 #   Ingredient object represents the nutrition stats of the ingredient
 #   
-#       kcal - kcal count of the ingredient per metric
+#       kcal - kcal count of the ingredient per 100 gram, 100 ml or piece, see METRIC
 #
-#       carb - carb count of the ingredient per metric
+#       carb - carb count of the ingredient per 100 gram, 100 ml or piece
 #
-#       protein - protein count of the ingredient per metric
+#       protein - protein count of the ingredient per 100 gram, 100 ml or piece
 #   
-#       fat - count of the ingredient per metric
+#       fat - count of the ingredient per 100 gram, 100 ml or piece
 #  
-#       metric - measuring unit of the ingrdient, either "unit" or "gram"
+#       metric - measuring unit of the amounts of the ingredient, see METRIC
+#
+#       gramFactor - gram per measuring unit, used to convert weights
+#
+#       macroFactor - share of the macros per measuring unit, 1/100 for gram and ml, 1 for
+#                     pieces. Both factors are resolved once at catalog load, the macros are
+#                     computed as amount * macroFactor without any case distinction
+#
+#       price - price of one package of the ingredient, None if unknown
+#
+#       packageSize - amount of the ingredient in one package, in the unit used by the meals
 #
 # -------------------------------------------------------------------------------------------------
 
+# Measuring units of ingredient amounts. The macros of gram and ml ingredients are given per
+# 100 gram or 100 ml, the macros of piece ingredients per piece
+class METRIC(Enum):
+    GRAM = "gram"
+    ML = "ml"
+    PIECE = "piece"
+
+
+# Share of the macros per measuring unit
+MACROFACTOR = {
+    METRIC.GRAM: 1 / 100,
+    METRIC.ML: 1 / 100,
+    METRIC.PIECE: 1,
+}
+
+
+# Resolution of the measuring units
+#   EXPLICIT - use the metric of the ingredient yaml, gram if not given
+#   LEGACY - amounts above 10 are gram, amounts up to 10 are pieces of 100 gram, the
+#            macros are given per piece
+class UNITMODE(Enum):
+    EXPLICIT = 0
+    LEGACY = 1
+
+
 class ingredient:
-    def __init__(self, name, kcal, carb, protein, fat, amount = 0):
+    def __init__(self, name, kcal, carb, protein, fat, amount = 0, price = None, packageSize = 1, \
+                 metric = METRIC.GRAM, gramFactor = 1):
         self.name = name
         self.kcal = kcal
         self.carb = carb
         self.protein = protein
         self.fat = fat
         self.amount = amount
+        self.price = price
+        self.packageSize = packageSize
+        self.metric = metric
+        self.gramFactor = gramFactor
+        self.macroFactor = MACROFACTOR[metric]
 
     def __repr__(self):
         """
@@ -0,0 +1,132 @@
+import logging
+
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+def registerIngredientIndexLogger(Logger):
+    global logger
+    logger = Logger
+
+# class ingredientIndex ---------------------------------------------------------------------------
+#
+#   Inverted index from ingredients to the meals using them. It is built once from the meal
+#   dictionary at catalog load, before options are resolved, so every meal variant is indexed.
+#
+#       mealNames - list of indexed meal names, the position is the meal id
+#
+#       postings - posting list of every ingredient, sorted by meal id
+#               {
+#                   ingredient1: [(mealId, variant, amount), ...],
+#                   ...
+#               }
+#               variant is None for base ingredients, "option <group>.<choice>" for ingredients
+#               of an option and "optional" for optional ingredients
+#
+#       mealIds - sorted and unique meal ids of every ingredient, used for intersections
+#
+#       baseIngredientCount - number of base ingredients of every meal
+#
+# -------------------------------------------------------------------------------------------------
+
+class ingredientIndex:
+    def __init__(self, mealDict):
+        self.mealNames = []
+        self.postings = {}
+        self.mealIds = {}
+        self.baseIngredientCount = []
+
+        specialKeys = ("options", "optional", "watchList", "postWorkout", "preWorkout")
+        for mealId, (mealName, mealData) in enumerate(mealDict.items()):
+            self.mealNames.append(mealName)
+            baseIngredients = [key for key in mealData if key not in specialKeys]
+            self.baseIngredientCount.append(len(baseIngredients))
+            for ingredientName in baseIngredients:
+                self.addPosting(ingredientName, mealId, None, mealData[ingredientName])
+            for groupNumber, optionGroup in enumerate(mealData.get("options") or [], 1):
+                for choiceNumber, option in enumerate(optionGroup, 1):
+                    variant = "option {}.{}".format(groupNumber, choiceNumber)
+                    for ingredientName, amount in option.items():
+                        self.addPosting(ingredientName, mealId, variant, amount)
+            for optionalIngredient in mealData.get("optional") or []:
+                for ingredientName, amount in optionalIngredient.items():
+                    self.addPosting(ingredientName, mealId, "optional", amount)
+
+    def __repr__(self):
+        """
+        Overload __repr__ method to enable fancy printing and logger support on print operations.
+        """
+        return "<class: {}, meals: {}, ingredients: {}>".format(self.__class__.__name__, \
+                    len(self.mealNames), len(self.postings))
+
+    def addPosting(self, ingredientName, mealId, variant, amount):
+        # meals are added in ascending id order, therefore the lists stay sorted
+        self.postings.setdefault(ingredientName, []).append((mealId, variant, amount))
+        mealIds = self.mealIds.setdefault(ingredientName, [])
+        if not mealIds or mealIds[-1] != mealId:
+            mealIds.append(mealId)
+
+    def getPostings(self, ingredientName):
+        """
+        Returns all usages of the given ingredient as list of (meal name, variant, amount).
+        """
+        return [(self.mealNames[mealId], variant, amount) \
+                for mealId, variant, amount in self.postings.get(ingredientName, [])]
+
+    def getMealsWithAll(self, ingredientNames):
+        """
+        Returns the names of all meals that use every given ingredient in any variant. The
+        posting lists are intersected starting with the shortest one, every further list is
+        only probed by binary search. The costs depend on the posting list lengths, not on the
+        catalog size.
+        """
+        postingLists = [self.mealIds.get(ingredientName, []) for ingredientName in ingredientNames]
+        if not postingLists:
+            return []
+        postingLists.sort(key = len)
+
+        candidates = postingLists[0]
+        for postingList in postingLists[1:]:
+            candidates = intersectSortedLists(candidates, postingList)
+            if not candidates:
+                break
+        return [self.mealNames[mealId] for mealId in candidates]
+
+    def rankByPantry(self, pantry):
+        """
+        Ranks the meals by how much of their base ingredients is covered by the given pantry.
+        Only meals appearing in the posting lists of the pantry items are visited.
+
+        Input: dict
+            ingredient1: amount in stock,
+            ...
+
+        output: list of (meal name, coverage) sorted by descending coverage. The coverage is the
+                mean fraction of the base ingredient amounts that is in stock.
+        """
+        coveredAmounts = {}
+        for ingredientName, stock in pantry.items():
+            for mealId, variant, amount in self.postings.get(ingredientName, []):
+                if variant is None and amount:
+                    coveredAmounts[mealId] = coveredAmounts.get(mealId, 0) + min(stock / amount, 1)
+
+        ranking = [(self.mealNames[mealId], covered / self.baseIngredientCount[mealId]) \
+                   for mealId, covered in coveredAmounts.items()]
+        ranking.sort(key = lambda entry: entry[1], reverse = True)
+        return ranking
+
+
+def intersectSortedLists(shortList, longList):
+    """
+    Intersects two sorted lists by searching every element of the short list in the long list.
+    The search window only moves forward.
+    """
+    intersection = []
+    position = 0
+    for element in shortList:
+        position = bisect_left(longList, element, position)
+        if position == len(longList):
+            break
+        if longList[position] == element:
+            intersection.append(element)
+    return intersection
@@ -32,6 +32,8 @@ def registerMealLogger(Logger):
 #
 #       fat - overall fat count of the meal
 #
+#       cost - estimated cost of the meal, prorated by the package prices of its ingredients
+#
 #       postWorkout - indicator for meals that are only suitable for post workout
 #
 #       preWorkout - indicator for meals that are only suitable for pre workout
@@ -49,6 +51,7 @@ class meal:
         self.carb = 0
         self.protein = 0
         self.fat = 0
+        self.cost = 0
 
     def __repr__(self):
         """
@@ -67,20 +70,17 @@ class meal:
         return mealDescriptionString
 
     def resolveMacros(self):
+        """
+        Sums up the macros of all ingredients. The macro factor of every ingredient is 
+        resolved at catalog load.
+        """
         for ingredient in self.ingredientList:
-            # if more than 10 units of the ingredient are requested, its assumed to
-            # be "gram". Else, itt assumed to be number of elements. 
-            if ingredient.amount > 10:
-                self.kcal += ingredient.kcal * ingredient.amount / 100
-                self.carb += ingredient.carb * ingredient.amount / 100
-                self.protein += ingredient.protein * ingredient.amount / 100
-                self.fat += ingredient.fat * ingredient.fat / 100
+            share = ingredient.amount * ingredient.macroFactor
+            self.kcal += ingredient.kcal * share
+            self.carb += ingredient.carb * share
+            self.protein += ingredient.protein * share
+            self.fat += ingredient.fat * share
 
-            else:
-                self.kcal += ingredient.kcal * ingredient.amount 
-                self.carb += ingredient.carb * ingredient.amount 
-                self.protein += ingredient.protein * ingredient.amount
-                self.fat += ingredient.fat * ingredient.fat
+            if ingredient.price is not None:
+                self.cost += ingredient.price * ingredient.amount / ingredient.packageSize
         return
-    
-    
\ No newline at end of file
@@ -0,0 +1,79 @@
+import atexit
+import logging
+import queue
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+def registerBackgroundWriterLogger(Logger):
+    global logger
+    logger = Logger
+
+
+# class backgroundWriter --------------------------------------------------------------------------
+#
+#   Runs write jobs, e.g. writing the result files, in a background thread so the planning does
+#   not wait for the disk. The job queue is bounded: submitting blocks while the queue is full,
+#   which slows down producers that are faster than the disk instead of piling up results in
+#   memory. All queued jobs are finished before the interpreter exits.
+#
+#       jobQueue - bounded queue of (function, arguments) jobs
+#
+#       failedJobs - number of jobs that raised an exception
+#
+# -------------------------------------------------------------------------------------------------
+
+class backgroundWriter:
+    def __init__(self, maxJobs = 8):
+        self.jobQueue = queue.Queue(maxsize = maxJobs)
+        self.failedJobs = 0
+        self.closed = False
+        self.thread = threading.Thread(target = self.run, name = "backgroundWriter", daemon = True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def __repr__(self):
+        """
+        Overload __repr__ method to enable fancy printing and logger support on print operations.
+        """
+        return "<class: {}, queued jobs: {}, failed jobs: {}>".format(self.__class__.__name__, \
+                    self.jobQueue.qsize(), self.failedJobs)
+
+    def run(self):
+        while True:
+            job = self.jobQueue.get()
+            try:
+                if job is None:
+                    return
+                function, arguments = job
+                function(*arguments)
+            except Exception as exc:
+                self.failedJobs += 1
+                logger.error("Background write job {} failed: {}".format(function.__name__, exc))
+            finally:
+                self.jobQueue.task_done()
+
+    def submit(self, function, *arguments):
+        """
+        Queues the call function(*arguments). Blocks while the queue is full.
+        """
+        if self.closed:
+            raise RuntimeError("backgroundWriter is closed")
+        self.jobQueue.put((function, arguments))
+
+    def flush(self):
+        """
+        Blocks until every queued job is done.
+        """
+        self.jobQueue.join()
+
+    def close(self):
+        """
+        Finishes all queued jobs and stops the thread. Further calls have no effect.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.jobQueue.put(None)
+        self.thread.join()
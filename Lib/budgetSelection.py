@@ -0,0 +1,143 @@
+import copy
+import logging
+import random
+
+from bisect import bisect_right
+
+from Lib.costEstimation import groceryCost
+from Lib.costEstimation import hasUnknownPrices
+
+
+logger = logging.getLogger(__name__)
+
+def registerBudgetSelectionLogger(Logger):
+    global logger
+    logger = Logger
+
+
+# Most candidates per step whose exact package rounded additional costs are computed
+CANDIDATELIMIT = 64
+
+
+def chooseMealsWithinBudget(mealList, targetKcal, budget, fixedMealList = (), preferredMealList = (), \
+                            weights = None, pantry = None, groceryScale = 1, tolerance = 200):
+    """
+    Chooses meals until the target kcal count is reached while the grocery costs stay within
+    the given budget. The costs are the package rounded costs of the whole grocery list, like
+    in the result file: the given fixed meals, e.g. workout meals, are included, the amounts are
+    scaled by groceryScale and the stock is subtracted before rounding.
+
+    The candidates are sorted once by their prorated cost per kcal. In every step the remaining
+    budget divided by the remaining kcal gives the cost per kcal the plan can still afford. A
+    binary search cuts the sorted candidates down to the ones that keep this pace, at most
+    CANDIDATELIMIT of them are drawn at random, and only for these the exact package rounded
+    additional costs are computed. If fewer candidates keep the pace, the CANDIDATELIMIT most
+    efficient ones are checked instead. Affordable preferred meals are taken first in the given
+    order. Else one of the checked meals whose additional costs keep the plan on pace is chosen
+    randomly, weighted by the given weights. Meals with ingredients of unknown price are only
+    considered if no fully priced meal keeps the pace, as their costs are incomplete. If no
+    meal keeps the pace, the affordable meal with the lowest additional costs per kcal is
+    taken. Meals are only repeated after every meal was chosen once.
+
+    Input:
+        mealList: list of resolved objects of class meal
+        targetKcal: kcal count to reach
+        budget: maximum overall cost of the grocery list
+        fixedMealList: meals that are part of the plan in any case
+        preferredMealList: meals to choose first if affordable
+        weights: list of selection weights of the meals in mealList, e.g. of the plan history
+        pantry: stock per ingredient in its metric
+        groceryScale: factor of all grocery amounts, e.g. the portions of a household
+        tolerance: tolerated kcal deviation
+
+    output: list of chosen objects of class meal
+    """
+    costs = groceryCost(groceryScale, pantry)
+    for meal in fixedMealList:
+        costs.addMeal(meal)
+    if costs.totalCost > budget:
+        logger.warning("The workout meals alone cost {:.2f} of the budget of {:.2f}".format(costs.totalCost, budget))
+
+    candidates = sorted((meal for meal in mealList if meal.kcal > 0), key = lambda meal: meal.cost / meal.kcal)
+    mealWeights = {id(meal): weight for meal, weight in zip(mealList, weights)} if weights else {}
+    preferredMealList = list(preferredMealList)
+    choosenMealList = []
+    currentKcal = 0
+    mealsDuplicated = False
+    unpricedMealCount = 0
+    availableMeals = list(candidates)
+    availableRatios = [meal.cost / meal.kcal for meal in availableMeals]
+    availableIds = {id(meal) for meal in availableMeals}
+
+    while currentKcal < targetKcal - tolerance and availableMeals:
+        remainingBudget = budget - costs.totalCost
+        affordableRatio = remainingBudget / (targetKcal - currentKcal)
+
+        # prune every candidate whose prorated costs would push the plan above its budget pace
+        onPaceCount = bisect_right(availableRatios, affordableRatio)
+        if onPaceCount > CANDIDATELIMIT:
+            checkedMeals = [availableMeals[index] for index in random.sample(range(onPaceCount), CANDIDATELIMIT)]
+        else:
+            checkedMeals = availableMeals[:CANDIDATELIMIT]
+        checkedIds = {id(meal) for meal in checkedMeals}
+        checkedMeals += [meal for meal in preferredMealList if id(meal) in availableIds and id(meal) not in checkedIds]
+
+        additionalCosts = {id(meal): costs.getAdditionalCost(meal) for meal in checkedMeals}
+        affordableMeals = [meal for meal in checkedMeals if additionalCosts[id(meal)] <= remainingBudget + 1e-9]
+        if not affordableMeals:
+            logger.warning("Budget of {:.2f} is exhausted after {} of {} kcal" \
+                           .format(budget, round(currentKcal), round(targetKcal)))
+            break
+
+        choosenMeal = getAffordablePreferredMeal(preferredMealList, affordableMeals)
+        if choosenMeal is None:
+            choosenMeal = chooseMealOnPace(affordableMeals, additionalCosts, affordableRatio, mealWeights)
+
+        choosenMealList.append(copy.deepcopy(choosenMeal))
+        currentKcal += choosenMeal.kcal
+        costs.addMeal(choosenMeal)
+        unpricedMealCount += hasUnknownPrices(choosenMeal)
+        choosenIndex = availableMeals.index(choosenMeal)
+        del availableMeals[choosenIndex]
+        del availableRatios[choosenIndex]
+        availableIds.discard(id(choosenMeal))
+        if not availableMeals:
+            availableMeals = list(candidates)
+            availableRatios = [meal.cost / meal.kcal for meal in availableMeals]
+            availableIds = {id(meal) for meal in availableMeals}
+            mealsDuplicated = True
+
+    if mealsDuplicated:
+        logger.warning("Not enough meals within budget to meet the given amounts of days and kcal without repetition")
+    if unpricedMealCount:
+        logger.warning("{} of the chosen meals use ingredients without price, their costs are incomplete" \
+                       .format(unpricedMealCount))
+
+    logger.info("Estimated grocery costs: {:.2f} of {:.2f}".format(costs.totalCost, budget))
+    return choosenMealList
+
+
+def getAffordablePreferredMeal(preferredMealList, affordableMeals):
+    """
+    Removes and returns the first preferred meal that is affordable, None if there is none.
+    """
+    for preferredMeal in preferredMealList:
+        if preferredMeal in affordableMeals:
+            preferredMealList.remove(preferredMeal)
+            return preferredMeal
+    return None
+
+
+def chooseMealOnPace(affordableMeals, additionalCosts, affordableRatio, mealWeights):
+    """
+    Randomly chooses one of the affordable meals whose additional costs per kcal stay within the
+    affordable ratio, fully priced meals first. Falls back to the meal with the lowest
+    additional costs per kcal.
+    """
+    for unknownPrices in (False, True):
+        onPaceMeals = [meal for meal in affordableMeals if hasUnknownPrices(meal) == unknownPrices \
+                       and additionalCosts[id(meal)] <= affordableRatio * meal.kcal]
+        if onPaceMeals:
+            weights = [mealWeights.get(id(meal), 1) for meal in onPaceMeals]
+            return random.choices(onPaceMeals, weights)[0]
+    return min(affordableMeals, key = lambda meal: (hasUnknownPrices(meal), additionalCosts[id(meal)] / meal.kcal))
@@ -0,0 +1,512 @@
+import copy
+import json
+import logging
+import mmap
+import os
+import random
+import struct
+import numpy as np
+
+from Class.ingredient import ingredient
+from Class.ingredient import MACROFACTOR
+from Class.ingredient import METRIC
+from Class.ingredient import UNITMODE
+from Class.meal import meal
+from Lib.outputSinks import createTemporaryFile
+
+
+logger = logging.getLogger(__name__)
+
+def registerColumnarCatalogLogger(Logger):
+    global logger
+    logger = Logger
+
+
+# File layout -------------------------------------------------------------------------------------
+#
+#   magic (8 byte) | header length (uint32) | json header padded to 8 bytes | columns
+#
+#   The json header maps every column name to [dtype, shape, offset]. Every column starts at a
+#   multiple of 8 bytes, so it can be viewed with numpy directly inside the mapped file.
+#
+#   Columns:
+#       ingredientMacros - float64 (ingredients, 4), kcal, carb, protein and fat per 100 gram,
+#                          100 ml or piece
+#       ingredientGramFactor - float64 (ingredients), gram per unit of the ingredient
+#       ingredientMacroFactor - float64 (ingredients), share of the macros per unit
+#       ingredientPrice - float64 (ingredients), price per package, NaN if unknown
+#       ingredientPackageSize - float64 (ingredients), amount per package
+#       mealFlags - uint8 (meals), bit 0 post workout, bit 1 pre workout
+#       mealMacros - float64 (meals, 4), expected macros of the meal, base row plus the mean
+#                    of every option group
+#       mealRowPointer - uint32 (meals + 1), rows of every meal in CSR layout
+#       mealWatchPointer - uint32 (meals + 1), watch list items of every meal in CSR layout
+#       watchStrings - uint32 (watch items), string ids of the watch list items
+#       rowGroup - int32 (rows), -1 for the base row of a meal, else the option group of the row
+#       rowEntryPointer - uint32 (rows + 1), ingredients of every row in CSR layout
+#       rowMacros - float64 (rows, 4), summed macros of the row
+#       entryIngredient - uint32 (entries), ingredient id of the entry
+#       entryAmount - float64 (entries), amount of the ingredient
+#       entryGramFactor - float64 (entries), gram per unit, resolved at export by the UNITMODE
+#       entryMacroFactor - float64 (entries), share of the macros per unit, resolved at export
+#                          by the UNITMODE
+#       stringOffsets - uint32 (strings + 1), offsets into stringData
+#       stringData - uint8, utf-8 encoded strings. The ingredient names come first, followed by
+#                    the meal names and the watch list items
+#
+# -------------------------------------------------------------------------------------------------
+
+CATALOGMAGIC = b"GLCAT002"
+
+SPECIALKEYS = ("options", "optional", "watchList", "postWorkout", "preWorkout")
+
+
+def writeColumnarCatalog(catalogPath, mealDict, ingredientObjectList, unitMode = UNITMODE.EXPLICIT):
+    """
+    Compiles the given meals and ingredients into the columnar catalog file. Meals using unknown
+    ingredients are skipped like in convertMealToObject.
+
+    Input:
+        catalogPath: path of the catalog file
+        mealDict: dictionary in the format of the meal yaml, pre and post workout meals tagged
+        ingredientObjectList: list of objects of class ingredient
+        unitMode: UNITMODE used to resolve the gram and macro factors of the meal ingredients
+    """
+    catalogBytes, mealNumber = buildColumnarCatalog(mealDict, ingredientObjectList, unitMode)
+
+    # planners may map the previous catalog right now, it is replaced atomically
+    fileDeskriptor, temporaryPath = createTemporaryFile(catalogPath)
+    try:
+        with os.fdopen(fileDeskriptor, "wb") as stream:
+            stream.write(catalogBytes)
+            stream.flush()
+            os.fsync(stream.fileno())
+        os.replace(temporaryPath, catalogPath)
+    except BaseException:
+        os.unlink(temporaryPath)
+        raise
+    logger.info("Exported {} meals and {} ingredients to {}".format(mealNumber, len(ingredientObjectList), catalogPath))
+
+
+def buildColumnarCatalog(mealDict, ingredientObjectList, unitMode = UNITMODE.EXPLICIT):
+    """
+    Compiles the given meals and ingredients into the bytes of a columnar catalog and returns
+    them together with the number of compiled meals.
+    """
+    ingredientIds = {ingredientObject.name: ingredientId \
+                     for ingredientId, ingredientObject in enumerate(ingredientObjectList)}
+    ingredientMacros = np.array([[ingredientObject.kcal, ingredientObject.carb, ingredientObject.protein, \
+                                  ingredientObject.fat] for ingredientObject in ingredientObjectList], \
+                                dtype = np.float64).reshape(-1, 4)
+    ingredientGramFactor = np.array([ingredientObject.gramFactor for ingredientObject in ingredientObjectList], \
+                                    dtype = np.float64)
+    ingredientMacroFactor = np.array([ingredientObject.macroFactor for ingredientObject in ingredientObjectList], \
+                                     dtype = np.float64)
+
+    strings = [ingredientObject.name for ingredientObject in ingredientObjectList]
+    mealNames = []
+    mealFlags = []
+    mealRowPointer = [0]
+    mealWatchPointer = [0]
+    watchStrings = []
+    rowGroup = []
+    rowEntryPointer = [0]
+    entryIngredient = []
+    entryAmount = []
+    entryGramFactor = []
+    entryMacroFactor = []
+
+    for mealName, mealData in mealDict.items():
+        rows = [(-1, {key: value for key, value in mealData.items() if key not in SPECIALKEYS})]
+        for groupNumber, optionGroup in enumerate(mealData.get("options") or []):
+            rows.extend((groupNumber, option) for option in optionGroup)
+        if mealData.get("optional"):
+            optionalGroup = len(mealData.get("options") or [])
+            optionalIngredients = {}
+            for optionalIngredient in mealData["optional"]:
+                optionalIngredients.update(optionalIngredient)
+            rows.extend([(optionalGroup, {}), (optionalGroup, optionalIngredients)])
+
+        unknownIngredients = [name for _, row in rows for name in row if name not in ingredientIds]
+        if unknownIngredients:
+            logger.warning("Meal {} is not exported because ingredients {} are not in the ingredient list" \
+                           .format(mealName, unknownIngredients))
+            continue
+
+        for group, row in rows:
+            rowGroup.append(group)
+            for ingredientName, amount in row.items():
+                entryIngredient.append(ingredientIds[ingredientName])
+                entryAmount.append(amount)
+                if unitMode == UNITMODE.LEGACY:
+                    entryGramFactor.append(1 if amount > 10 else 100)
+                    entryMacroFactor.append(MACROFACTOR[METRIC.GRAM if amount > 10 else METRIC.PIECE])
+                else:
+                    entryGramFactor.append(ingredientGramFactor[ingredientIds[ingredientName]])
+                    entryMacroFactor.append(ingredientMacroFactor[ingredientIds[ingredientName]])
+            rowEntryPointer.append(len(entryIngredient))
+        mealRowPointer.append(len(rowGroup))
+
+        mealNames.append(mealName)
+        mealFlags.append(int(bool(mealData.get("postWorkout"))) | int(bool(mealData.get("preWorkout"))) << 1)
+        watchList = mealData.get("watchList") or []
+        watchStrings.extend(str(watchItem) for watchItem in watchList)
+        mealWatchPointer.append(len(watchStrings))
+
+    watchStringIds = list(range(len(strings) + len(mealNames), len(strings) + len(mealNames) + len(watchStrings)))
+    strings.extend(mealNames)
+    strings.extend(watchStrings)
+
+    # macros of every row as one sparse matrix product: share of the macros times macros
+    entryIngredient = np.array(entryIngredient, dtype = np.uint32)
+    entryAmount = np.array(entryAmount, dtype = np.float64)
+    entryGramFactor = np.array(entryGramFactor, dtype = np.float64)
+    entryMacroFactor = np.array(entryMacroFactor, dtype = np.float64)
+    rowEntryPointer = np.array(rowEntryPointer, dtype = np.uint32)
+    rowGroup = np.array(rowGroup, dtype = np.int32)
+    entryRows = np.repeat(np.arange(len(rowGroup)), np.diff(rowEntryPointer))
+    rowMacros = np.zeros((len(rowGroup), 4))
+    np.add.at(rowMacros, entryRows, ingredientMacros[entryIngredient] * (entryAmount * entryMacroFactor)[:, None])
+
+    mealRowPointer = np.array(mealRowPointer, dtype = np.uint32)
+    mealMacros = getExpectedMealMacros(mealRowPointer, rowGroup, rowMacros)
+
+    encodedStrings = [string.encode("utf-8") for string in strings]
+    stringOffsets = np.zeros(len(encodedStrings) + 1, dtype = np.uint32)
+    stringOffsets[1:] = np.cumsum([len(string) for string in encodedStrings])
+
+    columns = {
+        "ingredientMacros": ingredientMacros,
+        "ingredientGramFactor": ingredientGramFactor,
+        "ingredientMacroFactor": ingredientMacroFactor,
+        "ingredientPrice": np.array([np.nan if ingredientObject.price is None else ingredientObject.price \
+                                     for ingredientObject in ingredientObjectList], dtype = np.float64),
+        "ingredientPackageSize": np.array([ingredientObject.packageSize for ingredientObject in ingredientObjectList], \
+                                          dtype = np.float64),
+        "mealFlags": np.array(mealFlags, dtype = np.uint8),
+        "mealMacros": mealMacros,
+        "mealRowPointer": mealRowPointer,
+        "mealWatchPointer": np.array(mealWatchPointer, dtype = np.uint32),
+        "watchStrings": np.array(watchStringIds, dtype = np.uint32),
+        "rowGroup": rowGroup,
+        "rowEntryPointer": rowEntryPointer,
+        "rowMacros": rowMacros,
+        "entryIngredient": entryIngredient,
+        "entryAmount": entryAmount,
+        "entryGramFactor": entryGramFactor,
+        "entryMacroFactor": entryMacroFactor,
+        "stringOffsets": stringOffsets,
+        "stringData": np.frombuffer(b"".join(encodedStrings), dtype = np.uint8),
+    }
+    catalogBytes = serializeColumns(columns, {"ingredients": len(ingredientObjectList), "meals": len(mealNames)})
+    return catalogBytes, len(mealNames)
+
+
+def getExpectedMealMacros(mealRowPointer, rowGroup, rowMacros):
+    """
+    Returns the expected macros of every meal: the base row plus the mean of every option group.
+    """
+    mealMacros = np.zeros((len(mealRowPointer) - 1, 4))
+    for mealId in range(len(mealRowPointer) - 1):
+        firstRow, lastRow = mealRowPointer[mealId], mealRowPointer[mealId + 1]
+        groups = rowGroup[firstRow:lastRow]
+        macros = rowMacros[firstRow:lastRow]
+        mealMacros[mealId] = macros[groups == -1].sum(axis = 0)
+        for group in np.unique(groups[groups >= 0]):
+            mealMacros[mealId] += macros[groups == group].mean(axis = 0)
+    return mealMacros
+
+
+def serializeColumns(columns, counts):
+    """
+    Serializes the given columns with their json header into one bytes object.
+    """
+    header = {"counts": counts, "columns": {}}
+    offset = 0
+    for name, column in columns.items():
+        header["columns"][name] = [column.dtype.str, list(column.shape), offset]
+        offset += alignTo8(column.nbytes)
+
+    headerBytes = json.dumps(header).encode("utf-8")
+    headerBytes = headerBytes.ljust(getDataStart(len(headerBytes)) - len(CATALOGMAGIC) - 4)
+
+    parts = [CATALOGMAGIC, struct.pack("<I", len(headerBytes)), headerBytes]
+    for column in columns.values():
+        columnBytes = np.ascontiguousarray(column).tobytes()
+        parts.append(columnBytes + b"\0" * (alignTo8(len(columnBytes)) - len(columnBytes)))
+    return b"".join(parts)
+
+
+def alignTo8(size):
+    return (size + 7) // 8 * 8
+
+
+def getDataStart(headerLength):
+    """
+    Returns the offset of the first column behind a header of the given length.
+    """
+    return alignTo8(len(CATALOGMAGIC) + 4 + headerLength)
+
+
+# class columnarCatalog ---------------------------------------------------------------------------
+#
+#   Read only view of a columnar catalog. Every column is a numpy array viewing the given buffer
+#   directly, nothing is copied or parsed besides the small json header. Opened from a file, the
+#   buffer is a read only memory map, so all planner processes share the same page cache pages.
+#
+#       columns - dict of numpy arrays, see the file layout above
+#
+#       ingredientNumber - number of ingredients
+#
+#       mealNumber - number of meals
+#
+# -------------------------------------------------------------------------------------------------
+
+class columnarCatalog:
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer)
+        if bytes(self.buffer[:len(CATALOGMAGIC)]) != CATALOGMAGIC:
+            raise ValueError("Buffer does not contain a columnar catalog")
+        headerLength = struct.unpack_from("<I", self.buffer, len(CATALOGMAGIC))[0]
+        headerStart = len(CATALOGMAGIC) + 4
+        header = json.loads(bytes(self.buffer[headerStart:headerStart + headerLength]))
+
+        self.ingredientNumber = header["counts"]["ingredients"]
+        self.mealNumber = header["counts"]["meals"]
+        self.ingredientObjectList = None
+        self.columns = {}
+        for name, (dtype, shape, offset) in header["columns"].items():
+            count = int(np.prod(shape))
+            column = np.frombuffer(self.buffer, dtype = np.dtype(dtype), count = count, \
+                                   offset = getDataStart(headerLength) + offset).reshape(shape)
+            column.flags.writeable = False
+            self.columns[name] = column
+
+    @classmethod
+    def fromFile(cls, catalogPath):
+        """
+        Maps the given catalog file read only into memory and returns the catalog view.
+        """
+        with open(catalogPath, "rb") as fileDeskriptor:
+            mappedFile = mmap.mmap(fileDeskriptor.fileno(), 0, access = mmap.ACCESS_READ)
+        return cls(mappedFile)
+
+    def __repr__(self):
+        """
+        Overload __repr__ method to enable fancy printing and logger support on print operations.
+        """
+        return "<class: {}, meals: {}, ingredients: {}>".format(self.__class__.__name__, \
+                    self.mealNumber, self.ingredientNumber)
+
+    def release(self):
+        """
+        Drops all views of the buffer. Required before the underlying memory can be closed.
+        """
+        self.columns = {}
+        self.ingredientObjectList = None
+        self.buffer.release()
+
+    def getString(self, stringId):
+        stringOffsets = self.columns["stringOffsets"]
+        return bytes(self.columns["stringData"][stringOffsets[stringId]:stringOffsets[stringId + 1]]).decode("utf-8")
+
+    def getIngredientName(self, ingredientId):
+        return self.getString(ingredientId)
+
+    def getMealName(self, mealId):
+        return self.getString(self.ingredientNumber + mealId)
+
+    def getWatchList(self, mealId):
+        mealWatchPointer = self.columns["mealWatchPointer"]
+        watchStrings = self.columns["watchStrings"][mealWatchPointer[mealId]:mealWatchPointer[mealId + 1]]
+        return [self.getString(stringId) for stringId in watchStrings]
+
+    def isPostWorkout(self, mealId):
+        return bool(self.columns["mealFlags"][mealId] & 1)
+
+    def isPreWorkout(self, mealId):
+        return bool(self.columns["mealFlags"][mealId] & 2)
+
+    def getIngredientObjectList(self):
+        """
+        Creates objects of class ingredient for all ingredients of the catalog.
+        """
+        ingredientObjectList = []
+        for ingredientId in range(self.ingredientNumber):
+            kcal, carb, protein, fat = self.columns["ingredientMacros"][ingredientId]
+            price = self.columns["ingredientPrice"][ingredientId]
+            ingredientObject = ingredient(self.getIngredientName(ingredientId), float(kcal), \
+                float(carb), float(protein), float(fat), price = None if np.isnan(price) else float(price), \
+                packageSize = float(self.columns["ingredientPackageSize"][ingredientId]), \
+                gramFactor = float(self.columns["ingredientGramFactor"][ingredientId]))
+            ingredientObject.macroFactor = float(self.columns["ingredientMacroFactor"][ingredientId])
+            ingredientObjectList.append(ingredientObject)
+        return ingredientObjectList
+
+    def getChoosenRows(self, mealId, randomGenerator = random):
+        """
+        Returns the base row of the given meal and one randomly chosen row of every option group.
+        """
+        firstRow = int(self.columns["mealRowPointer"][mealId])
+        lastRow = int(self.columns["mealRowPointer"][mealId + 1])
+        groupRows = {}
+        choosenRows = []
+        for row in range(firstRow, lastRow):
+            group = int(self.columns["rowGroup"][row])
+            if group == -1:
+                choosenRows.append(row)
+            else:
+                groupRows.setdefault(group, []).append(row)
+        choosenRows.extend(randomGenerator.choice(rows) for rows in groupRows.values())
+        return choosenRows
+
+    def getMealObject(self, mealId, ingredientObjectList, randomGenerator = random, rows = None):
+        """
+        Creates the unresolved object of class meal of the given meal id. Options are chosen
+        randomly like in convertMealToObject, unless the rows to use are given.
+        """
+        if rows is None:
+            rows = self.getChoosenRows(mealId, randomGenerator)
+        ingredientList = []
+        for row in rows:
+            firstEntry = self.columns["rowEntryPointer"][row]
+            lastEntry = self.columns["rowEntryPointer"][row + 1]
+            for entry in range(firstEntry, lastEntry):
+                ingredientObject = copy.copy(ingredientObjectList[self.columns["entryIngredient"][entry]])
+                amount = self.columns["entryAmount"][entry].item()
+                ingredientObject.amount = int(amount) if amount.is_integer() else amount
+                ingredientObject.gramFactor = self.columns["entryGramFactor"][entry].item()
+                ingredientObject.macroFactor = self.columns["entryMacroFactor"][entry].item()
+                ingredientList.append(ingredientObject)
+        return meal(self.getMealName(mealId), self.getWatchList(mealId), self.isPostWorkout(mealId), \
+                    self.isPreWorkout(mealId), ingredientList)
+
+    def getMealObjectList(self, mealIds = None, ingredientObjectList = None):
+        """
+        Creates the unresolved meal objects of the given meal ids, of all meals if None.
+        """
+        if ingredientObjectList is None:
+            ingredientObjectList = self.getIngredientObjectList()
+        if mealIds is None:
+            mealIds = range(self.mealNumber)
+        return [self.getMealObject(mealId, ingredientObjectList) for mealId in mealIds]
+
+    def getMealViewList(self, mealIds = None):
+        """
+        Returns read only views of the given meal ids, of all meals if None. Unlike the meal
+        objects, the views are created without touching the ingredient entries.
+        """
+        if mealIds is None:
+            mealIds = range(self.mealNumber)
+        return [catalogMealView(self, mealId) for mealId in mealIds]
+
+    def getSharedIngredientObjectList(self):
+        """
+        Returns the ingredient objects of the catalog, created once and shared by all views.
+        """
+        if self.ingredientObjectList is None:
+            self.ingredientObjectList = self.getIngredientObjectList()
+        return self.ingredientObjectList
+
+
+# class catalogMealView ---------------------------------------------------------------------------
+#
+#   Read only meal of a columnar catalog. It offers the attributes of a resolved object of class
+#   meal that chooseMeals, generateGroceryList and the result output use, read directly from
+#   the catalog columns.
+#
+#       choosenRows - base row and one random row per option group. The options are chosen on
+#                     first access of the macros or the ingredients and kept afterwards
+#
+#       kcal, carb, protein, fat - macros of the choosen rows, summed from rowMacros
+#
+#       ingredientList - ingredients of the choosen rows
+#
+#       cost - estimated cost of the ingredient list
+#
+# -------------------------------------------------------------------------------------------------
+
+class catalogMealView:
+    __slots__ = ("catalog", "mealId", "choosenRowList", "choosenMacros", "choosenIngredientList")
+
+    def __init__(self, catalog, mealId):
+        self.catalog = catalog
+        self.mealId = mealId
+        self.choosenRowList = None
+        self.choosenMacros = None
+        self.choosenIngredientList = None
+
+    def __repr__(self):
+        """
+        Overload __repr__ method to enable fancy printing and logger support on print operations.
+        """
+        return "<class: {}, name: {}, macros (K|C|P|F): {} {} {} {}>".format(self.__class__.__name__, \
+                    self.name, self.kcal, self.carb, self.protein, self.fat)
+
+    def __deepcopy__(self, memo):
+        # views are read only, chooseMeals can share them instead of copying the catalog
+        return self
+
+    @property
+    def name(self):
+        return self.catalog.getMealName(self.mealId)
+
+    @property
+    def watchList(self):
+        return self.catalog.getWatchList(self.mealId)
+
+    @property
+    def postWorkout(self):
+        return self.catalog.isPostWorkout(self.mealId)
+
+    @property
+    def preWorkout(self):
+        return self.catalog.isPreWorkout(self.mealId)
+
+    @property
+    def choosenRows(self):
+        if self.choosenRowList is None:
+            self.choosenRowList = self.catalog.getChoosenRows(self.mealId)
+        return self.choosenRowList
+
+    @property
+    def macros(self):
+        if self.choosenMacros is None:
+            rowMacros = self.catalog.columns["rowMacros"][self.choosenRows].sum(axis = 0)
+            self.choosenMacros = tuple(float(macro) for macro in rowMacros)
+        return self.choosenMacros
+
+    @property
+    def kcal(self):
+        return self.macros[0]
+
+    @property
+    def carb(self):
+        return self.macros[1]
+
+    @property
+    def protein(self):
+        return self.macros[2]
+
+    @property
+    def fat(self):
+        return self.macros[3]
+
+    @property
+    def ingredientList(self):
+        if self.choosenIngredientList is None:
+            mealObject = self.catalog.getMealObject(self.mealId, self.catalog.getSharedIngredientObjectList(), \
+                                                    rows = self.choosenRows)
+            self.choosenIngredientList = mealObject.ingredientList
+        return self.choosenIngredientList
+
+    @property
+    def cost(self):
+        return sum(ingredient.price * ingredient.amount / ingredient.packageSize \
+                   for ingredient in self.ingredientList if ingredient.price is not None)
+
+    def resolveMacros(self):
+        """
+        The macros are resolved at export, nothing to do.
+        """
+        return
@@ -0,0 +1,132 @@
+import logging
+import math
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+def registerCostEstimationLogger(Logger):
+    global logger
+    logger = Logger
+
+
+def estimateGroceryCost(groceryDict, ingredientObjectList):
+    """
+    Estimates the costs of the given grocery list. Every item is rounded up to whole packages,
+    the rounding is computed for all items at once.
+
+    Input:
+        groceryDict: dict
+            item1: amount,
+            item2: ...
+        ingredientObjectList: list of objects of class ingredient
+
+    output:
+        costDict: dict
+            item1: cost,
+            item2: ...
+        totalCost: float
+        unpricedItems: list of item names without price
+    """
+    ingredientLookup = {ingredient.name: ingredient for ingredient in ingredientObjectList}
+
+    pricedItems = []
+    unpricedItems = []
+    for itemName in groceryDict:
+        ingredient = ingredientLookup.get(itemName)
+        if ingredient is not None and ingredient.price is not None:
+            pricedItems.append(ingredient)
+        else:
+            unpricedItems.append(itemName)
+
+    if not pricedItems:
+        return {}, 0.0, unpricedItems
+
+    amounts = np.array([groceryDict[ingredient.name] for ingredient in pricedItems], dtype = float)
+    packageSizes = np.array([ingredient.packageSize for ingredient in pricedItems], dtype = float)
+    prices = np.array([ingredient.price for ingredient in pricedItems], dtype = float)
+
+    packageCounts = np.ceil(amounts / packageSizes)
+    costs = np.round(packageCounts * prices, 2)
+
+    costDict = {ingredient.name: float(cost) for ingredient, cost in zip(pricedItems, costs)}
+    totalCost = round(float(costs.sum()), 2)
+
+    if unpricedItems:
+        logger.info("No price known for: \n{}".format(unpricedItems))
+
+    return costDict, totalCost, unpricedItems
+
+
+# class groceryCost -------------------------------------------------------------------------------
+#
+#   Package rounded costs of a growing grocery list, computed like estimateGroceryCost computes
+#   them for the result file. Meals are added one by one, the additional costs of a meal only
+#   depend on its own ingredients.
+#
+#       scale - factor of all amounts, e.g. the portions of a household
+#
+#       pantry - stock per ingredient in its metric, subtracted before rounding to packages
+#
+#       amounts - summed amount per ingredient of the added meals, before scale and stock
+#
+#       totalCost - costs of all added meals
+#
+# -------------------------------------------------------------------------------------------------
+
+class groceryCost:
+    def __init__(self, scale = 1, pantry = None):
+        self.scale = scale
+        self.pantry = pantry or {}
+        self.amounts = {}
+        self.totalCost = 0.0
+
+    def __repr__(self):
+        """
+        Overload __repr__ method to enable fancy printing and logger support on print operations.
+        """
+        return "<class: {}, items: {}, total cost: {:.2f}>".format(self.__class__.__name__, \
+                    len(self.amounts), self.totalCost)
+
+    def getItemCost(self, ingredient, amount):
+        """
+        Returns the costs of the whole packages needed for the given amount of the ingredient.
+        """
+        amount = amount * self.scale
+        if self.scale != 1:
+            amount = round(amount, 1)
+        amount -= self.pantry.get(ingredient.name, 0)
+        if amount <= 0:
+            return 0.0
+        return round(math.ceil(amount / ingredient.packageSize) * ingredient.price, 2)
+
+    def getAdditionalCost(self, meal):
+        """
+        Returns how much the grocery costs grow by adding the given meal. Ingredients without
+        price are left out.
+        """
+        addedAmounts = {}
+        pricedIngredients = {}
+        for ingredient in meal.ingredientList:
+            if ingredient.price is not None:
+                addedAmounts[ingredient.name] = addedAmounts.get(ingredient.name, 0) + ingredient.amount
+                pricedIngredients[ingredient.name] = ingredient
+        additionalCost = 0.0
+        for name, addedAmount in addedAmounts.items():
+            currentAmount = self.amounts.get(name, 0)
+            additionalCost += self.getItemCost(pricedIngredients[name], currentAmount + addedAmount) - \
+                              self.getItemCost(pricedIngredients[name], currentAmount)
+        return additionalCost
+
+    def addMeal(self, meal):
+        self.totalCost += self.getAdditionalCost(meal)
+        for ingredient in meal.ingredientList:
+            self.amounts[ingredient.name] = self.amounts.get(ingredient.name, 0) + ingredient.amount
+
+
+def hasUnknownPrices(meal):
+    """
+    Returns whether an ingredient of the given meal has no price, the costs of such meals are
+    incomplete.
+    """
+    return any(ingredient.price is None for ingredient in meal.ingredientList)
@@ -0,0 +1,153 @@
+import heapq
+import logging
+
+from functools import cached_property
+
+
+logger = logging.getLogger(__name__)
+
+def registerEnergyBudgetLogger(Logger):
+    global logger
+    logger = Logger
+
+
+# Estimated kcal of one meal taken outside, e.g. in a restaurant
+CHEATMEALKCAL = 850
+
+
+# class energyBudget ------------------------------------------------------------------------------
+#
+#   Kcal the planned meals have to cover, split per day. Cheat meals are eaten outside and their
+#   estimated kcal are subtracted from the days they fall on. Workouts add the expected kcal of
+#   one pre and one post workout meal on top of the regular meals. Cheat meals and workouts are
+#   spread evenly over the days, the first days take the remainder. All derived values are
+#   computed once on first access. A chosen plan is split into days against the daily targets.
+#
+#       days - number of planned days
+#
+#       dailyKcal - kcal needed per day without sport
+#
+#       workouts - number of workouts in the planned days
+#
+#       cheatMeals - number of meals taken outside in the planned days
+#
+#       postWorkoutKcal - expected kcal of one post workout meal
+#
+#       preWorkoutKcal - expected kcal of one pre workout meal
+#
+#       cheatMealKcal - estimated kcal of one cheat meal
+#
+# -------------------------------------------------------------------------------------------------
+
+class energyBudget:
+    def __init__(self, days, dailyKcal, workouts = 0, cheatMeals = 0, postWorkoutKcal = 0, \
+                 preWorkoutKcal = 0, cheatMealKcal = CHEATMEALKCAL):
+        self.days = days
+        self.dailyKcal = dailyKcal
+        self.workouts = workouts
+        self.cheatMeals = cheatMeals
+        self.postWorkoutKcal = postWorkoutKcal
+        self.preWorkoutKcal = preWorkoutKcal
+        self.cheatMealKcal = cheatMealKcal
+
+    @classmethod
+    def fromArgs(cls, args, postWorkoutMealList = (), preWorkoutMealList = ()):
+        """
+        Creates the budget of the parsed input arguments. The workout extras are the mean kcal
+        of the given pre and post workout meal pools.
+        """
+        return cls(args.days, args.kcal, args.workout, args.cheatmeals, getMeanKcal(postWorkoutMealList), \
+                   getMeanKcal(preWorkoutMealList), getattr(args, "cheatkcal", CHEATMEALKCAL))
+
+    def __repr__(self):
+        """
+        Overload __repr__ method to enable fancy printing and logger support on print operations.
+        """
+        return "<class: {}, regular kcal: {}, cheat meal kcal: {}, workout kcal: {}, daily targets: {}>" \
+               .format(self.__class__.__name__, round(self.regularKcal), round(self.cheatKcal), \
+                       round(self.workoutKcal), [round(target) for target in self.dailyTargets])
+
+    @cached_property
+    def dailyCheatMeals(self):
+        return spreadOverDays(self.cheatMeals, self.days)
+
+    @cached_property
+    def dailyWorkouts(self):
+        return spreadOverDays(self.workouts, self.days)
+
+    @cached_property
+    def dailyRegularKcal(self):
+        """
+        Kcal the regular meals have to cover per day. Days with more cheat meals than kcal need
+        no regular meals.
+        """
+        return [max(self.dailyKcal - cheatMeals * self.cheatMealKcal, 0) for cheatMeals in self.dailyCheatMeals]
+
+    @cached_property
+    def dailyTargets(self):
+        """
+        Kcal of all planned meals per day, the workout extras included.
+        """
+        return [regularKcal + workouts * (self.postWorkoutKcal + self.preWorkoutKcal) \
+                for regularKcal, workouts in zip(self.dailyRegularKcal, self.dailyWorkouts)]
+
+    @cached_property
+    def regularKcal(self):
+        return sum(self.dailyRegularKcal)
+
+    @cached_property
+    def cheatKcal(self):
+        return self.days * self.dailyKcal - self.regularKcal
+
+    @cached_property
+    def workoutKcal(self):
+        return self.workouts * (self.postWorkoutKcal + self.preWorkoutKcal)
+
+    @cached_property
+    def totalKcal(self):
+        return self.regularKcal + self.workoutKcal
+
+    def assignMealsToDays(self, regularMealList, postWorkoutMealList = (), preWorkoutMealList = ()):
+        """
+        Splits the given meals into days against the daily targets. The workout meals go to the
+        days with workouts, then every regular meal, the largest first, goes to the day that
+        misses the most kcal of its target.
+
+        output: list of meal lists, one per day
+        """
+        dailyMealLists = [[] for day in range(self.days)]
+        postWorkoutMealList = list(postWorkoutMealList)
+        preWorkoutMealList = list(preWorkoutMealList)
+        for day, workouts in enumerate(self.dailyWorkouts):
+            for workout in range(workouts):
+                for workoutMealList in (postWorkoutMealList, preWorkoutMealList):
+                    if workoutMealList:
+                        dailyMealLists[day].append(workoutMealList.pop(0))
+
+        # heap of the missing kcal per day, negated so the day missing the most comes first
+        missingKcal = [(sum(meal.kcal for meal in dailyMealList) - target, day) \
+                       for day, (dailyMealList, target) in enumerate(zip(dailyMealLists, self.dailyTargets))]
+        heapq.heapify(missingKcal)
+        for meal in sorted(regularMealList, key = lambda meal: meal.kcal, reverse = True):
+            negativeMissingKcal, day = heapq.heappop(missingKcal)
+            dailyMealLists[day].append(meal)
+            heapq.heappush(missingKcal, (negativeMissingKcal + meal.kcal, day))
+        return dailyMealLists
+
+    def getDailyDeviations(self, dailyMealLists):
+        """
+        Returns the kcal deviation of every day of the given split plan from its daily target.
+        """
+        return [sum(meal.kcal for meal in dailyMealList) - target \
+                for dailyMealList, target in zip(dailyMealLists, self.dailyTargets)]
+
+
+def spreadOverDays(count, days):
+    """
+    Spreads the given count evenly over the days, the first days take the remainder.
+    """
+    return [count // days + (1 if day < count % days else 0) for day in range(days)]
+
+
+def getMeanKcal(mealList):
+    return sum(meal.kcal for meal in mealList) / len(mealList) if mealList else 0
@@ -0,0 +1,143 @@
+import collections
+import logging
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+def registerFeasibilityIndexLogger(Logger):
+    global logger
+    logger = Logger
+
+
+# Built indices of the most recent meal catalogs, per catalog list, repetition limit and tolerance
+feasibilityIndexCache = collections.OrderedDict()
+CACHESIZE = 8
+
+
+# class kcalFeasibilityIndex ----------------------------------------------------------------------
+#
+#   Precomputed answers to the question which kcal sums the given meals can reach. Every meal
+#   may be used up to maxRepeat times, kcal counts are rounded to whole kcal.
+#
+#       sortedKcal - kcal counts of all meal uses, ascending
+#
+#       prefixSums - sums of the k smallest meal uses, k = 0 ... len(sortedKcal)
+#
+#       suffixSums - sums of the k largest meal uses, k = 0 ... len(sortedKcal)
+#
+#       reachable - bitset as python int, bit s is set if a combination of meals sums up to s.
+#                   It is built by subset sum bit shifts and cut off at limit
+#
+#       windowCounts - prefix counts of the reachable sums, used to test in O(1) if any sum
+#                      within the tolerance around a value is reachable
+#
+# -------------------------------------------------------------------------------------------------
+
+class kcalFeasibilityIndex:
+    def __init__(self, kcalArray, maxRepeat = 1, limit = 0, tolerance = 200):
+        self.maxRepeat = maxRepeat
+        self.limit = limit
+        self.tolerance = tolerance
+
+        self.sortedKcal = np.repeat(np.sort(kcalArray), maxRepeat)
+        self.prefixSums = np.concatenate(([0], np.cumsum(self.sortedKcal)))
+        self.suffixSums = np.concatenate(([0], np.cumsum(self.sortedKcal[::-1])))
+
+        # bounded subset sum: every distinct kcal value is added in binary chunks of its copies
+        reachable = 1
+        mask = (1 << (limit + 1)) - 1
+        values, counts = np.unique(self.sortedKcal, return_counts = True)
+        for value, copies in zip(values.tolist(), counts.tolist()):
+            chunk = 1
+            while copies > 0 and value <= limit:
+                take = min(chunk, copies)
+                reachable |= (reachable << (value * take)) & mask
+                copies -= take
+                chunk *= 2
+        self.reachable = reachable
+
+        reachableBits = np.unpackbits(np.frombuffer(reachable.to_bytes(limit // 8 + 1, "little"), \
+                                                    dtype = np.uint8), bitorder = "little")[:limit + 1]
+        self.windowCounts = np.concatenate(([0], np.cumsum(reachableBits)))
+
+    def __repr__(self):
+        """
+        Overload __repr__ method to enable fancy printing and logger support on print operations.
+        """
+        return "<class: {}, meal uses: {}, limit: {}, reachable sums: {}>".format(self.__class__.__name__, \
+                    len(self.sortedKcal), self.limit, int(self.windowCounts[-1]))
+
+    def isWindowReachable(self, remainingKcal):
+        """
+        Returns for every given remaining kcal count if a reachable sum lies within the tolerance
+        around it. Accepts scalars and numpy arrays.
+        """
+        remainingKcal = np.asarray(remainingKcal)
+        lowerBound = np.clip(remainingKcal - self.tolerance, 0, self.limit + 1)
+        upperBound = np.clip(remainingKcal + self.tolerance + 1, 0, self.limit + 1)
+        return self.windowCounts[upperBound] > self.windowCounts[lowerBound]
+
+    def isFeasible(self, targetKcal):
+        """
+        Returns if the target kcal count is reachable within the tolerance.
+        """
+        return bool(self.isWindowReachable(round(targetKcal)))
+
+    def getMealCountRange(self, targetKcal):
+        """
+        Returns the minimum and maximum number of meals a plan within the tolerance of the
+        target can have. The bounds only consider the kcal counts, not their exact sums.
+        """
+        minMeals = int(np.searchsorted(self.suffixSums, targetKcal - self.tolerance))
+        maxMeals = int(np.searchsorted(self.prefixSums, targetKcal + self.tolerance, side = "right")) - 1
+        return minMeals, maxMeals
+
+    def explainInfeasibility(self, targetKcal):
+        """
+        Returns a human readable reason why the target is not reachable, None if it is.
+        """
+        if self.isFeasible(targetKcal):
+            return None
+        lowerBound = targetKcal - self.tolerance
+        upperBound = targetKcal + self.tolerance
+        if self.prefixSums[-1] < lowerBound:
+            return "all meals together only have {} kcal, {} kcal are needed".format(int(self.prefixSums[-1]), lowerBound)
+        if len(self.sortedKcal) and self.sortedKcal[0] > upperBound:
+            return "the smallest meal has {} kcal, at most {} kcal are allowed".format(int(self.sortedKcal[0]), upperBound)
+
+        belowSums = self.reachable & ((1 << max(lowerBound, 0)) - 1)
+        aboveSums = self.reachable >> (upperBound + 1)
+        closestBelow = belowSums.bit_length() - 1
+        closestAbove = upperBound + 1 + (aboveSums & -aboveSums).bit_length() - 1 if aboveSums else None
+        return "no combination of meals has {} to {} kcal, the closest sums are {} and {} kcal" \
+               .format(lowerBound, upperBound, closestBelow, closestAbove if closestAbove is not None else "none")
+
+
+def getFeasibilityIndex(mealCatalog, mealList, targetKcal, maxRepeat = 1, tolerance = 200):
+    """
+    Returns the feasibility index of the given meals. The index is cached by the identity of
+    the meal catalog they were taken from, e.g. the meal list after the diet filter, so a run
+    builds it once and repeated plans on the same catalog, like in the selector benchmark, reuse
+    it. The catalog must not change while it is cached, the cache holds a reference to it so
+    its identity stays unique. The index is rebuilt only if a larger target than before is
+    requested.
+
+    Input:
+        mealCatalog: list the meals were taken from, key of the cache
+        mealList: list of resolved objects of class meal the index is built for
+        targetKcal: largest kcal sum the index has to answer
+    """
+    cacheKey = (id(mealCatalog), maxRepeat, tolerance)
+    limit = int(targetKcal) + tolerance
+
+    cachedCatalog, feasibilityIndex = feasibilityIndexCache.get(cacheKey, (None, None))
+    if cachedCatalog is not mealCatalog or feasibilityIndex.limit < limit:
+        kcalArray = np.maximum(np.rint([meal.kcal for meal in mealList]).astype(np.int64), 0)
+        feasibilityIndex = kcalFeasibilityIndex(kcalArray, maxRepeat, limit, tolerance)
+        logger.debug("Built {}".format(feasibilityIndex))
+    feasibilityIndexCache[cacheKey] = (mealCatalog, feasibilityIndex)
+    feasibilityIndexCache.move_to_end(cacheKey)
+    while len(feasibilityIndexCache) > CACHESIZE:
+        feasibilityIndexCache.popitem(last = False)
+    return feasibilityIndex
@@ -0,0 +1,111 @@
+import logging
+import os
+import yaml
+
+from pathlib import Path
+
+from Lib.outputSinks import RESULTSECTION
+from Lib.outputSinks import createTemporaryFile
+
+
+logger = logging.getLogger(__name__)
+
+def registerGroceryDiffLogger(Logger):
+    global logger
+    logger = Logger
+
+
+def diffGroceryLists(previousGroceryDict, currentGroceryDict):
+    """
+    Compares two grocery lists in one merge pass over their sorted ingredient names.
+
+    output: tuple of dicts
+        added - ingredients only in the current list with their amount
+        dropped - ingredients only in the previous list with their amount
+        changed - ingredients in both lists with a different amount, with the amount difference
+    """
+    previousItems = sorted(previousGroceryDict.items())
+    currentItems = sorted(currentGroceryDict.items())
+    added = {}
+    dropped = {}
+    changed = {}
+
+    previousIndex = currentIndex = 0
+    while previousIndex < len(previousItems) and currentIndex < len(currentItems):
+        previousName, previousAmount = previousItems[previousIndex]
+        currentName, currentAmount = currentItems[currentIndex]
+        if previousName < currentName:
+            dropped[previousName] = previousAmount
+            previousIndex += 1
+        elif currentName < previousName:
+            added[currentName] = currentAmount
+            currentIndex += 1
+        else:
+            if currentAmount != previousAmount:
+                changed[currentName] = currentAmount - previousAmount
+            previousIndex += 1
+            currentIndex += 1
+    dropped.update(previousItems[previousIndex:])
+    added.update(currentItems[currentIndex:])
+    return added, dropped, changed
+
+
+def generateDiffRecords(groceryDiff):
+    """
+    Yields the result records (section, name, amount) of the given grocery diff, grouped by
+    section and sorted by name.
+    """
+    added, dropped, changed = groceryDiff
+    for section, items in ((RESULTSECTION.ADDED, added), (RESULTSECTION.DROPPED, dropped), \
+                           (RESULTSECTION.CHANGED, changed)):
+        for ingredientName, amount in items.items():
+            yield (section, ingredientName, amount)
+
+
+def readGrocerySnapshot(snapshotPath, resultPath = None):
+    """
+    Returns the grocery list of the last run. Without a valid snapshot the grocery list of the
+    given yaml result file is used, without both the list is empty.
+    """
+    for path, key in ((snapshotPath, None), (resultPath, RESULTSECTION.GROCERIES.value)):
+        if path is None or not Path(path).is_file():
+            continue
+        with open(path, "r") as stream:
+            try:
+                content = yaml.safe_load(stream) or {}
+            except yaml.YAMLError as exc:
+                logger.warning("Previous grocery list {} is invalid and will be ignored: {}".format(path, exc))
+                continue
+        if key and isinstance(content, dict):
+            content = content.get(key)
+        groceryDict = content or {}
+        if not isGroceryDict(groceryDict):
+            logger.warning("Previous grocery list {} is no mapping of ingredients to amounts and will be ignored" \
+                           .format(path))
+            continue
+        return groceryDict
+    logger.info("No previous grocery list found, every item is new")
+    return {}
+
+
+def isGroceryDict(groceryDict):
+    """
+    Returns if the given yaml content is a grocery list: a dict of ingredient names to numbers.
+    """
+    return isinstance(groceryDict, dict) and all(isinstance(amount, (int, float)) and not isinstance(amount, bool) \
+                                                 for amount in groceryDict.values())
+
+
+def writeGrocerySnapshot(snapshotPath, groceryDict):
+    """
+    Replaces the snapshot with the given grocery list. It is written to a temporary file first,
+    so a crash never leaves a broken snapshot behind.
+    """
+    fileDeskriptor, temporaryPath = createTemporaryFile(snapshotPath)
+    try:
+        with os.fdopen(fileDeskriptor, "w") as stream:
+            yaml.safe_dump(groceryDict, stream, allow_unicode = True)
+        os.replace(temporaryPath, snapshotPath)
+    except BaseException:
+        os.unlink(temporaryPath)
+        raise
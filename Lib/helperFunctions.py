@@ -1,4 +1,6 @@
+import copy
 import logging
+import math
 import sys
 import random
 import yaml
@@ -7,8 +9,25 @@ from pathlib import Path
 
 from Class.ingredient import registerIngredientLogger
 from Class.ingredient import ingredient
+from Class.ingredient import MACROFACTOR
+from Class.ingredient import METRIC
+from Class.ingredient import UNITMODE
 from Class.meal import registerMealLogger
 from Class.meal import meal
+from Class.ingredientIndex import registerIngredientIndexLogger
+from Lib.backgroundWriter import registerBackgroundWriterLogger
+from Lib.budgetSelection import registerBudgetSelectionLogger
+from Lib.columnarCatalog import registerColumnarCatalogLogger
+from Lib.costEstimation import registerCostEstimationLogger
+from Lib.energyBudget import registerEnergyBudgetLogger
+from Lib.feasibilityIndex import registerFeasibilityIndexLogger
+from Lib.groceryDiff import registerGroceryDiffLogger
+from Lib.household import registerHouseholdLogger
+from Lib.macroOptimizer import registerMacroOptimizerLogger
+from Lib.outputSinks import registerOutputSinksLogger
+from Lib.planHistory import registerPlanHistoryLogger
+from Lib.planSampling import registerPlanSamplingLogger
+from Lib.sharedCatalog import registerSharedCatalogLogger
 
 
 logger = logging.getLogger(__name__) 
@@ -22,26 +41,70 @@ def registerLoggers(logger):
     registerMealLogger(logger)
     registerIngredientLogger(logger)
     registerHelperFunctionsLogger(logger)
+    registerIngredientIndexLogger(logger)
+    registerBackgroundWriterLogger(logger)
+    registerBudgetSelectionLogger(logger)
+    registerColumnarCatalogLogger(logger)
+    registerCostEstimationLogger(logger)
+    registerEnergyBudgetLogger(logger)
+    registerFeasibilityIndexLogger(logger)
+    registerGroceryDiffLogger(logger)
+    registerHouseholdLogger(logger)
+    registerMacroOptimizerLogger(logger)
+    registerOutputSinksLogger(logger)
+    registerPlanHistoryLogger(logger)
+    registerPlanSamplingLogger(logger)
+    registerSharedCatalogLogger(logger)
 
 def checkConfigFileExist(configFiles):
     for configFile in configFiles:
-        if not configFile:
+        if not Path(configFile).is_file():
             logger.error("Config file {} is missing. Exiting ...".format(configFile))
             sys.exit(1)     
 
+def readYamlFile(yamlFile, description):
+    """
+    Reads the given yaml config file and returns its content. Exits if the yaml is invalid.
+    """
+    with open(yamlFile, 'r') as stream:
+        try:
+            return yaml.safe_load(stream)
+        except yaml.YAMLError as exc:
+            logger.error("*** {} yaml is invalid. Reading the file gives the following error: \
+                          {}. Exiting ...".format(description, exc))
+            sys.exit(1)
+
 def checkInputArgs(args):
+    if args.kcal is None and args.household is None:
+        logger.error("Either a kcal count or a household file is needed. Terminating ...")
+        sys.exit(1)
+    if args.days < 1 or args.workout < 0 or args.cheatmeals < 0:
+        logger.error("At least one day and no negative numbers of workouts or cheat meals are needed. Terminating ...")
+        sys.exit(1)
     if args.lowcarb and args.keto:
         logger.warning("Lowcarb option has no effect when keto option is set")
+    if args.alternatives is not None and args.alternatives < 1:
+        logger.error("At least one alternative is needed. Terminating ...")
+        sys.exit(1)
+    if args.alternatives and (args.budget is not None or args.optimize):
+        logger.warning("Budget and optimize options have no effect when alternatives are sampled")
+    if args.have and args.legacyunits:
+        logger.warning("Guessed legacy units have no fixed metric per ingredient, the stock is subtracted as given")
+    if args.catalog and args.legacyunits:
+        logger.warning("The units of a catalog are resolved at export, use exportCatalog.py --legacyunits instead")
+    if args.catalog and args.have:
+        logger.warning("Meals are not ranked by stock when reading a catalog, the stock is only subtracted")
 
 def checkPythonVersion():
-    # Check if Python >= 3.5 is installed
-    if sys.version_info < (3, 5, 0):
-        sys.stderr.write("You need Python 3.5 or greater to run this script \n")
+    # Check if Python >= 3.8 is installed, e.g. for shared memory and cached properties
+    if sys.version_info < (3, 8, 0):
+        sys.stderr.write("You need Python 3.8 or greater to run this script \n")
         sys.exit(1)
 
-def convertMealToObject(mealName, mealData, IngredientObjectList):
+def convertMealToObject(mealName, mealData, IngredientObjectList, unitMode = UNITMODE.EXPLICIT):
     """
-    Converts the dictionary meal into an object of meal class.
+    Converts the dictionary meal into an object of meal class. The gram and macro factor of 
+    every ingredient are resolved according to the given UNITMODE.
 
     Input: dict
         ingredient1: amount,
@@ -79,7 +142,7 @@ def convertMealToObject(mealName, mealData, IngredientObjectList):
         
         # every option is resolved individually
         for option in mealData['options']:
-            choosenIngredients = convertOptionToIngredientList(option, IngredientObjectList)  
+            choosenIngredients = convertOptionToIngredientList(option, IngredientObjectList, unitMode)
             if choosenIngredients == []:
                 logger.error("Meal {} could not be resolved because given options could not be resolved. Please adapt the yaml config".format(mealName))
                 sys.exit(1)
@@ -96,8 +159,8 @@ def convertMealToObject(mealName, mealData, IngredientObjectList):
     if "optional" in mealData:
         coinFlip = random.randint(0,1)
         if(coinFlip):
-            for key, value in enumerate(mealData["optional"]):
-                mealData[key] = value
+            for optionalIngredient in mealData["optional"] or []:
+                mealData.update(optionalIngredient)
         del mealData['optional']
         
     # catch and handle pre workout tag
@@ -118,7 +181,10 @@ def convertMealToObject(mealName, mealData, IngredientObjectList):
     for ingredient in mealData.keys():
         ingredientObject = getIngredientObject(IngredientObjectList, ingredient)
         if ingredientObject:
+            # every meal needs its own copy, the amount differs between meals
+            ingredientObject = copy.copy(ingredientObject)
             ingredientObject.amount = mealData[ingredient]
+            resolveUnitFactors(ingredientObject, unitMode)
             ingredientList.append(ingredientObject)
         else:
             logger.warning("Meal {} could not be resolved because ingredient {} in not be found in the ingredient list.".format(mealName, ingredient))
@@ -139,7 +205,11 @@ def convertIngredientToObject(ingredientName, ingredientData):
         fat: amount
         protein: amount
         kcal: amount
-        metric: {gram, unit} (optional)
+        metric: {gram, ml, piece} (optional, defaults to gram)
+        pieceWeight: gram per piece (required for metric piece)
+        density: gram per ml (optional for metric ml, defaults to 1)
+        price: price of one package (optional)
+        package: amount in one package, defaults to 1 (optional)
 
     output: object class ingredient
     """
@@ -152,9 +222,14 @@ def convertIngredientToObject(ingredientName, ingredientData):
     fat = getValueFromDictionary(ingredientData, ingredientName, "fat")
     protein = getValueFromDictionary(ingredientData, ingredientName, "protein")
 
+    price, packageSize = getPriceFromDictionary(ingredientData, ingredientName)
+    metric, gramFactor = getMetricFromDictionary(ingredientData, ingredientName)
+
     # create object if extracted ingredient data are valid
-    if isIngredientDataValid(kcal, carbs, protein, fat, ingredientName):
-        ingredientObject = ingredient(name, int(kcal), int(carbs), int(protein), int(fat))
+    if isIngredientDataValid(kcal, carbs, protein, fat, ingredientName) and metric:
+        ingredientObject = ingredient(name, int(kcal), int(carbs), int(protein), int(fat), \
+                                      price = price, packageSize = packageSize, \
+                                      metric = metric, gramFactor = gramFactor)
 
     return ingredientObject
 
@@ -176,6 +251,60 @@ def getValueFromDictionary(dictionary, dictionaryName, key):
         print("\n\n")
     return value
 
+def getPriceFromDictionary(ingredientData, ingredientName):
+    """
+    Gets the optional price and package size of the given ingredient. Returns None as price if 
+    the price is missing or invalid.
+    """
+    price = ingredientData.get("price")
+    packageSize = ingredientData.get("package", 1)
+
+    if price is None:
+        return None, 1
+
+    if not is_number(price) or not is_number(packageSize) or float(packageSize) <= 0:
+        logger.warning('Price "{}" or package "{}" of Ingredient {} is invalid. The price will be ignored' \
+                       .format(price, packageSize, ingredientName))
+        return None, 1
+
+    return float(price), float(packageSize)
+
+def getMetricFromDictionary(ingredientData, ingredientName):
+    """
+    Gets the measuring unit of the given ingredient and resolves it to gram per unit. 
+    Returns None as metric if the unit data are invalid.
+    """
+    metricName = ingredientData.get("metric", METRIC.GRAM.value)
+    try:
+        metric = METRIC(metricName)
+    except ValueError:
+        logger.warning('Metric "{}" of Ingredient {} is unknown. Ingredient will be ignored'.format(metricName, ingredientName))
+        return None, None
+
+    if metric == METRIC.PIECE:
+        gramFactor = ingredientData.get("pieceWeight")
+    elif metric == METRIC.ML:
+        gramFactor = ingredientData.get("density", 1)
+    else:
+        gramFactor = 1
+
+    if gramFactor is None or not is_number(gramFactor) or float(gramFactor) <= 0:
+        logger.warning('Ingredient {} of metric {} has no valid weight. Ingredient will be ignored'.format(ingredientName, metric.value))
+        return None, None
+
+    return metric, float(gramFactor)
+
+def resolveUnitFactors(ingredientObject, unitMode):
+    """
+    Resolves the gram and macro factor of the given meal ingredient. The legacy mode guesses
+    the unit from the amount: amounts above 10 are gram, smaller amounts are pieces of 100 
+    gram whose macros are given per piece.
+    """
+    if unitMode == UNITMODE.LEGACY:
+        isGram = ingredientObject.amount > 10
+        ingredientObject.gramFactor = 1 if isGram else 100
+        ingredientObject.macroFactor = MACROFACTOR[METRIC.GRAM if isGram else METRIC.PIECE]
+
 def getIngredientObject(ingredientObjectList, ingredientName):
     """
     Tries to extract and return the requested ingredient from ingredientObjectList. Returns
@@ -229,7 +358,7 @@ def is_number(s):
     except ValueError:
         return False
 
-def convertOptionToIngredientList(optionsList, IngredientObjectList):
+def convertOptionToIngredientList(optionsList, IngredientObjectList, unitMode = UNITMODE.EXPLICIT):
     """
     Converts a dictionary of ingredient options into a list of list of ingredient objects
 
@@ -264,7 +393,9 @@ def convertOptionToIngredientList(optionsList, IngredientObjectList):
     for optionIngredient in option:
         optionIngredientObject = getIngredientObject(IngredientObjectList, optionIngredient)
         if optionIngredientObject:
+            optionIngredientObject = copy.copy(optionIngredientObject)
             optionIngredientObject.amount = option[optionIngredient]
+            resolveUnitFactors(optionIngredientObject, unitMode)
             resolvedOption.append(optionIngredientObject)
         else:
             resolvedOption = []
@@ -298,6 +429,67 @@ def separateMeals(mealList):
             
     return postWorkoutMealList, preWorkoutMealList, regularMealList
 
+def parsePantry(pantryString):
+    """
+    Parses the stock given on the command line and returns it as dictionary. Amounts are given
+    in the metric of the ingredient, a trailing g gives them in gram instead. Exits if an item
+    has no name or no finite, positive amount.
+
+    Input: str
+        "ingredient1=amount,ingredient2=amount g,..."
+
+    output: dict
+        ingredient1: (amount, inGram),
+        ingredient2: (amount, inGram),
+        ...
+    """
+    pantry = {}
+    for item in pantryString.split(","):
+        ingredientName, separator, amount = item.partition("=")
+        amount = amount.strip()
+        inGram = amount.endswith("g")
+        if inGram:
+            amount = amount[:-1].strip()
+        if not separator or not ingredientName.strip() or not is_number(amount) \
+                or not math.isfinite(float(amount)) or float(amount) <= 0:
+            logger.error("Stock item '{}' is not of the form ingredient=amount with a positive amount. " \
+                         "Terminating ...".format(item))
+            sys.exit(1)
+        amount = float(amount)
+        pantry[ingredientName.strip()] = (int(amount) if amount.is_integer() else amount, inGram)
+    return pantry
+
+def convertPantryToMetric(pantry, ingredientObjectList):
+    """
+    Converts the parsed stock to the metric of every ingredient, the unit of the meal amounts
+    and the grocery list. Gram amounts are divided by the gram per unit of the ingredient.
+    Unknown ingredients are logged and skipped.
+
+    output: dict
+        ingredient1: amount in the metric of ingredient1,
+        ...
+    """
+    convertedPantry = {}
+    for ingredientName, (amount, inGram) in pantry.items():
+        ingredientObject = getIngredientObject(ingredientObjectList, ingredientName)
+        if not ingredientObject:
+            logger.warning("Stock item {} is not in the ingredient list and will be ignored".format(ingredientName))
+            continue
+        convertedPantry[ingredientName] = amount / ingredientObject.gramFactor if inGram else amount
+    return convertedPantry
+
+def subtractPantry(groceryDict, pantry):
+    """
+    Subtracts the stock, converted by convertPantryToMetric, from the given grocery amounts and
+    removes items that are fully in stock.
+    """
+    remainingGroceryDict = {}
+    for ingredientName, amount in groceryDict.items():
+        remainingAmount = amount - pantry.get(ingredientName, 0)
+        if remainingAmount > 0:
+            remainingGroceryDict[ingredientName] = remainingAmount
+    return remainingGroceryDict
+
 def getRandomOption(options):
     return random.choice(options)
 
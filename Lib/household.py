@@ -0,0 +1,63 @@
+import logging
+import sys
+
+
+logger = logging.getLogger(__name__)
+
+def registerHouseholdLogger(Logger):
+    global logger
+    logger = Logger
+
+
+def getHouseholdMembers(householdDict):
+    """
+    Validates the members of the household yaml and returns them with defaults for the
+    optional diet flags. Exits if a member has no valid kcal count.
+
+    Input: dictionary
+        Member1 {
+                    kcal: amount,
+                    lowcarb: bool (optional),
+                    keto: bool (optional)
+                },
+
+        Member2 ...
+
+    output: dict
+        Member1: {kcal: amount, lowcarb: bool, keto: bool},
+        Member2: ...
+    """
+    if not isinstance(householdDict, dict) or not householdDict:
+        logger.error("The household yaml contains no members. Terminating ...")
+        sys.exit(1)
+
+    members = {}
+    for memberName, memberData in householdDict.items():
+        kcal = memberData.get("kcal") if isinstance(memberData, dict) else None
+        if not isinstance(kcal, (int, float)) or isinstance(kcal, bool) or kcal <= 0:
+            logger.error("Household member {} needs a positive kcal value. Terminating ...".format(memberName))
+            sys.exit(1)
+        members[memberName] = {
+            "kcal": kcal,
+            "lowcarb": bool(memberData.get("lowcarb", False)),
+            "keto": bool(memberData.get("keto", False)),
+        }
+    return members
+
+
+def getHouseholdDiet(members):
+    """
+    Returns the diet flags (lowcarb, keto) every member can eat. Keto meals are a subset of
+    lowcarb meals, so the strictest diet of any member wins.
+    """
+    keto = any(member["keto"] for member in members.values())
+    lowcarb = not keto and any(member["lowcarb"] for member in members.values())
+    return lowcarb, keto
+
+
+def getPortionFactors(members, referenceKcal):
+    """
+    Returns the portion factor of every member, the share of a meal portion that is planned for
+    a person of the reference kcal count.
+    """
+    return {memberName: member["kcal"] / referenceKcal for memberName, member in members.items()}
@@ -0,0 +1,240 @@
+import copy
+import logging
+import time
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+def registerMacroOptimizerLogger(Logger):
+    global logger
+    logger = Logger
+
+
+# Objectives of a meal plan, all of them are minimized
+OBJECTIVES = ("kcalError", "macroError", "repetition", "cost")
+
+
+def getMacroArray(mealList):
+    """
+    Returns the macros of the given meals as array of shape (number of meals, 4) with the
+    columns kcal, carb, protein and fat.
+    """
+    return np.array([[meal.kcal, meal.carb, meal.protein, meal.fat] for meal in mealList], \
+                    dtype = float).reshape(-1, 4)
+
+
+def getPlanSums(mealCounts, mealData):
+    """
+    Returns the sums of the given plans, see getObjectives.
+
+    Input:
+        mealCounts: array (plans, meals), how often every meal is part of the plan
+        mealData: array (meals, 8), see getMealData
+    """
+    planSums = mealCounts @ mealData
+    planSums[:, 5] = (mealCounts > 0).sum(axis = 1)
+    return planSums
+
+
+def getMealData(mealList, penalties = None):
+    """
+    Returns what every meal adds to the sums of a plan as array of shape (number of meals, 8)
+    with the columns kcal, carb, protein, fat, meal number, 0 for the unique meal number that
+    only grows with the first portion of a meal, repetition penalty and cost.
+    """
+    mealData = np.zeros((len(mealList), 8))
+    mealData[:, :4] = getMacroArray(mealList)
+    mealData[:, 4] = 1
+    if penalties is not None:
+        mealData[:, 6] = penalties
+    mealData[:, 7] = [meal.cost for meal in mealList]
+    return mealData
+
+
+def getObjectives(planSums, targets):
+    """
+    Evaluates the objectives of many plans at once from their sums, so a plan that changes by
+    one meal is evaluated without looking at its other meals.
+
+    Input:
+        planSums: array (plans, 8), summed kcal, carb, protein, fat, number of meals, number of
+                  distinct meals, repetition penalties, e.g. of the plan history, and cost of
+                  every plan
+        targets: array (4), target kcal, carb, protein and fat. The kcal target has to be
+                 positive, macro targets of 0 are ignored.
+
+    output: array (plans, 4) with the columns of OBJECTIVES
+        kcalError - relative deviation from the kcal target
+        macroError - mean relative deviation from the given macro targets
+        repetition - share of repeated meals in the plan plus the mean penalty of its meals,
+                     0 means every meal is unique and without penalty
+        cost - estimated cost of the plan
+    """
+    objectives = np.empty((planSums.shape[0], 4))
+    objectives[:, 0] = np.abs(planSums[:, 0] - targets[0]) / targets[0]
+
+    macroMask = targets[1:] > 0
+    if macroMask.any():
+        macroTargets = targets[1:][macroMask]
+        macroErrors = np.abs(planSums[:, 1:4][:, macroMask] - macroTargets) / macroTargets
+        objectives[:, 1] = macroErrors.mean(axis = 1)
+    else:
+        objectives[:, 1] = 0
+
+    objectives[:, 2] = (planSums[:, 4] - planSums[:, 5] + planSums[:, 6]) / np.maximum(planSums[:, 4], 1)
+    objectives[:, 3] = planSums[:, 7]
+    return objectives
+
+
+def getParetoFront(objectives):
+    """
+    Returns the indices of all plans that are not dominated by another plan.
+    """
+    isDominated = np.zeros(len(objectives), dtype = bool)
+    for index in range(len(objectives)):
+        dominators = np.all(objectives <= objectives[index], axis = 1) & \
+                     np.any(objectives < objectives[index], axis = 1)
+        isDominated[index] = dominators.any()
+    return np.flatnonzero(~isDominated)
+
+
+def optimizeMealPlans(mealList, targetKcal, targetCarb = 0, targetProtein = 0, targetFat = 0, \
+                      iterations = 2000, timeBudget = 2.0, chains = 32, maxRepeat = 2, \
+                      frontSize = 5, seed = None, penalties = None):
+    """
+    Searches meal plans that meet the kcal and macro targets at once and returns a small Pareto
+    front of them.
+
+    Every chain of the simulated annealing holds one plan as vector of meal counts. The chains
+    weight the objectives differently and are advanced together: in every iteration each chain
+    adds or removes one random meal, the sums of the plans are updated by this meal only and
+    the move is accepted by the metropolis rule. Every 64 iterations the plans of the chains
+    are added to an archive of the non dominated plans. The search stops after the given
+    number of iterations or when the time budget in seconds is used up.
+
+    Input:
+        mealList: list of resolved objects of class meal
+        targetKcal, targetCarb, targetProtein, targetFat: targets of the whole plan, macro
+            targets of 0 are ignored
+        maxRepeat: how often a meal may be part of one plan
+        penalties: list of repetition penalties of the meals in mealList, e.g. of the plan
+                   history, they are added to the repetition objective
+
+    output: list of plans sorted by kcal and macro error, empty if no meals are given or the
+            kcal target needs no meals, e.g. because cheat meals cover it
+        [
+            {
+                meals: list of objects of class meal,
+                kcalError: relative deviation from the kcal target,
+                macroError: mean relative deviation from the macro targets,
+                repetition: share of repeated meals,
+                cost: estimated cost
+            },
+            ...
+        ]
+    """
+    if not mealList:
+        return []
+    if targetKcal <= 0:
+        logger.info("A kcal target of {} needs no meals".format(targetKcal))
+        return []
+
+    rng = np.random.default_rng(seed)
+    mealData = getMealData(mealList, penalties)
+    targets = np.array([targetKcal, targetCarb, targetProtein, targetFat], dtype = float)
+    mealNumber = len(mealList)
+    chainIndices = np.arange(chains)
+
+    # start with random plans of roughly the right size
+    planSize = max(1, int(round(targetKcal / max(mealData[:, 0].mean(), 1))))
+    mealCounts = np.zeros((chains, mealNumber), dtype = np.int32)
+    for startMeal in rng.integers(0, mealNumber, size = (planSize, chains)):
+        mealCounts[chainIndices, startMeal] = np.minimum(mealCounts[chainIndices, startMeal] + 1, maxRepeat)
+    # sums of every chain, a move only updates them by the added or removed meal
+    planSums = getPlanSums(mealCounts, mealData)
+
+    # every chain weights the objectives differently to spread along the front
+    weights = rng.dirichlet(np.ones(len(OBJECTIVES)), size = chains)
+    costScale = max(mealData[:, 7].mean() * planSize, 1e-9)
+    scale = np.array([1, 1, 1, costScale])
+
+    scores = (getObjectives(planSums, targets) / scale * weights).sum(axis = 1)
+    archive = updateArchive({}, mealCounts, mealData, targets)
+
+    startTime = time.perf_counter()
+    for iteration in range(iterations):
+        temperature = 0.05 * (1 - iteration / iterations) + 1e-4
+
+        # propose to add or remove one meal per chain
+        moveMeals = rng.integers(0, mealNumber, size = chains)
+        moveDeltas = rng.choice((-1, 1), size = chains)
+        oldCounts = mealCounts[chainIndices, moveMeals]
+        newCounts = oldCounts + moveDeltas
+        validMoves = (newCounts >= 0) & (newCounts <= maxRepeat)
+        moveDeltas = np.where(validMoves, moveDeltas, 0)
+        newCounts = oldCounts + moveDeltas
+
+        newPlanSums = planSums + moveDeltas[:, None] * mealData[moveMeals]
+        newPlanSums[:, 5] += (newCounts > 0).astype(int) - (oldCounts > 0)
+        newScores = (getObjectives(newPlanSums, targets) / scale * weights).sum(axis = 1)
+
+        acceptance = np.exp(np.minimum(0, scores - newScores) / temperature)
+        accepted = validMoves & (rng.random(chains) < acceptance)
+        mealCounts[chainIndices[accepted], moveMeals[accepted]] = newCounts[accepted]
+        planSums[accepted] = newPlanSums[accepted]
+        scores[accepted] = newScores[accepted]
+
+        if iteration % 64 == 63:
+            archive = updateArchive(archive, mealCounts, mealData, targets)
+            if time.perf_counter() - startTime > timeBudget:
+                logger.info("Optimizer time budget used up after {} iterations".format(iteration + 1))
+                break
+    archive = updateArchive(archive, mealCounts, mealData, targets)
+
+    archivePlans = list(archive.values())
+    archiveObjectives = np.array([planObjectives for _, _, planObjectives in archivePlans]).reshape(-1, 4)
+    front = np.argsort(archiveObjectives[:, 0] + archiveObjectives[:, 1], kind = "stable")[:frontSize]
+
+    plans = []
+    for planIndex in front:
+        mealIndices, planCounts, planObjectives = archivePlans[planIndex]
+        plan = {"meals": []}
+        for mealIndex, count in zip(mealIndices, planCounts):
+            for _ in range(count):
+                plan["meals"].append(copy.deepcopy(mealList[mealIndex]))
+        for objectiveName, value in zip(OBJECTIVES, planObjectives):
+            plan[objectiveName] = round(float(value), 4)
+        plans.append(plan)
+    return plans
+
+
+def updateArchive(archive, mealCounts, mealData, targets):
+    """
+    Adds the current plans of all chains to the archive and keeps only the non dominated plans,
+    so the archive stays as small as the front instead of growing with the iterations. The
+    plans are stored sparse as meal indices and counts.
+
+    Input:
+        archive: dict, see output
+        mealCounts: array (chains, meals), current plan of every chain
+        mealData: array (meals, 8), see getMealData
+        targets: array (4), target kcal, carb, protein and fat
+
+    output: dict
+        (meal indices bytes, counts bytes): (meal indices, counts, objectives)
+    """
+    candidates = dict(archive)
+    for chainCounts in mealCounts:
+        mealIndices = np.flatnonzero(chainCounts)
+        planCounts = chainCounts[mealIndices]
+        key = (mealIndices.tobytes(), planCounts.tobytes())
+        if len(mealIndices) and key not in candidates:
+            planObjectives = getObjectives(getPlanSums(planCounts[None, :], mealData[mealIndices]), targets)[0]
+            candidates[key] = (mealIndices, planCounts, planObjectives)
+    if not candidates:
+        return candidates
+
+    candidateList = list(candidates.items())
+    front = getParetoFront(np.array([planObjectives for _, (_, _, planObjectives) in candidateList]))
+    return dict(candidateList[index] for index in front)
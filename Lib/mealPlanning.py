@@ -0,0 +1,261 @@
+import copy
+import logging
+import numpy as np
+import random
+import yaml
+
+from enum import Enum
+
+from Lib.budgetSelection import chooseMealsWithinBudget
+from Lib.energyBudget import energyBudget
+from Lib.feasibilityIndex import getFeasibilityIndex
+from Lib.helperFunctions import improveChoosenMealList
+from Lib.helperFunctions import separateMeals
+from Lib.macroOptimizer import optimizeMealPlans
+from Lib.planSampling import samplePlans
+
+
+logger = logging.getLogger(__name__)
+
+def registerMealPlanningLogger(Logger):
+    global logger
+    logger = Logger
+
+
+# Kcal per carb treshold, a higher treshold allows less carbs
+class TRESHOLD(Enum):
+    LOWCARB = 8
+    KETO = 20
+
+
+def resolveMealList(mealObjectList):
+    """
+    Calculates the macro nutrition of every meal of the given list.
+    """
+    for meal in list(mealObjectList):
+        meal.resolveMacros()
+    return mealObjectList
+
+def applyLowcarbFilter(mealObjectList):
+    """
+    Filters non lowcarb meals from the given list and returns the reduced list.
+    Lowcarb meals have a kcal to carb ratio that exceed the defined treshold.
+    """
+    return applyCarbFilter(mealObjectList, TRESHOLD.LOWCARB)
+
+
+def applyKetoFilter(mealObjectList):
+    """
+    Filters non keto meals from the given list and returns the reduced list.
+    Keto meals have a kcal to carb ratio that exceed the defined treshold.
+    """
+    return applyCarbFilter(mealObjectList, TRESHOLD.KETO)
+
+
+def applyCarbFilter(mealObjectList, treshold):
+    """
+    Keeps the meals whose kcal to carb ratio exceeds the given TRESHOLD. Meals without carbs
+    always pass.
+    """
+    filteredMealObjectList = []
+    filteredMealNames = []
+    for meal in mealObjectList:
+        if meal.kcal > treshold.value * meal.carb:
+            filteredMealObjectList.append(meal)
+        else:
+            filteredMealNames.append(meal.name)
+    # dumping the names of large catalogs is expensive, only do it if it is printed
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Meals removed by {} filter: \n{}".format(treshold.name.lower(), yaml.dump(filteredMealNames)))
+    return filteredMealObjectList
+
+
+def chooseWorkoutMeals(workoutMealList, workouts, workoutPhase):
+    """
+    Randomly chooses one meal of the given pre or post workout meals per workout. Returns no
+    meals if the diet filter removed all of them.
+    """
+    if workouts and not workoutMealList:
+        logger.warning("No {} workout meals are left after the diet filter, the workouts get no {} workout meals" \
+                       .format(workoutPhase, workoutPhase))
+        return []
+    return [random.choice(workoutMealList) for i in range(workouts)]
+
+
+def chooseMeals(mealList, args, preferredMealNames = (), history = None, pantry = None, groceryScale = 1):
+    """
+    Randomly chooses meals from the given meal list until the target kcal count is reached. 
+    The plan is configured by the parsed input arguments args, the regular meals cover the
+    regular kcal of the energyBudget, i.e. without the workout extras and the cheat meals of
+    every day. The meals are chosen for the whole plan and then split into days against the
+    daily targets of the energyBudget.
+    The tolerated kcal deviation in both directions is 200 Kcal, for the plan and for every
+    day. The function tries to meet this requirement. Meals named in preferredMealNames are chosen first in the given order.
+    If a plan history is given, recently and frequently chosen meals are less likely to be
+    chosen again. Meals after which no combination of the catalog reaches the target anymore
+    are skipped, as long as the meals do not have to be repeated. This pruning is a heuristic,
+    the catalog still contains the meals chosen before. With a budget, the grocery costs are
+    estimated for the given stock and groceryScale, e.g. the portions of a household.
+    #TODO [FEATURE] Currently, the choosing function is pretty dump. Create some smarter
+                    algorithm that matches the target kcal better
+    #TODO [MNT] This function does too much at once and is pretty dirty overall. Refactor!
+    """
+    mealCatalog = mealList
+    postWorkoutMealList, preWorkoutMealList, mealList = separateMeals(mealList)
+
+    mealListCopy = list(mealList)
+    choosenMealList = []
+    budget = energyBudget.fromArgs(args, postWorkoutMealList, preWorkoutMealList)
+    logger.info("Energy budget: {}".format(budget))
+    targetKcal = budget.regularKcal
+    currentKcal = 0
+    mealsDuplicated = False
+
+    # add post workout meals, they come on top of the regular meals
+    choosenMealList.extend(chooseWorkoutMeals(postWorkoutMealList, args.workout, "post"))
+    # pre workout meals are added last, they are chosen first so the budget knows their costs
+    preWorkoutChoice = chooseWorkoutMeals(preWorkoutMealList, args.workout, "pre")
+
+    # add preferred meals first
+    preferredMealList = [meal for mealName in preferredMealNames for meal in mealList \
+                         if meal.name == mealName]
+
+    # choose the meals within the budget instead of randomly
+    if args.budget is not None:
+        weights = [history.getWeight(meal.name) for meal in mealList] if history else None
+        budgetMealList = chooseMealsWithinBudget(mealList, targetKcal, args.budget, \
+                                                 choosenMealList + preWorkoutChoice, preferredMealList, \
+                                                 weights, pantry, groceryScale)
+        choosenMealList.extend(budgetMealList)
+        currentKcal += sum(meal.kcal for meal in budgetMealList)
+
+    # choose the best plan of the pareto front of the macro optimizer
+    elif args.optimize:
+        penalties = [history.getPenalty(meal.name) for meal in mealList] if history else None
+        paretoFront = optimizeMealPlans(mealList, targetKcal, \
+                                        args.days * args.carbs, args.days * args.protein, \
+                                        args.days * args.fat, args.iterations, args.timebudget, \
+                                        seed = random.getrandbits(32), penalties = penalties)
+        logger.info("Pareto front of meal plans: \n{}".format(yaml.dump( \
+            [dict(plan, meals = [meal.name for meal in plan["meals"]]) for plan in paretoFront])))
+        if paretoFront:
+            choosenMealList.extend(paretoFront[0]["meals"])
+            currentKcal += sum(meal.kcal for meal in paretoFront[0]["meals"])
+
+    # add meals until target kcal is reached
+    else:
+        feasibilityIndex = getFeasibilityIndex(mealCatalog, mealList, targetKcal)
+        isFeasible = feasibilityIndex.isFeasible(targetKcal)
+        if isFeasible:
+            logger.info("Plan needs between {} and {} meals".format(*feasibilityIndex.getMealCountRange(targetKcal)))
+        else:
+            logger.warning("Target kcal can not be met without repetition: {}".format( \
+                feasibilityIndex.explainInfeasibility(targetKcal)))
+
+        while currentKcal < targetKcal - 200:
+            candidateMealList = mealListCopy
+            # prune meals after which no combination of the catalog hits the target anymore.
+            # The index also counts meals that are already used up, so this is a heuristic:
+            # it never prunes a meal that could still work, but may keep one that can not
+            if isFeasible and not mealsDuplicated:
+                remainingKcal = targetKcal - currentKcal - np.array([meal.kcal for meal in mealListCopy])
+                reachableMask = feasibilityIndex.isWindowReachable(np.rint(remainingKcal).astype(np.int64))
+                if reachableMask.any():
+                    candidateMealList = [meal for meal, reachable in zip(mealListCopy, reachableMask) if reachable]
+
+            if preferredMealList:
+                choosenMeal = preferredMealList.pop(0)
+            elif history:
+                weights = [history.getWeight(meal.name) for meal in candidateMealList]
+                choosenMeal = random.choices(candidateMealList, weights)[0]
+            else:
+                choosenMeal = random.choice(candidateMealList)
+            choosenMealList.append(copy.deepcopy(choosenMeal))
+            currentKcal += choosenMeal.kcal
+            mealListCopy.remove(choosenMeal)
+            if not mealListCopy:
+                mealListCopy = list(mealList)
+                mealsDuplicated = True
+    if currentKcal - targetKcal > 200:
+        choosenMealList = improveChoosenMealList(mealList, choosenMealList)
+
+    if mealsDuplicated:
+        logger.warning("Not enough meals specified to meet the given amounts of days and kcal without repetition")
+
+    checkDailyTargets(budget, choosenMealList + preWorkoutChoice)
+
+    # add pre workout meals
+    choosenMealList.extend(preWorkoutChoice)
+
+    return choosenMealList
+
+
+def checkDailyTargets(budget, choosenMealList, tolerance = 200):
+    """
+    Splits the given plan into days against the daily targets of the given energyBudget, logs
+    the meals per day and warns about every day off its target by more than the tolerance.
+    """
+    postWorkoutMealList, preWorkoutMealList, regularMealList = separateMeals(choosenMealList)
+    dailyMealLists = budget.assignMealsToDays(regularMealList, postWorkoutMealList, preWorkoutMealList)
+    dailyDeviations = budget.getDailyDeviations(dailyMealLists)
+    if logger.isEnabledFor(logging.INFO):
+        dailyMealNames = {"day {}".format(day): [meal.name for meal in dailyMealList] \
+                          for day, dailyMealList in enumerate(dailyMealLists, start = 1)}
+        logger.info("Meals per day: \n{}".format(yaml.dump(dailyMealNames, sort_keys = False)))
+    for day, deviation in enumerate(dailyDeviations, start = 1):
+        if abs(deviation) > tolerance:
+            logger.warning("Day {} deviates from its target of {} kcal by {} kcal".format(day, \
+                           round(budget.dailyTargets[day - 1]), round(deviation)))
+    return dailyMealLists
+
+
+def chooseAlternativeMeals(mealList, args, history = None):
+    """
+    Chooses args.alternatives distinct meal plans from the given meal list in one call. The
+    workout meals are chosen once and shared by all plans, the regular meals of all plans are
+    sampled at once for the regular kcal of the energyBudget. If a plan history is given, it
+    weights the sampling like in chooseMeals.
+
+    output: list of chosen meal lists, the plan closest to the target kcal count first
+    """
+    postWorkoutMealList, preWorkoutMealList, mealList = separateMeals(mealList)
+    postWorkoutChoice = chooseWorkoutMeals(postWorkoutMealList, args.workout, "post")
+    preWorkoutChoice = chooseWorkoutMeals(preWorkoutMealList, args.workout, "pre")
+
+    targetKcal = energyBudget.fromArgs(args, postWorkoutMealList, preWorkoutMealList).regularKcal
+    weights = [history.getWeight(meal.name) for meal in mealList] if history else None
+    plans = samplePlans(mealList, targetKcal, args.alternatives, weights = weights, seed = random.getrandbits(32))
+    logger.info("Kcal deviation of the alternatives: {}".format([round(plan["kcalError"]) for plan in plans]))
+
+    return [postWorkoutChoice + plan["meals"] + preWorkoutChoice for plan in plans]
+
+
+def generateGroceryList(mealList): 
+    """
+    Generates and returns the final grocery list by looking up and adding the proper amount 
+    of every ingrdient for each chose meal. The duplicates are merged by aggregateGroceryList.
+    """
+    groceryList = []
+    for meal in mealList:
+        groceryList.extend(meal.ingredientList)
+    return groceryList
+
+
+def aggregateGroceryList(groceryObjectList, scale = 1):
+    """
+    Merges the duplicates of the given grocery list and returns the summed amount per item.
+    All amounts are multiplied by the given scale, e.g. the portions of a household.
+
+    output: dict
+        item1: amount,
+        item2: ...
+    """
+    groceryDict = {}
+    for ingredient in groceryObjectList:
+        if ingredient.name in groceryDict:
+            groceryDict[ingredient.name] += ingredient.amount * scale
+        else:
+            groceryDict[ingredient.name] = ingredient.amount * scale
+    if scale != 1:
+        groceryDict = {name: round(amount, 1) for name, amount in groceryDict.items()}
+    return groceryDict
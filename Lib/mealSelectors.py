@@ -0,0 +1,78 @@
+import copy
+import logging
+
+from Lib.mealPlanning import chooseAlternativeMeals
+from Lib.mealPlanning import chooseMeals
+
+
+logger = logging.getLogger(__name__)
+
+def registerMealSelectorsLogger(Logger):
+    global logger
+    logger = Logger
+
+
+# Registered selection strategies by name. Every selector takes the filtered meal list, the
+# parsed input arguments and an optional plan history and returns the chosen meal list.
+MEALSELECTORS = {}
+
+
+def registerMealSelector(selectorName):
+    """
+    Decorator that adds the decorated function to MEALSELECTORS under the given name.
+    """
+    def register(selector):
+        MEALSELECTORS[selectorName] = selector
+        return selector
+    return register
+
+
+def getPlanArgs(args, **overrides):
+    """
+    Returns a copy of the given arguments with the given overrides, so a selector can pick its
+    branch of chooseMeals without touching the arguments of the caller.
+    """
+    planArgs = copy.copy(args)
+    for key, value in overrides.items():
+        setattr(planArgs, key, value)
+    return planArgs
+
+
+@registerMealSelector("random")
+def chooseRandomMeals(mealList, args, history = None):
+    """
+    Random fill of chooseMeals, pruned by the kcal feasibility index.
+    """
+    return chooseMeals(mealList, getPlanArgs(args, budget = None, optimize = False), history = history)
+
+
+@registerMealSelector("budget")
+def chooseBudgetMeals(mealList, args, history = None):
+    """
+    Cheapest meals per kcal within args.budget, without a budget every meal is affordable.
+    """
+    budget = getattr(args, "budget", None)
+    if budget is None:
+        logger.debug("No budget given, every meal is affordable")
+        budget = float("inf")
+    return chooseMeals(mealList, getPlanArgs(args, budget = budget, optimize = False), history = history)
+
+
+@registerMealSelector("optimize")
+def chooseOptimizedMeals(mealList, args, history = None):
+    """
+    Best plan of the pareto front of the macro optimizer.
+    """
+    return chooseMeals(mealList, getPlanArgs(args, budget = None, optimize = True), history = history)
+
+
+@registerMealSelector("sampling")
+def chooseSampledMeals(mealList, args, history = None):
+    """
+    Best of the vectorized sampled plans.
+    """
+    alternativeMealLists = chooseAlternativeMeals(mealList, getPlanArgs(args, alternatives = 1), history)
+    if not alternativeMealLists:
+        logger.warning("Sampling found no plan, no meals are chosen")
+        return []
+    return alternativeMealLists[0]
@@ -0,0 +1,285 @@
+import csv
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import sys
+import unicodedata
+import yaml
+
+from argparse import ArgumentTypeError
+
+from Class.ingredient import MACROFACTOR
+from Lib.helperFunctions import convertIngredientToObject
+from Lib.helperFunctions import getMetricFromDictionary
+from Lib.helperFunctions import isIngredientDataValid
+from Lib.helperFunctions import is_number
+from Lib.outputSinks import createTemporaryFile
+
+
+logger = logging.getLogger(__name__)
+
+def registerNutritionImportLogger(Logger):
+    global logger
+    logger = Logger
+
+
+# Csv column of every ingredient field, overridden by the column mapping of the importer
+DEFAULTCOLUMNS = {"name": "name", "kcal": "kcal", "carbs": "carbs", "fat": "fat", "protein": "protein"}
+
+# Names that are safe as plain yaml keys, everything else is written double quoted
+PLAINYAMLKEY = re.compile(r"[^\W\d_][\w .()/+-]*[\w.()]\Z|[^\W\d_]\Z")
+
+# Plain words yaml would not read as string
+YAMLKEYWORDS = {"y", "n", "yes", "no", "on", "off", "true", "false", "null"}
+
+# Keys of a meal yaml entry that are no ingredients
+SPECIALKEYS = ("options", "optional", "watchList", "postWorkout", "preWorkout")
+
+# Keys of an ingredient yaml entry that describe the unit of the ingredient amounts
+UNITKEYS = ("metric", "pieceWeight", "density")
+
+
+def parseColumnMapping(mappingString):
+    """
+    Parses the column mapping given on the command line and returns the complete mapping with
+    the default column of every field that is not mentioned. Used as argparse type.
+
+    Input: str
+        "field1=column1,field2=column2,..."
+
+    output: dict
+        name: column,
+        kcal: column,
+        ...
+    """
+    columnMapping = dict(DEFAULTCOLUMNS)
+    for item in mappingString.split(","):
+        field, separator, column = item.partition("=")
+        if not separator or field.strip() not in DEFAULTCOLUMNS:
+            raise ArgumentTypeError("Column mapping '{}' is not of the form field=column with field one of {}" \
+                                    .format(item, ", ".join(DEFAULTCOLUMNS)))
+        columnMapping[field.strip()] = column.strip()
+    return columnMapping
+
+
+def normalizeIngredientName(ingredientName):
+    """
+    Returns the name used to detect duplicates: unicode normalized, case folded and with
+    collapsed whitespace.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", ingredientName)).strip().casefold()
+
+
+def getReferencedIngredientNames(mealDict):
+    """
+    Returns the names of all ingredients the given meal dictionary uses, including options and
+    optional ingredients.
+    """
+    ingredientNames = set()
+    for mealData in mealDict.values():
+        ingredientNames.update(key for key in mealData if key not in SPECIALKEYS)
+        for optionGroup in mealData.get("options") or []:
+            for option in optionGroup:
+                ingredientNames.update(option)
+        for optionalIngredient in mealData.get("optional") or []:
+            ingredientNames.update(optionalIngredient)
+    return ingredientNames
+
+
+# class nutritionDatabase -------------------------------------------------------------------------
+#
+#   On disk staging table of imported ingredients. Csv rows are streamed in batches into a sqlite
+#   database keyed by the normalized ingredient name, so memory use does not grow with the input
+#   and the first row of every ingredient wins.
+#
+#       databasePath - path of the sqlite database
+#
+#       batchSize - rows inserted per transaction
+#
+# -------------------------------------------------------------------------------------------------
+
+class nutritionDatabase:
+    def __init__(self, databasePath, batchSize = 5000):
+        self.databasePath = databasePath
+        self.batchSize = batchSize
+
+        self.connection = sqlite3.connect(str(databasePath))
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS ingredients (
+                normalizedName TEXT PRIMARY KEY,
+                rowNumber INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                kcal REAL NOT NULL,
+                carbs REAL NOT NULL,
+                fat REAL NOT NULL,
+                protein REAL NOT NULL
+            );
+        """)
+
+    def __repr__(self):
+        """
+        Overload __repr__ method to enable fancy printing and logger support on print operations.
+        """
+        return "<class: {}, path: {}, ingredients: {}>".format(self.__class__.__name__, \
+                    self.databasePath, self.getIngredientCount())
+
+    def getIngredientCount(self):
+        return self.connection.execute("SELECT COUNT(*) FROM ingredients").fetchone()[0]
+
+    def importCsv(self, csvPath, columnMapping = DEFAULTCOLUMNS, delimiter = ",", decimalComma = False):
+        """
+        Streams the given csv file into the database. Rows failing isIngredientDataValid are
+        skipped, later rows of an already imported ingredient are dropped as duplicates.
+        Exits if a mapped column is missing in the csv header.
+
+        output: tuple
+            number of imported rows, number of invalid rows, number of duplicate rows
+        """
+        importedRows = validRows = invalidRows = 0
+        batch = []
+        with open(csvPath, "r", newline = "", encoding = "utf-8-sig") as fileDeskriptor:
+            reader = csv.DictReader(fileDeskriptor, delimiter = delimiter)
+            missingColumns = [column for column in columnMapping.values() if column not in (reader.fieldnames or [])]
+            if missingColumns:
+                logger.error("Columns {} are missing in {}. Terminating ...".format(missingColumns, csvPath))
+                sys.exit(1)
+
+            for rowNumber, row in enumerate(reader):
+                name = (row[columnMapping["name"]] or "").strip()
+                kcal, carbs, fat, protein = [parseCsvNumber(row[columnMapping[field]], decimalComma) \
+                                             for field in ("kcal", "carbs", "fat", "protein")]
+                if not name or not isIngredientDataValid(kcal, carbs, protein, fat, name) \
+                        or not all(isinstance(value, float) for value in (kcal, carbs, fat, protein)):
+                    invalidRows += 1
+                    continue
+                batch.append((normalizeIngredientName(name), rowNumber, name, kcal, carbs, fat, protein))
+                validRows += 1
+
+                if len(batch) >= self.batchSize:
+                    importedRows += self.insertBatch(batch)
+                    batch = []
+            importedRows += self.insertBatch(batch)
+
+        duplicateRows = validRows - importedRows
+        logger.info("Imported {} ingredients from {}, skipped {} invalid and {} duplicate rows" \
+                    .format(importedRows, csvPath, invalidRows, duplicateRows))
+        return importedRows, invalidRows, duplicateRows
+
+    def insertBatch(self, batch):
+        """
+        Inserts the given rows, keeping existing ingredients. Returns the number of new rows.
+        """
+        countBefore = self.connection.total_changes
+        with self.connection:
+            self.connection.executemany("INSERT OR IGNORE INTO ingredients VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+        return self.connection.total_changes - countBefore
+
+    def iterateIngredients(self):
+        """
+        Yields every imported ingredient in the order of the csv as name and dictionary in the
+        format of the ingredient yaml.
+        """
+        cursor = self.connection.execute("SELECT name, kcal, carbs, fat, protein FROM ingredients ORDER BY rowNumber")
+        for name, kcal, carbs, fat, protein in cursor:
+            yield name, getIngredientData(kcal, carbs, fat, protein)
+
+    def writeIngredientYaml(self, yamlPath):
+        """
+        Writes all imported ingredients entry by entry in the format of the ingredient yaml. The
+        entries go to a temporary file that replaces the yaml file once it is complete.
+        """
+        fileDeskriptor, temporaryPath = createTemporaryFile(yamlPath)
+        try:
+            with os.fdopen(fileDeskriptor, "w", encoding = "utf-8") as stream:
+                for name, ingredientData in self.iterateIngredients():
+                    stream.write(formatIngredientEntry(name, ingredientData))
+            os.replace(temporaryPath, yamlPath)
+        except BaseException:
+            os.unlink(temporaryPath)
+            raise
+
+    def getIngredientObjectList(self, ingredientNames, unitDict = None):
+        """
+        Looks up the given ingredient names by their normalized name and returns objects of class
+        ingredient named like requested. Names without imported data are logged and skipped.
+        The imported data are given per 100 gram, the units of the meal amounts are taken from
+        the matching entry of unitDict, e.g. the ingredient yaml, see applyUnitData. Ingredients
+        without entry are read as gram.
+        """
+        unitDict = {normalizeIngredientName(name): data for name, data in (unitDict or {}).items()}
+        ingredientObjectList = []
+        for ingredientName in sorted(ingredientNames):
+            match = self.connection.execute("SELECT kcal, carbs, fat, protein FROM ingredients WHERE normalizedName = ?", \
+                                            (normalizeIngredientName(ingredientName),)).fetchone()
+            if match is None:
+                logger.warning("Ingredient {} is not in the imported nutrition data".format(ingredientName))
+                continue
+            unitData = unitDict.get(normalizeIngredientName(ingredientName))
+            if unitData is None:
+                logger.warning("Ingredient {} has no unit data, its amounts are read as gram".format(ingredientName))
+                unitData = {}
+            ingredientData = applyUnitData(ingredientName, getIngredientData(*match), unitData)
+            if ingredientData is None:
+                continue
+            ingredientObject = convertIngredientToObject(ingredientName, ingredientData)
+            if ingredientObject:
+                ingredientObjectList.append(ingredientObject)
+        return ingredientObjectList
+
+    def close(self):
+        self.connection.close()
+
+
+def applyUnitData(ingredientName, ingredientData, unitData):
+    """
+    Returns the imported ingredient data with the unit keys of the given unitData. The macros
+    per 100 gram are converted to the reference of the unit: per 100 ml for ml and per piece
+    for piece ingredients. Returns None if the unit data are invalid.
+    """
+    unitData = {key: unitData[key] for key in UNITKEYS if key in unitData}
+    metric, gramFactor = getMetricFromDictionary(unitData, ingredientName)
+    if metric is None:
+        return None
+
+    scale = gramFactor / (100 * MACROFACTOR[metric])
+    macros = getIngredientData(*[round(ingredientData[key] * scale, 2) for key in ("kcal", "carbs", "fat", "protein")])
+    return dict(macros, **unitData)
+
+
+def formatIngredientEntry(name, ingredientData):
+    """
+    Returns the ingredient as entry of the ingredient yaml. The key is formatted directly, the
+    values are emitted by yaml.safe_dump, so every number reads back as the same number.
+    """
+    if PLAINYAMLKEY.match(name) and name.lower() not in YAMLKEYWORDS:
+        key = name
+    else:
+        key = json.dumps(name, ensure_ascii = False)
+    values = yaml.safe_dump(ingredientData, default_flow_style = False, sort_keys = False)
+    lines = ["{}:".format(key)]
+    lines.extend("  " + line for line in values.splitlines())
+    return "\n".join(lines) + "\n\n"
+
+
+def parseCsvNumber(value, decimalComma = False):
+    """
+    Converts a csv cell to float if it holds a finite number, so isIngredientDataValid sees
+    numbers like in the yaml files. Other cells are returned unchanged and rejected.
+    """
+    value = (value or "").strip()
+    if decimalComma:
+        value = value.replace(",", ".")
+    if is_number(value) and math.isfinite(float(value)):
+        return float(value)
+    return value
+
+
+def getIngredientData(kcal, carbs, fat, protein):
+    """
+    Returns the macros as dictionary in the format of the ingredient yaml, whole numbers as int.
+    """
+    ingredientData = {"carbs": carbs, "fat": fat, "protein": protein, "kcal": kcal}
+    return {key: int(value) if float(value).is_integer() else value for key, value in ingredientData.items()}
@@ -0,0 +1,283 @@
+import csv
+import json
+import logging
+import os
+import secrets
+import time
+import yaml
+
+from abc import ABC
+from abc import abstractmethod
+from enum import Enum
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+def registerOutputSinksLogger(Logger):
+    global logger
+    logger = Logger
+
+
+# Sections of the generated results. The value is the key used in the yaml result file.
+class RESULTSECTION(Enum):
+    MEALS = "choosen meals:"
+    PORTIONS = "portions:"
+    GROCERIES = "grocery list:"
+    WATCHLIST = "watch list:"
+    COSTS = "estimated cost:"
+    ADDED = "add:"
+    DROPPED = "drop:"
+    CHANGED = "changed:"
+
+
+# Sections holding plain names instead of name: amount pairs
+LISTSECTIONS = (RESULTSECTION.MEALS, RESULTSECTION.WATCHLIST)
+
+
+def createTemporaryFile(resultPath):
+    """
+    Creates a new temporary file next to the given result file and returns its file descriptor
+    and path. Creating it in the same directory keeps the final rename on one file system and
+    therefore atomic. Unlike mkstemp, the file gets the permissions of a regular open, the
+    umask of the process applies without reading it.
+    """
+    resultPath = Path(resultPath)
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    while True:
+        tempPath = resultPath.parent / ".{}.{}.tmp".format(resultPath.name, secrets.token_hex(8))
+        try:
+            return os.open(tempPath, flags, 0o666), tempPath
+        except FileExistsError:
+            continue
+
+
+# class outputSink --------------------------------------------------------------------------------
+#
+#   Abstract base class of all output sinks. A sink receives result records one by one and
+#   streams them into a temporary file next to the target file. The temporary file replaces the
+#   target file atomically on close, so concurrent runs never see or produce a half written
+#   result file. Sinks implement writeRecord and optionally writeHeader.
+#
+#       record - tuple (section, name, amount)
+#               section - RESULTSECTION the record belongs to
+#               name - meal, ingredient or watch list item name
+#               amount - amount or cost of the item, None for meals and watch list items
+#
+#       resultPath - final path of the result file
+#
+#       sections - RESULTSECTIONs a sink with a section layout writes even without records
+#
+#       extension - file extension of the sink format
+#
+# -------------------------------------------------------------------------------------------------
+
+class outputSink(ABC):
+    extension = ""
+
+    def __init__(self, resultPath, sections = ()):
+        self.resultPath = Path(resultPath)
+        self.sections = sections
+        self.fileDeskriptor = None
+        self.tempPath = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def open(self):
+        """
+        Creates the temporary file in the directory of the result file. Creating it in the same
+        directory keeps the final rename on one file system and therefore atomic.
+        """
+        self.resultPath.parent.mkdir(parents=True, exist_ok=True)
+        fileHandle, self.tempPath = createTemporaryFile(self.resultPath)
+        self.fileDeskriptor = os.fdopen(fileHandle, 'w', newline='', encoding='utf-8')
+        self.writeHeader()
+
+    def writeHeader(self):
+        pass
+
+    @abstractmethod
+    def writeRecord(self, record):
+        """
+        Writes one record to the temporary file.
+        """
+
+    def writeRecords(self, records):
+        for record in records:
+            self.writeRecord(record)
+
+    def close(self):
+        """
+        Flushes the temporary file to disk and moves it to its final destination.
+        """
+        self.finish()
+        self.commit()
+
+    def finish(self):
+        """
+        Flushes the temporary file to disk. The result file is not touched yet.
+        """
+        self.fileDeskriptor.flush()
+        os.fsync(self.fileDeskriptor.fileno())
+        self.fileDeskriptor.close()
+
+    def commit(self):
+        """
+        Moves the finished temporary file to its final destination.
+        """
+        os.replace(self.tempPath, self.resultPath)
+        self.tempPath = None
+        logger.debug("Results written to {}".format(self.resultPath))
+
+    def abort(self):
+        """
+        Drops the temporary file and leaves a previously written result file untouched.
+        """
+        if self.fileDeskriptor:
+            self.fileDeskriptor.close()
+        if self.tempPath and self.tempPath.exists():
+            self.tempPath.unlink()
+            logger.warning("Writing results to {} was aborted".format(self.resultPath))
+
+
+class yamlSink(outputSink):
+    """
+    Writes the records in the yaml layout of the original result file. A section key is only
+    emitted when the section changes, therefore records have to be passed grouped by section
+    in the order of RESULTSECTION. Sections without records are written empty, e.g. [], like
+    the original result file did.
+    """
+    extension = ".yaml"
+
+    def writeHeader(self):
+        self.currentSection = None
+        self.emptySections = list(self.sections)
+
+    def writeRecord(self, record):
+        section, name, amount = record
+        if amount is not None:
+            item = {name: amount}
+        else:
+            item = [name]
+        sectionHeader, sectionBody = yaml.dump({section.value: item},
+                                               default_flow_style=False).split("\n", 1)
+        if section != self.currentSection:
+            self.writeEmptySections(section)
+            self.fileDeskriptor.write(sectionHeader + "\n")
+            self.currentSection = section
+        self.fileDeskriptor.write(sectionBody)
+
+    def writeEmptySections(self, nextSection = None):
+        """
+        Writes the empty sections ordered before the given section, all of them without section.
+        """
+        sectionOrder = list(RESULTSECTION)
+        for section in list(self.emptySections):
+            if nextSection is None or sectionOrder.index(section) <= sectionOrder.index(nextSection):
+                self.emptySections.remove(section)
+                if section != nextSection:
+                    emptyItem = [] if section in LISTSECTIONS else {}
+                    self.fileDeskriptor.write(yaml.dump({section.value: emptyItem}, default_flow_style=False))
+
+    def finish(self):
+        self.writeEmptySections()
+        super().finish()
+
+
+class jsonLinesSink(outputSink):
+    """
+    Writes one json object per record and line.
+    """
+    extension = ".jsonl"
+
+    def writeRecord(self, record):
+        section, name, amount = record
+        line = {"section": section.name.lower(), "name": name, "amount": amount}
+        self.fileDeskriptor.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+
+class csvSink(outputSink):
+    """
+    Writes one csv row per record.
+    """
+    extension = ".csv"
+
+    def writeHeader(self):
+        self.csvWriter = csv.writer(self.fileDeskriptor)
+        self.csvWriter.writerow(["section", "name", "amount"])
+
+    def writeRecord(self, record):
+        section, name, amount = record
+        self.csvWriter.writerow([section.name.lower(), name, "" if amount is None else amount])
+
+
+# Registered sink formats
+OUTPUTSINKS = {
+    "yaml": yamlSink,
+    "jsonl": jsonLinesSink,
+    "csv": csvSink,
+}
+
+
+def getRunDirectory(resultDirectory):
+    """
+    Returns a fresh directory for a single run below the given result directory. The name
+    contains a timestamp and the process id, so parallel batch runs never share a directory.
+    """
+    runName = time.strftime("%Y%m%d-%H%M%S") + "-" + str(os.getpid())
+    runDirectory = Path(resultDirectory) / runName
+    runDirectory.mkdir(parents=True, exist_ok=False)
+    return runDirectory
+
+
+def getOutputSinks(formatNames, resultDirectory, resultName, runDirectory = False, sections = ()):
+    """
+    Creates and returns one sink per requested format.
+
+    Input:
+        formatNames: list of keys of OUTPUTSINKS
+        resultDirectory: directory to write the results to
+        resultName: file name of the results without extension
+        runDirectory: bool, write into a new directory per run instead of the result directory
+        sections: RESULTSECTIONs written even without records
+    """
+    if runDirectory:
+        resultDirectory = getRunDirectory(resultDirectory)
+
+    sinks = []
+    for formatName in formatNames:
+        sinkClass = OUTPUTSINKS[formatName]
+        sinks.append(sinkClass(Path(resultDirectory) / (resultName + sinkClass.extension), sections))
+    return sinks
+
+
+def writeRecordsToSinks(records, sinks):
+    """
+    Streams the given records into all given sinks. The result files are only replaced after
+    every sink wrote all records, so a run failing before leaves all previously written result
+    files untouched. Every file is replaced atomically on its own: if replacing one of them
+    fails, the files replaced before keep the new results.
+    """
+    try:
+        for sink in sinks:
+            sink.open()
+        for record in records:
+            for sink in sinks:
+                sink.writeRecord(record)
+        for sink in sinks:
+            sink.finish()
+        for sink in sinks:
+            sink.commit()
+    except BaseException:
+        for sink in sinks:
+            sink.abort()
+        raise
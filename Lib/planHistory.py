@@ -0,0 +1,115 @@
+import logging
+import sqlite3
+import time
+
+
+logger = logging.getLogger(__name__)
+
+def registerPlanHistoryLogger(Logger):
+    global logger
+    logger = Logger
+
+
+# class planHistory -------------------------------------------------------------------------------
+#
+#   Append only history of the generated meal plans, stored in a local sqlite database. Every run
+#   appends one row to 'runs' and one row per chosen meal to 'choices'. Rows are never updated.
+#
+#       lastChosen - id of the last run that chose the meal, per meal name
+#
+#       timesChosen - number of times the meal was chosen over all runs, per meal name
+#
+#       runCount - number of recorded runs
+#
+#       recencyWeight - penalty of a meal that was chosen in the previous run, halves with
+#                       every further run in between
+#
+#       frequencyWeight - penalty of a meal that was chosen once in every previous run
+#
+# -------------------------------------------------------------------------------------------------
+
+class planHistory:
+    def __init__(self, historyPath, recencyWeight = 4.0, frequencyWeight = 1.0):
+        self.historyPath = historyPath
+        self.recencyWeight = recencyWeight
+        self.frequencyWeight = frequencyWeight
+
+        self.connection = sqlite3.connect(str(historyPath))
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                runId INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS choices (
+                runId INTEGER NOT NULL REFERENCES runs(runId),
+                mealName TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS choicesByMeal ON choices (mealName, runId);
+        """)
+
+        # the covering index answers the aggregation without touching the table
+        self.lastChosen = {}
+        self.timesChosen = {}
+        for mealName, lastRunId, count in self.connection.execute(
+                "SELECT mealName, MAX(runId), COUNT(*) FROM choices GROUP BY mealName"):
+            self.lastChosen[mealName] = lastRunId
+            self.timesChosen[mealName] = count
+        self.runCount = self.connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        self.lastRunId = self.connection.execute("SELECT MAX(runId) FROM runs").fetchone()[0] or 0
+
+    def __repr__(self):
+        """
+        Overload __repr__ method to enable fancy printing and logger support on print operations.
+        """
+        return "<class: {}, path: {}, runs: {}, meals: {}>".format(self.__class__.__name__, \
+                    self.historyPath, self.runCount, len(self.lastChosen))
+
+    def getLastChosen(self, mealName):
+        """
+        Returns the unix timestamp of the last run that chose the given meal, None if the meal
+        was never chosen.
+        """
+        runId = self.lastChosen.get(mealName)
+        if runId is None:
+            return None
+        return self.connection.execute("SELECT timestamp FROM runs WHERE runId = ?", \
+                                       (runId,)).fetchone()[0]
+
+    def getPenalty(self, mealName):
+        """
+        Returns the repetition penalty of the given meal, 0 for meals that were never chosen.
+        """
+        lastRunId = self.lastChosen.get(mealName)
+        if lastRunId is None:
+            return 0
+        runsSince = self.lastRunId - lastRunId
+        recencyPenalty = self.recencyWeight / 2 ** runsSince
+        frequencyPenalty = self.frequencyWeight * self.timesChosen[mealName] / self.runCount
+        return recencyPenalty + frequencyPenalty
+
+    def getWeight(self, mealName):
+        """
+        Returns the selection weight of the given meal. Meals that were never chosen have
+        the weight 1.
+        """
+        return 1 / (1 + self.getPenalty(mealName))
+
+    def recordPlan(self, mealNames):
+        """
+        Appends the given plan to the history.
+        """
+        with self.connection:
+            cursor = self.connection.execute("INSERT INTO runs (timestamp) VALUES (?)", (time.time(),))
+            runId = cursor.lastrowid
+            self.connection.executemany("INSERT INTO choices (runId, mealName) VALUES (?, ?)", \
+                                        [(runId, mealName) for mealName in mealNames])
+
+        self.runCount += 1
+        self.lastRunId = runId
+        for mealName in mealNames:
+            self.lastChosen[mealName] = runId
+            self.timesChosen[mealName] = self.timesChosen.get(mealName, 0) + 1
+        logger.debug("Plan recorded as run {} in {}".format(runId, self.historyPath))
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,94 @@
+import logging
+import math
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+def registerPlanSamplingLogger(Logger):
+    global logger
+    logger = Logger
+
+
+def samplePlans(mealList, targetKcal, planNumber, tolerance = 200, weights = None, maxRounds = 8, \
+                oversampling = 4, maxColumns = 512, seed = None):
+    """
+    Samples distinct meal plans that hit the target kcal count within the tolerance.
+
+    Every round draws rows x columns meal indices at once. The cumulative kcal sum of every row
+    gives the best prefix of the row, the prefix closest to the target. Rows whose prefix misses
+    the tolerance or repeats a meal although the catalog is large enough are discarded, the
+    remaining rows are deduplicated by their sorted meal indices and ranked by their kcal
+    deviation. Rounds with twice as many rows are drawn until enough plans are found. Without
+    kcal to reach, e.g. on days of cheat meals only, the empty plan is the only plan.
+
+    Input:
+        mealList: list of resolved objects of class meal
+        targetKcal: kcal count every plan should reach
+        planNumber: number of plans to return
+        tolerance: tolerated kcal deviation
+        weights: optional selection weight per meal, e.g. from the plan history
+        maxRounds: maximum number of sampling rounds
+        oversampling: rows drawn per requested plan in the first round
+        maxColumns: maximum number of meals per row
+        seed: seed of the random generator
+
+    output: list of at most planNumber dicts, best plan first
+        meals: list of objects of class meal
+        kcal: kcal count of the plan
+        kcalError: absolute deviation from the target
+    """
+    if planNumber < 1:
+        return []
+    if targetKcal <= 0:
+        return [{"meals": [], "kcal": 0.0, "kcalError": float(-targetKcal)}]
+    if not mealList:
+        return []
+    randomGenerator = np.random.default_rng(seed)
+    kcalArray = np.array([meal.kcal for meal in mealList], dtype = np.float64)
+    mealNumber = len(mealList)
+    probabilities = None
+    if weights is not None:
+        probabilities = np.asarray(weights, dtype = np.float64)
+        probabilities = probabilities / probabilities.sum()
+
+    # enough columns for the smallest meals to reach the upper bound of the tolerance
+    smallestKcal = max(kcalArray.min(), 1)
+    columns = int(min(max(math.ceil((targetKcal + tolerance) / smallestKcal), 1), maxColumns))
+    allowRepeats = columns > mealNumber
+
+    plans = {}
+    rows = planNumber * oversampling
+    for _ in range(maxRounds):
+        draws = randomGenerator.choice(mealNumber, size = (rows, columns), p = probabilities)
+        kcalSums = np.cumsum(kcalArray[draws], axis = 1)
+
+        # best prefix per row
+        prefixEnd = np.argmin(np.abs(kcalSums - targetKcal), axis = 1)
+        planKcal = kcalSums[np.arange(rows), prefixEnd]
+        kcalError = np.abs(planKcal - targetKcal)
+
+        # columns behind the prefix get unique negative fillers, sorting then yields a signature
+        columnIndices = np.arange(columns)
+        signatures = np.sort(np.where(columnIndices <= prefixEnd[:, None], draws, -1 - columnIndices), axis = 1)
+        valid = kcalError <= tolerance
+        if not allowRepeats:
+            valid &= ~(signatures[:, 1:] == signatures[:, :-1]).any(axis = 1)
+
+        for rowIndex in np.flatnonzero(valid):
+            signature = signatures[rowIndex].tobytes()
+            if signature not in plans or plans[signature][0] > kcalError[rowIndex]:
+                plans[signature] = (kcalError[rowIndex], planKcal[rowIndex], draws[rowIndex, :prefixEnd[rowIndex] + 1])
+
+        logger.debug("Sampled {} rows, {} distinct plans within the tolerance".format(rows, len(plans)))
+        if len(plans) >= planNumber:
+            break
+        rows *= 2
+
+    if len(plans) < planNumber:
+        logger.warning("Only {} of {} distinct plans within {} kcal of the target were found" \
+                       .format(len(plans), planNumber, tolerance))
+
+    bestPlans = sorted(plans.values(), key = lambda plan: plan[0])[:planNumber]
+    return [{"meals": [mealList[mealIndex] for mealIndex in mealIndices], "kcal": float(kcal), \
+             "kcalError": float(error)} for error, kcal, mealIndices in bestPlans]
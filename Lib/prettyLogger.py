@@ -1,10 +1,14 @@
+import atexit
 import logging
+import queue
 import yaml
 
 from sys import exit
 from os import makedirs
 from pathlib import Path
 from enum import Enum
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
 
 logger = logging.getLogger(__name__) 
 
@@ -18,7 +22,30 @@ class FILELOGGING(Enum):
     INACTIVE = 0
     ACTIVE = 1
 
-def getPrettyLogger(loggerName, LOGMODUS, FILELOGGING):
+
+class ASYNCLOGGING(Enum):
+    INACTIVE = 0
+    ACTIVE = 1
+
+
+# Maximum number of log records waiting for the listener thread
+LOGQUEUESIZE = 10000
+
+
+class blockingQueueHandler(QueueHandler):
+    """
+    Queue handler that hands the records over unformatted and blocks while the queue is full.
+    Blocking applies backpressure instead of dropping records, formatting is left to the 
+    handlers of the listener thread.
+    """
+    def enqueue(self, record):
+        self.queue.put(record)
+
+    def prepare(self, record):
+        return record
+
+
+def getPrettyLogger(loggerName, LOGMODUS, FILELOGGING, ASYNCLOGGING = ASYNCLOGGING.INACTIVE):
     """
     Creates and returns a logger object
     Input:
@@ -30,6 +57,10 @@ def getPrettyLogger(loggerName, LOGMODUS, FILELOGGING):
         FILELOGGING: enum
             active - print to console + logfile
             inactive - print to console only 
+        ASYNCLOGGING: enum
+            active - the logger only enqueues the records, a listener thread formats and 
+                     writes them. The queue is flushed on exit
+            inactive - records are formatted and written by the logging thread
     """
     # create logger
     logger = logging.getLogger(loggerName)
@@ -56,12 +87,24 @@ def getPrettyLogger(loggerName, LOGMODUS, FILELOGGING):
         logFileHandler = logging.FileHandler(logFilePath, mode = 'w')
         logFileHandler.setLevel(logging.DEBUG)
 
-    # set console handler
-    logger.addHandler(consoleHandler)
-
-    # set logfile handler 
+    handlers = [consoleHandler]
     if FILELOGGING == FILELOGGING.ACTIVE:
-        logger.addHandler(logFileHandler)
+        handlers.append(logFileHandler)
+
+    # set console and logfile handler, either directly or behind the queue
+    if ASYNCLOGGING == ASYNCLOGGING.ACTIVE:
+        logQueue = queue.Queue(maxsize = LOGQUEUESIZE)
+        queueListener = QueueListener(logQueue, *handlers, respect_handler_level = True)
+        queueListener.start()
+        # stopping the listener writes every queued record before the interpreter exits
+        atexit.register(queueListener.stop)
+        # records no handler would print are dropped before they enter the queue
+        queueHandler = blockingQueueHandler(logQueue)
+        queueHandler.setLevel(min(handler.level for handler in handlers))
+        logger.addHandler(queueHandler)
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
     # -------------------------------------------------------------------------------------------------------
     
      # FORMATTER ---------------------------------------------------------------------------------------------
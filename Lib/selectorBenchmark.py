@@ -0,0 +1,177 @@
+import logging
+import random
+import statistics
+import time
+
+from argparse import Namespace
+
+from Lib.mealPlanning import applyKetoFilter
+from Lib.mealPlanning import applyLowcarbFilter
+from Lib.mealPlanning import resolveMealList
+from Lib.mealSelectors import MEALSELECTORS
+from Lib.syntheticCatalog import generateSyntheticMealList
+
+
+logger = logging.getLogger(__name__)
+
+def registerSelectorBenchmarkLogger(Logger):
+    global logger
+    logger = Logger
+
+
+# Seeded plan profiles every selector is run with. Macro targets are gram per day.
+PROFILES = {
+    "maintenance": {"days": 7, "kcal": 2500, "carbs": 280, "protein": 120, "fat": 85},
+    "cut": {"days": 5, "kcal": 1800, "carbs": 150, "protein": 150, "fat": 60},
+    "lowcarb": {"days": 3, "kcal": 2200, "carbs": 60, "protein": 140, "fat": 150, "lowcarb": True},
+}
+
+# Metrics of one benchmark entry and the direction in which they get worse
+METRICS = {
+    "runtime": "higher",
+    "kcalDeviation": "higher",
+    "macroError": "higher",
+    "variety": "lower",
+}
+
+
+def getProfileArgs(profile, iterations = 500, timeBudget = 1.0):
+    """
+    Returns the parsed input arguments chooseMeals expects for the given profile.
+    """
+    profileArgs = Namespace(days = 1, kcal = 2000, workout = 0, cheatmeals = 0, lowcarb = False, keto = False, \
+                            budget = None, optimize = False, carbs = 0, protein = 0, fat = 0, \
+                            iterations = iterations, timebudget = timeBudget, alternatives = None)
+    for key, value in profile.items():
+        setattr(profileArgs, key, value)
+    return profileArgs
+
+
+def evaluatePlan(choosenMealList, profileArgs):
+    """
+    Returns the kcal deviation from days * kcal, the mean relative macro error and the share of
+    unique meals of the given plan.
+    """
+    targetKcal = profileArgs.days * profileArgs.kcal
+    kcalDeviation = abs(sum(meal.kcal for meal in choosenMealList) - targetKcal)
+
+    macroErrors = []
+    for macroName, targetName in (("carb", "carbs"), ("protein", "protein"), ("fat", "fat")):
+        macroTarget = profileArgs.days * getattr(profileArgs, targetName)
+        if macroTarget:
+            macroErrors.append(abs(sum(getattr(meal, macroName) for meal in choosenMealList) - macroTarget) / macroTarget)
+    macroError = statistics.mean(macroErrors) if macroErrors else 0
+
+    variety = len({meal.name for meal in choosenMealList}) / len(choosenMealList) if choosenMealList else 0
+    return kcalDeviation, macroError, variety
+
+
+def runSelectorBenchmark(selectorNames, catalogSizes, profileNames, repeats = 3, seed = 0, \
+                         iterations = 500, timeBudget = 1.0):
+    """
+    Runs every selector on every synthetic catalog size and profile. Every repeat seeds the
+    random generators the same way for all selectors.
+
+    output: list of dicts, one per selector, catalog size and profile
+        selector, catalogSize, profile: benchmark entry
+        runtime: median runtime in seconds
+        kcalDeviation: mean absolute deviation from days * kcal
+        macroError: mean relative macro error
+        variety: mean share of unique meals
+    """
+    results = []
+    for catalogSize in catalogSizes:
+        mealList = resolveMealList(generateSyntheticMealList(catalogSize, seed = seed))
+        for profileName in profileNames:
+            profileArgs = getProfileArgs(PROFILES[profileName], iterations, timeBudget)
+            if profileArgs.keto:
+                profileMealList = applyKetoFilter(mealList)
+            elif profileArgs.lowcarb:
+                profileMealList = applyLowcarbFilter(mealList)
+            else:
+                profileMealList = mealList
+
+            for selectorName in selectorNames:
+                runtimes = []
+                qualities = []
+                for repeat in range(repeats):
+                    random.seed(seed + repeat)
+                    startTime = time.perf_counter()
+                    choosenMealList = MEALSELECTORS[selectorName](profileMealList, profileArgs)
+                    runtimes.append(time.perf_counter() - startTime)
+                    qualities.append(evaluatePlan(choosenMealList, profileArgs))
+
+                kcalDeviations, macroErrors, varieties = zip(*qualities)
+                results.append({
+                    "selector": selectorName,
+                    "catalogSize": catalogSize,
+                    "profile": profileName,
+                    "runtime": statistics.median(runtimes),
+                    "kcalDeviation": statistics.mean(kcalDeviations),
+                    "macroError": statistics.mean(macroErrors),
+                    "variety": statistics.mean(varieties),
+                })
+                logger.debug("Benchmarked {}".format(results[-1]))
+    return results
+
+
+def getFastestSelectors(results, maxKcalDeviation = 200):
+    """
+    Returns the fastest selector per catalog size whose mean kcal deviation over all profiles
+    stays within the given bar, None if no selector meets it.
+    """
+    fastestSelectors = {}
+    for catalogSize in sorted({result["catalogSize"] for result in results}):
+        candidates = {}
+        for result in results:
+            if result["catalogSize"] == catalogSize:
+                candidates.setdefault(result["selector"], []).append(result)
+        qualifiedSelectors = [(sum(entry["runtime"] for entry in entries), selectorName) \
+                              for selectorName, entries in candidates.items() \
+                              if statistics.mean(entry["kcalDeviation"] for entry in entries) <= maxKcalDeviation]
+        fastestSelectors[catalogSize] = min(qualifiedSelectors)[1] if qualifiedSelectors else None
+    return fastestSelectors
+
+
+def findRegressions(results, baselineResults, slowdown = 0.5, minRuntime = 0.005, \
+                    kcalSlack = 50, macroSlack = 0.05, varietySlack = 0.05):
+    """
+    Compares the results with the baseline results of a previous run and returns a description
+    of every regression. Runtimes regress if they grow by more than the slowdown share and more
+    than minRuntime seconds, the quality metrics if they get worse by more than their slack.
+    """
+    slacks = {"kcalDeviation": kcalSlack, "macroError": macroSlack, "variety": varietySlack}
+    baselineEntries = {(entry["selector"], entry["catalogSize"], entry["profile"]): entry for entry in baselineResults}
+
+    regressions = []
+    for result in results:
+        key = (result["selector"], result["catalogSize"], result["profile"])
+        baselineEntry = baselineEntries.get(key)
+        if baselineEntry is None:
+            continue
+        for metricName, worseDirection in METRICS.items():
+            difference = result[metricName] - baselineEntry[metricName]
+            if worseDirection == "lower":
+                difference = -difference
+            if metricName == "runtime":
+                isRegression = difference > max(slowdown * baselineEntry[metricName], minRuntime)
+            else:
+                isRegression = difference > slacks[metricName]
+            if isRegression:
+                regressions.append("{} on {} meals, profile {}: {} {:.4g} -> {:.4g}".format(*key, metricName, \
+                                   baselineEntry[metricName], result[metricName]))
+    return regressions
+
+
+def formatResultTable(results):
+    """
+    Returns the results as fixed width text table.
+    """
+    header = "{:<10} {:>8} {:<12} {:>10} {:>10} {:>10} {:>8}".format("selector", "meals", "profile", \
+                "runtime/s", "kcal dev", "macro err", "variety")
+    lines = [header, "-" * len(header)]
+    for result in results:
+        lines.append("{:<10} {:>8} {:<12} {:>10.4f} {:>10.1f} {:>10.3f} {:>8.2f}".format(result["selector"], \
+                     result["catalogSize"], result["profile"], result["runtime"], result["kcalDeviation"], \
+                     result["macroError"], result["variety"]))
+    return "\n".join(lines)
@@ -0,0 +1,121 @@
+import inspect
+import logging
+import os
+
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+
+from Class.ingredient import UNITMODE
+from Lib.columnarCatalog import buildColumnarCatalog
+from Lib.columnarCatalog import columnarCatalog
+
+
+logger = logging.getLogger(__name__)
+
+def registerSharedCatalogLogger(Logger):
+    global logger
+    logger = Logger
+
+
+# Python 3.13 can attach shared memory without handing it to the resource tracker
+SHAREDMEMORYTRACKING = "track" in inspect.signature(shared_memory.SharedMemory).parameters
+
+
+# class sharedCatalog -----------------------------------------------------------------------------
+#
+#   Columnar catalog published once into a shared memory block. Planner processes attach to the
+#   block by its name and view the same columns without copying or unpickling meal objects. The
+#   publishing process owns the block and has to unlink it when all workers are done. Before a
+#   catalog is closed, callers have to drop the column arrays they took from it, the meal views
+#   and ingredients hold no column arrays and may be kept.
+#
+#       sharedMemory - the shared memory block holding the catalog bytes
+#
+#       name - name workers attach to
+#
+#       isOwner - True in the publishing process
+#
+# -------------------------------------------------------------------------------------------------
+
+class sharedCatalog(columnarCatalog):
+    def __init__(self, sharedMemory, isOwner = False):
+        self.sharedMemory = sharedMemory
+        self.name = sharedMemory.name
+        self.isOwner = isOwner
+        super().__init__(sharedMemory.buf)
+
+    @classmethod
+    def publish(cls, catalogBytes, name = None):
+        """
+        Copies the given catalog bytes into a new shared memory block and returns the owning
+        catalog.
+        """
+        sharedMemory = shared_memory.SharedMemory(name = name, create = True, size = len(catalogBytes))
+        sharedMemory.buf[:len(catalogBytes)] = catalogBytes
+        logger.debug("Published {} byte catalog as shared memory {}".format(len(catalogBytes), sharedMemory.name))
+        return cls(sharedMemory, isOwner = True)
+
+    @classmethod
+    def fromMeals(cls, mealDict, ingredientObjectList, unitMode = UNITMODE.EXPLICIT, name = None):
+        """
+        Compiles the given meals and ingredients and publishes them, see buildColumnarCatalog.
+        """
+        catalogBytes, _ = buildColumnarCatalog(mealDict, ingredientObjectList, unitMode)
+        return cls.publish(catalogBytes, name)
+
+    @classmethod
+    def fromCatalogFile(cls, catalogPath, name = None):
+        """
+        Publishes the given catalog file created by exportCatalog.py.
+        """
+        with open(catalogPath, "rb") as fileDeskriptor:
+            return cls.publish(fileDeskriptor.read(), name)
+
+    @classmethod
+    def attach(cls, name):
+        """
+        Attaches to the catalog published under the given name. Used in the worker processes.
+        The block stays registered with the resource tracker of the owner only. Workers started
+        by multiprocessing share this tracker. Any other process starts its own tracker when it
+        attaches, which would unlink the block when the process exits, so the block is
+        unregistered from it again.
+        """
+        if SHAREDMEMORYTRACKING:
+            sharedMemory = shared_memory.SharedMemory(name = name, track = False)
+        else:
+            ownTracker = getattr(resource_tracker._resource_tracker, "_fd", None) is None
+            sharedMemory = shared_memory.SharedMemory(name = name)
+            if ownTracker and os.name == "posix":
+                resource_tracker.unregister(sharedMemory._name, "shared_memory")
+        return cls(sharedMemory)
+
+    def __repr__(self):
+        """
+        Overload __repr__ method to enable fancy printing and logger support on print operations.
+        """
+        return "<class: {}, name: {}, meals: {}, ingredients: {}, owner: {}>".format(self.__class__.__name__, \
+                    self.name, self.mealNumber, self.ingredientNumber, self.isOwner)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Detaches from the shared memory block. The owner also removes the block, views created
+        before are invalid afterwards. The catalog drops its own column arrays, column arrays
+        the caller still holds make the detach fail with a BufferError.
+        """
+        if self.sharedMemory is None:
+            return
+        try:
+            self.release()
+        except BufferError:
+            logger.error("Shared catalog {} is still used by column arrays of the caller".format(self.name))
+            raise
+        self.sharedMemory.close()
+        if self.isOwner:
+            self.sharedMemory.unlink()
+        self.sharedMemory = None
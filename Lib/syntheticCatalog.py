@@ -0,0 +1,56 @@
+import random
+
+from Class.ingredient import ingredient
+from Class.meal import meal
+
+
+def generateSyntheticIngredientDict(ingredientNumber, seed = 0):
+    """
+    Generates an ingredient dictionary in the format of the ingredient yaml with random but
+    plausible macros per 100 gram.
+    """
+    randomGenerator = random.Random(seed)
+    ingredientDict = {}
+    for ingredientIndex in range(ingredientNumber):
+        carbs = round(randomGenerator.uniform(0, 70), 1)
+        fat = round(randomGenerator.uniform(0, 40), 1)
+        protein = round(randomGenerator.uniform(0, 35), 1)
+        ingredientDict["ingredient{}".format(ingredientIndex)] = {
+            "carbs": carbs,
+            "fat": fat,
+            "protein": protein,
+            "kcal": round(4 * carbs + 9 * fat + 4 * protein) + 1,
+        }
+    return ingredientDict
+
+
+def generateSyntheticMealDict(mealNumber, ingredientNames, ingredientsPerMeal = 5, seed = 0):
+    """
+    Generates a meal dictionary in the format of the meal yaml. Every meal uses a random
+    selection of the given ingredients with amounts between 50 and 500 gram.
+    """
+    randomGenerator = random.Random(seed)
+    ingredientNames = list(ingredientNames)
+    mealDict = {}
+    for mealIndex in range(mealNumber):
+        mealIngredients = randomGenerator.sample(ingredientNames, min(ingredientsPerMeal, len(ingredientNames)))
+        mealDict["meal{}".format(mealIndex)] = {ingredientName: randomGenerator.randrange(50, 500, 10) \
+                                                for ingredientName in mealIngredients}
+    return mealDict
+
+
+def generateSyntheticMealList(mealNumber, ingredientNumber = 200, ingredientsPerMeal = 5, seed = 0):
+    """
+    Generates a list of unresolved meal objects directly, without the detour over dictionaries.
+    Used for catalogs too large for the yaml conversion.
+    """
+    randomGenerator = random.Random(seed)
+    ingredientData = [(name, data["kcal"], data["carbs"], data["protein"], data["fat"]) \
+        for name, data in generateSyntheticIngredientDict(ingredientNumber, seed).items()]
+
+    mealObjectList = []
+    for mealIndex in range(mealNumber):
+        ingredientList = [ingredient(*data, amount = randomGenerator.randrange(50, 500, 10)) \
+                          for data in randomGenerator.sample(ingredientData, ingredientsPerMeal)]
+        mealObjectList.append(meal("meal{}".format(mealIndex), "", False, False, ingredientList))
+    return mealObjectList
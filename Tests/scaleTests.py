@@ -0,0 +1,79 @@
+import copy
+import time
+import tracemalloc
+import pytest
+
+from argparse import Namespace
+
+from Lib.helperFunctions import convertIngredientToObject
+from Lib.helperFunctions import convertMealToObject
+from Lib.mealPlanning import aggregateGroceryList
+from Lib.mealPlanning import applyLowcarbFilter
+from Lib.mealPlanning import chooseMeals
+from Lib.mealPlanning import generateGroceryList
+from Lib.mealPlanning import resolveMealList
+from Lib.syntheticCatalog import generateSyntheticIngredientDict
+from Lib.syntheticCatalog import generateSyntheticMealDict
+from Lib.syntheticCatalog import generateSyntheticMealList
+
+
+# Ceilings of the planning pipeline per catalog size: (seconds, peak MB of new allocations)
+PIPELINECEILINGS = {
+    10000: (2.0, 16),
+    100000: (10.0, 128),
+}
+
+
+@pytest.fixture(scope = "module", params = sorted(PIPELINECEILINGS))
+def syntheticMealList(request):
+    return request.param, generateSyntheticMealList(request.param)
+
+
+def measure(function, *arguments):
+    """
+    Runs the given function and returns its result, run time in seconds and peak of newly 
+    allocated memory in MB.
+    """
+    tracemalloc.start()
+    startTime = time.perf_counter()
+    try:
+        result = function(*arguments)
+        runTime = time.perf_counter() - startTime
+        _, peakMemory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, runTime, peakMemory / 2 ** 20
+
+
+def runPlanningPipeline(mealList):
+    mealList = resolveMealList(mealList)
+    mealList = applyLowcarbFilter(mealList)
+    choosenMealList = chooseMeals(mealList, Namespace(days = 7, kcal = 3000, workout = 0, cheatmeals = 0, \
+                                                      budget = None, optimize = False))
+    return aggregateGroceryList(generateGroceryList(choosenMealList))
+
+
+def test_planningPipeline_staysWithinCeilings(syntheticMealList):
+    mealNumber, mealList = syntheticMealList
+    maxSeconds, maxMegabytes = PIPELINECEILINGS[mealNumber]
+
+    groceryDict, runTime, peakMemory = measure(runPlanningPipeline, mealList)
+
+    assert groceryDict
+    assert runTime < maxSeconds, "{} meals took {:.2f} s".format(mealNumber, runTime)
+    assert peakMemory < maxMegabytes, "{} meals allocated {:.1f} MB".format(mealNumber, peakMemory)
+
+
+def test_mealConversion_staysWithinCeilings():
+    ingredientDict = generateSyntheticIngredientDict(200)
+    mealDict = generateSyntheticMealDict(10000, ingredientDict)
+    ingredientObjectList = [convertIngredientToObject(name, data) for name, data in ingredientDict.items()]
+
+    def convertMeals():
+        return [convertMealToObject(name, copy.copy(data), ingredientObjectList) for name, data in mealDict.items()]
+
+    mealObjectList, runTime, peakMemory = measure(convertMeals)
+
+    assert all(mealObjectList)
+    assert runTime < 5.0, "10000 meals took {:.2f} s to convert".format(runTime)
+    assert peakMemory < 64, "10000 meals allocated {:.1f} MB".format(peakMemory)
@@ -1,4 +1,882 @@
+import copy
+import itertools
+import json
+import multiprocessing
+import numpy as np
+import os
+import string
+import subprocess
+import sys
 import pytest
+import warnings
+import yaml
+
+from argparse import Namespace
+from hypothesis import given
+from hypothesis import settings
+from hypothesis import strategies as st
+
+from Class.ingredient import UNITMODE
+from Class.ingredientIndex import ingredientIndex
+from Class.ingredientIndex import intersectSortedLists
+from Class.meal import meal
+from Lib.backgroundWriter import backgroundWriter
+from Lib.columnarCatalog import columnarCatalog
+from Lib.columnarCatalog import writeColumnarCatalog
+from Lib.budgetSelection import CANDIDATELIMIT
+from Lib.budgetSelection import chooseMealsWithinBudget
+from Lib.costEstimation import estimateGroceryCost
+from Lib.costEstimation import groceryCost
+from Lib.energyBudget import CHEATMEALKCAL
+from Lib.energyBudget import energyBudget
+from Lib.groceryDiff import diffGroceryLists
+from Lib.groceryDiff import readGrocerySnapshot
+from Lib.groceryDiff import writeGrocerySnapshot
+from Lib.feasibilityIndex import getFeasibilityIndex
+from Lib.feasibilityIndex import kcalFeasibilityIndex
+from Lib.helperFunctions import convertIngredientToObject
+from Lib.helperFunctions import convertMealToObject
+from Lib.helperFunctions import convertPantryToMetric
+from Lib.helperFunctions import parsePantry
+from Lib.helperFunctions import separateMeals
+from Lib.helperFunctions import subtractPantry
+from Lib.household import getHouseholdDiet
+from Lib.household import getHouseholdMembers
+from Lib.household import getPortionFactors
+from Lib.macroOptimizer import OBJECTIVES
+from Lib.macroOptimizer import getParetoFront
+from Lib.macroOptimizer import optimizeMealPlans
+from Lib.mealPlanning import TRESHOLD
+from Lib.mealPlanning import aggregateGroceryList
+from Lib.mealPlanning import applyKetoFilter
+from Lib.mealPlanning import applyLowcarbFilter
+from Lib.mealPlanning import chooseAlternativeMeals
+from Lib.mealPlanning import chooseMeals
+from Lib.mealPlanning import generateGroceryList
+from Lib.mealPlanning import resolveMealList
+from Lib.outputSinks import RESULTSECTION
+from Lib.mealSelectors import MEALSELECTORS
+from Lib.nutritionImport import getReferencedIngredientNames
+from Lib.nutritionImport import nutritionDatabase
+from Lib.nutritionImport import parseColumnMapping
+from Lib.planHistory import planHistory
+from Lib.planSampling import samplePlans
+from Lib.selectorBenchmark import findRegressions
+from Lib.selectorBenchmark import runSelectorBenchmark
+from Lib.sharedCatalog import sharedCatalog
+from Lib.outputSinks import csvSink
+from Lib.outputSinks import getOutputSinks
+from Lib.outputSinks import writeRecordsToSinks
+from Lib.syntheticCatalog import generateSyntheticIngredientDict
+from Lib.syntheticCatalog import generateSyntheticMealDict
+
+
+###################################################################################################
+#                                Strategies                                                       #
+###################################################################################################
+
+specialKeys = {"options", "optional", "watchList", "postWorkout", "preWorkout"}
+
+ingredientNames = st.text(alphabet = string.ascii_letters, min_size = 1, max_size = 10) \
+                    .filter(lambda name: name not in specialKeys)
+
+
+@st.composite
+def catalogs(draw):
+    """
+    Draws an ingredient dictionary and a meal dictionary using only these ingredients, both
+    in the format of the yaml config files.
+    """
+    names = draw(st.lists(ingredientNames, min_size = 1, max_size = 12, unique = True))
+    ingredientDict = {}
+    for name in names:
+        ingredientDict[name] = {
+            "carbs": draw(st.integers(0, 80)),
+            "fat": draw(st.integers(0, 60)),
+            "protein": draw(st.integers(0, 40)),
+            "kcal": draw(st.integers(1, 900)),
+        }
+    mealDict = {}
+    for mealIndex in range(draw(st.integers(1, 8))):
+        mealIngredients = draw(st.lists(st.sampled_from(names), min_size = 1, unique = True))
+        mealDict["meal{}".format(mealIndex)] = {name: draw(st.integers(11, 1000)) for name in mealIngredients}
+    return ingredientDict, mealDict
+
+
+@st.composite
+def pricedCatalogs(draw):
+    """
+    Draws a catalog like catalogs() in which some ingredients have a package price.
+    """
+    ingredientDict, mealDict = draw(catalogs())
+    for ingredientData in ingredientDict.values():
+        if draw(st.booleans()):
+            ingredientData["price"] = draw(st.integers(10, 500)) / 100
+            ingredientData["package"] = draw(st.sampled_from([1, 250, 500, 1000]))
+    return ingredientDict, mealDict
+
+
+def convertCatalog(ingredientDict, mealDict):
+    ingredientObjectList = [convertIngredientToObject(name, data) for name, data in ingredientDict.items()]
+    mealObjectList = [convertMealToObject(name, copy.deepcopy(data), ingredientObjectList) \
+                      for name, data in mealDict.items()]
+    return ingredientObjectList, mealObjectList
+
+
+def createMeal(name, kcal, carb = 0, postWorkout = False, preWorkout = False):
+    mealObject = meal(name, "", postWorkout, preWorkout, [])
+    mealObject.kcal = kcal
+    mealObject.carb = carb
+    return mealObject
+
+
+resolvedMealLists = st.lists(st.tuples(st.integers(1, 3000), st.integers(0, 300)), min_size = 1, max_size = 40) \
+                      .map(lambda macros: [createMeal("meal{}".format(index), kcal, carb) \
+                                           for index, (kcal, carb) in enumerate(macros)])
+
+
+def planWithSharedCatalog(catalogName):
+    catalog = sharedCatalog.attach(catalogName)
+    choosenMealList = chooseMeals(catalog.getMealViewList(), getPlanArgs(days = 2, kcal = 2000))
+    groceryDict = aggregateGroceryList(generateGroceryList(choosenMealList))
+    result = ([mealObject.name for mealObject in choosenMealList], sum(mealObject.kcal for mealObject in choosenMealList), \
+              groceryDict)
+    catalog.close()
+    return result
+
+
+def generateFailingRecords(records):
+    yield from records
+    raise ValueError("planning failed")
+
+
+class failingCommitSink(csvSink):
+    def commit(self):
+        raise OSError("disk full")
+
+
+def getPlanArgs(**overrides):
+    planArgs = Namespace(days = 3, kcal = 3000, workout = 0, cheatmeals = 0, budget = None, optimize = False, \
+                         carbs = 0, protein = 0, fat = 0, iterations = 100, timebudget = 1.0)
+    for key, value in overrides.items():
+        setattr(planArgs, key, value)
+    return planArgs
+
+
+###################################################################################################
+#                                Tests                                                            #
+###################################################################################################
 
 def test_splitMealDict():
-    
\ No newline at end of file
+    mealList = [createMeal("post", 500, postWorkout = True), createMeal("pre", 300, preWorkout = True), \
+                createMeal("regular", 800)]
+    postWorkoutMealList, preWorkoutMealList, regularMealList = separateMeals(mealList)
+    assert [mealObject.name for mealObject in postWorkoutMealList] == ["post"]
+    assert [mealObject.name for mealObject in preWorkoutMealList] == ["pre"]
+    assert [mealObject.name for mealObject in regularMealList] == ["regular"]
+
+
+@given(catalogs())
+def test_convertMealToObject_keepsIngredientsAndAmounts(catalog):
+    ingredientDict, mealDict = catalog
+    ingredientObjectList, mealObjectList = convertCatalog(ingredientDict, mealDict)
+
+    for mealObject, (mealName, mealData) in zip(mealObjectList, mealDict.items()):
+        assert mealObject.name == mealName
+        assert {ingredient.name: ingredient.amount for ingredient in mealObject.ingredientList} == mealData
+
+    # every meal holds its own ingredient copies, the catalog stays untouched
+    assert all(ingredient.amount == 0 for ingredient in ingredientObjectList)
+
+
+@given(catalogs(), ingredientNames)
+def test_convertMealToObject_rejectsUnknownIngredients(catalog, unknownName):
+    ingredientDict, mealDict = catalog
+    ingredientObjectList, _ = convertCatalog(ingredientDict, mealDict)
+    if unknownName in ingredientDict:
+        return
+    assert convertMealToObject("unknown", {unknownName: 100}, ingredientObjectList) is None
+
+
+@given(catalogs())
+def test_resolveMealList_sumsMacrosPerGram(catalog):
+    ingredientDict, mealDict = catalog
+    _, mealObjectList = convertCatalog(ingredientDict, mealDict)
+    resolveMealList(mealObjectList)
+
+    for mealObject, mealData in zip(mealObjectList, mealDict.values()):
+        expectedKcal = sum(int(ingredientDict[name]["kcal"]) * amount / 100 for name, amount in mealData.items())
+        expectedFat = sum(int(ingredientDict[name]["fat"]) * amount / 100 for name, amount in mealData.items())
+        assert mealObject.kcal == pytest.approx(expectedKcal)
+        assert mealObject.fat == pytest.approx(expectedFat)
+        assert mealObject.carb >= 0 and mealObject.protein >= 0
+
+
+@given(resolvedMealLists)
+def test_dietFilters_keepOrderedSubsetAboveTreshold(mealList):
+    lowcarbMealList = applyLowcarbFilter(mealList)
+    ketoMealList = applyKetoFilter(mealList)
+
+    for filteredMealList, treshold in ((lowcarbMealList, TRESHOLD.LOWCARB), (ketoMealList, TRESHOLD.KETO)):
+        assert [mealObject for mealObject in mealList if mealObject in filteredMealList] == filteredMealList
+        assert all(mealObject.kcal > treshold.value * mealObject.carb for mealObject in filteredMealList)
+        removedMealList = [mealObject for mealObject in mealList if mealObject not in filteredMealList]
+        assert all(mealObject.kcal <= treshold.value * mealObject.carb for mealObject in removedMealList)
+
+    # keto is the stricter diet
+    assert all(mealObject in lowcarbMealList for mealObject in ketoMealList)
+
+
+@given(resolvedMealLists, st.integers(1, 7), st.integers(1200, 4000), st.integers(0, 3), st.integers(0, 4))
+@settings(deadline = None)
+def test_chooseMeals_reachesKcalTargetWithinOneMeal(mealList, days, kcal, workout, cheatMeals):
+    postWorkoutMeal = createMeal("post", 400, postWorkout = True)
+    preWorkoutMeal = createMeal("pre", 250, preWorkout = True)
+    targetKcal = energyBudget(days, kcal, cheatMeals = cheatMeals).regularKcal
+
+    choosenMealList = chooseMeals(mealList + [postWorkoutMeal, preWorkoutMeal], \
+                                  getPlanArgs(days = days, kcal = kcal, workout = workout, cheatmeals = cheatMeals))
+    postWorkoutMealList, preWorkoutMealList, regularMealList = separateMeals(choosenMealList)
+
+    assert len(postWorkoutMealList) == workout
+    assert len(preWorkoutMealList) == workout
+
+    # workout meals come on top, the regular meals cover the target without the cheat meals
+    currentKcal = sum(mealObject.kcal for mealObject in regularMealList)
+    assert currentKcal >= targetKcal - 200
+    if regularMealList:
+        assert currentKcal - regularMealList[-1].kcal < targetKcal - 200
+
+
+@given(st.integers(1, 14), st.integers(1000, 4000), st.integers(0, 10), st.integers(0, 20), \
+       st.integers(0, 800), st.integers(0, 800))
+def test_energyBudget_splitsTargetPerDay(days, kcal, workouts, cheatMeals, postWorkoutKcal, preWorkoutKcal):
+    budget = energyBudget(days, kcal, workouts, cheatMeals, postWorkoutKcal, preWorkoutKcal)
+
+    assert len(budget.dailyTargets) == days
+    assert sum(budget.dailyCheatMeals) == cheatMeals and sum(budget.dailyWorkouts) == workouts
+    assert sum(budget.dailyTargets) == pytest.approx(budget.totalKcal)
+    assert budget.regularKcal == max(days * kcal - cheatMeals * CHEATMEALKCAL, 0) or \
+           any(regularKcal == 0 for regularKcal in budget.dailyRegularKcal)
+    assert budget.totalKcal == budget.regularKcal + workouts * (postWorkoutKcal + preWorkoutKcal)
+
+
+@given(resolvedMealLists, st.integers(1, 7), st.integers(1000, 4000), st.integers(0, 4), st.integers(0, 6))
+def test_energyBudget_assignsMealsToDays(mealList, days, kcal, workouts, cheatMeals):
+    budget = energyBudget(days, kcal, workouts, cheatMeals, 400, 250)
+    postWorkoutMealList = [createMeal("post{}".format(index), 400, postWorkout = True) for index in range(workouts)]
+    preWorkoutMealList = [createMeal("pre{}".format(index), 250, preWorkout = True) for index in range(workouts)]
+
+    dailyMealLists = budget.assignMealsToDays(mealList, postWorkoutMealList, preWorkoutMealList)
+    dailyDeviations = budget.getDailyDeviations(dailyMealLists)
+
+    assert len(dailyMealLists) == days
+    assert sorted(map(id, itertools.chain(*dailyMealLists))) == \
+           sorted(map(id, mealList + postWorkoutMealList + preWorkoutMealList))
+    for dailyMealList, dailyWorkouts in zip(dailyMealLists, budget.dailyWorkouts):
+        assert sum(mealObject.postWorkout for mealObject in dailyMealList) == dailyWorkouts
+        assert sum(mealObject.preWorkout for mealObject in dailyMealList) == dailyWorkouts
+
+    # the smallest meal of a day went to it while no other day missed more kcal
+    for dailyMealList, deviation in zip(dailyMealLists, dailyDeviations):
+        regularKcal = [mealObject.kcal for mealObject in dailyMealList if not mealObject.postWorkout \
+                       and not mealObject.preWorkout]
+        if regularKcal:
+            assert all(deviation - min(regularKcal) <= otherDeviation for otherDeviation in dailyDeviations)
+
+
+def test_getFeasibilityIndex_isCachedPerCatalog():
+    mealCatalog = [createMeal("meal{}".format(index), 300 + index) for index in range(20)]
+    feasibilityIndex = getFeasibilityIndex(mealCatalog, mealCatalog, 2000)
+
+    assert getFeasibilityIndex(mealCatalog, mealCatalog, 1500) is feasibilityIndex
+    assert getFeasibilityIndex(list(mealCatalog), mealCatalog, 1500) is not feasibilityIndex
+    largerIndex = getFeasibilityIndex(mealCatalog, mealCatalog, 3000)
+    assert largerIndex is not feasibilityIndex and largerIndex.limit == 3200
+    assert getFeasibilityIndex(mealCatalog, mealCatalog, 2000) is largerIndex
+
+
+@given(resolvedMealLists)
+def test_chooseMeals_repeatsOnlyAfterUsingEveryMeal(mealList):
+    choosenMealList = chooseMeals(mealList, getPlanArgs())
+    choosenNames = [mealObject.name for mealObject in choosenMealList]
+    firstRound = choosenNames[:len(mealList)]
+    assert len(set(firstRound)) == len(firstRound)
+
+
+@given(st.lists(st.integers(0, 1500), min_size = 1, max_size = 8), st.integers(1, 2), st.integers(0, 6000))
+def test_feasibilityIndex_matchesBruteForce(kcalList, maxRepeat, targetKcal):
+    feasibilityIndex = kcalFeasibilityIndex(np.array(kcalList), maxRepeat, targetKcal + 200)
+
+    planSums = {sum(counts[index] * kcal for index, kcal in enumerate(kcalList)): sum(counts) \
+                for counts in itertools.product(range(maxRepeat + 1), repeat = len(kcalList))}
+    feasiblePlans = {planSum: mealCount for planSum, mealCount in planSums.items() \
+                     if abs(planSum - targetKcal) <= 200}
+
+    assert feasibilityIndex.isFeasible(targetKcal) == bool(feasiblePlans)
+    assert (feasibilityIndex.explainInfeasibility(targetKcal) is None) == bool(feasiblePlans)
+    minMeals, maxMeals = feasibilityIndex.getMealCountRange(targetKcal)
+    for planSum, mealCount in feasiblePlans.items():
+        assert minMeals <= mealCount <= maxMeals
+
+
+@given(resolvedMealLists, st.integers(1, 10), st.integers(1200, 9000))
+@settings(deadline = None)
+def test_samplePlans_returnsDistinctPlansWithinTolerance(mealList, planNumber, targetKcal):
+    plans = samplePlans(mealList, targetKcal, planNumber, seed = 0)
+
+    assert len(plans) <= planNumber
+    signatures = [tuple(sorted(id(mealObject) for mealObject in plan["meals"])) for plan in plans]
+    assert len(set(signatures)) == len(signatures)
+    for plan in plans:
+        assert plan["kcal"] == pytest.approx(sum(mealObject.kcal for mealObject in plan["meals"]))
+        assert plan["kcalError"] == pytest.approx(abs(plan["kcal"] - targetKcal)) and plan["kcalError"] <= 200
+    assert [plan["kcalError"] for plan in plans] == sorted(plan["kcalError"] for plan in plans)
+
+
+def test_chooseAlternativeMeals_keepsWorkoutMealsWithoutRegularKcal():
+    mealList = [createMeal("meal{}".format(index), 600) for index in range(5)]
+    postWorkoutMeal = createMeal("post", 400, postWorkout = True)
+    preWorkoutMeal = createMeal("pre", 250, preWorkout = True)
+
+    # the cheat meals cover every day, like in chooseMeals only the workout meals are left
+    planArgs = getPlanArgs(days = 2, kcal = 1500, workout = 1, cheatmeals = 4, alternatives = 3)
+    alternativeMealLists = chooseAlternativeMeals(mealList + [postWorkoutMeal, preWorkoutMeal], planArgs)
+    assert alternativeMealLists == [[postWorkoutMeal, preWorkoutMeal]]
+    assert separateMeals(chooseMeals(mealList + [postWorkoutMeal, preWorkoutMeal], planArgs))[2] == []
+
+
+@given(catalogs())
+def test_groceryAggregation_sumsAmountsPerIngredient(catalog):
+    ingredientDict, mealDict = catalog
+    _, mealObjectList = convertCatalog(ingredientDict, mealDict)
+
+    groceryDict = aggregateGroceryList(generateGroceryList(mealObjectList + mealObjectList))
+
+    expectedGroceryDict = {}
+    for mealData in mealDict.values():
+        for name, amount in mealData.items():
+            expectedGroceryDict[name] = expectedGroceryDict.get(name, 0) + 2 * amount
+    assert groceryDict == expectedGroceryDict
+
+
+@given(catalogs(), st.lists(st.tuples(st.integers(1000, 4000), st.booleans(), st.booleans()), min_size = 1, max_size = 4))
+def test_household_scalesSharedPlanPerMember(catalog, memberData):
+    ingredientDict, mealDict = catalog
+    _, mealObjectList = convertCatalog(ingredientDict, mealDict)
+    members = getHouseholdMembers({"member{}".format(index): {"kcal": kcal, "lowcarb": lowcarb, "keto": keto} \
+                                   for index, (kcal, lowcarb, keto) in enumerate(memberData)})
+    referenceKcal = max(member["kcal"] for member in members.values())
+    portionFactors = getPortionFactors(members, referenceKcal)
+
+    lowcarb, keto = getHouseholdDiet(members)
+    assert keto == any(member["keto"] for member in members.values())
+    assert not (lowcarb and keto)
+    assert max(portionFactors.values()) == 1
+
+    groceryObjectList = generateGroceryList(mealObjectList)
+    scaledGroceryDict = aggregateGroceryList(groceryObjectList, sum(portionFactors.values()))
+    # scaled amounts are rounded to 0.1, the sums of float amounts may land just past the rounding step
+    for name, amount in aggregateGroceryList(groceryObjectList).items():
+        assert scaledGroceryDict[name] == pytest.approx(amount * sum(portionFactors.values()), abs = 0.05 + 1e-9)
+
+
+groceryDicts = st.dictionaries(ingredientNames, st.integers(1, 1000), max_size = 15)
+
+
+@given(groceryDicts, groceryDicts)
+def test_groceryDiff_appliedToPreviousGivesCurrent(previousGroceryDict, currentGroceryDict):
+    added, dropped, changed = diffGroceryLists(previousGroceryDict, currentGroceryDict)
+
+    assert set(added).isdisjoint(previousGroceryDict) and set(dropped).isdisjoint(currentGroceryDict)
+    assert all(amount != 0 for amount in changed.values())
+    updatedGroceryDict = {name: amount for name, amount in previousGroceryDict.items() if name not in dropped}
+    updatedGroceryDict.update(added)
+    for name, difference in changed.items():
+        updatedGroceryDict[name] += difference
+    assert updatedGroceryDict == currentGroceryDict
+
+
+def test_grocerySnapshot_fallsBackToPreviousResult(tmp_path):
+    resultPath = tmp_path / "groceryList.yaml"
+    snapshotPath = tmp_path / "groceryListSnapshot.yaml"
+    assert readGrocerySnapshot(snapshotPath, resultPath) == {}
+
+    resultPath.write_text(yaml.dump({"choosen meals:": ["meal0"], "grocery list:": {"Reis": 300}}))
+    assert readGrocerySnapshot(snapshotPath, resultPath) == {"Reis": 300}
+
+    writeGrocerySnapshot(snapshotPath, {"Brokkoli": 500})
+    assert readGrocerySnapshot(snapshotPath, resultPath) == {"Brokkoli": 500}
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["groceryList.yaml", "groceryListSnapshot.yaml"]
+
+    # snapshots and results that are no grocery list are skipped instead of breaking the diff
+    snapshotPath.write_text(yaml.dump(["Brokkoli", "Reis"]))
+    assert readGrocerySnapshot(snapshotPath, resultPath) == {"Reis": 300}
+    snapshotPath.write_text(yaml.dump({"Brokkoli": "viel"}))
+    resultPath.write_text(yaml.dump(["meal0"]))
+    assert readGrocerySnapshot(snapshotPath, resultPath) == {}
+
+
+def test_columnarCatalog_matchesYamlConversion(tmp_path):
+    ingredientDict = generateSyntheticIngredientDict(30)
+    mealDict = generateSyntheticMealDict(200, ingredientDict)
+    mealDict["withOptions"] = {"ingredient0": 100, "options": [[{"ingredient1": 50}, {"ingredient2": 70}]], \
+                               "watchList": ["salt"], "postWorkout": True}
+    ingredientObjectList, mealObjectList = convertCatalog(ingredientDict, mealDict)
+    resolveMealList(mealObjectList)
+
+    writeColumnarCatalog(tmp_path / "catalog.glcat", mealDict, ingredientObjectList)
+    catalog = columnarCatalog.fromFile(tmp_path / "catalog.glcat")
+    catalogMealList = resolveMealList(catalog.getMealObjectList())
+
+    assert catalog.mealNumber == len(mealDict)
+    for mealObject, catalogMeal in zip(mealObjectList[:-1], catalogMealList[:-1]):
+        assert catalogMeal.name == mealObject.name
+        assert catalogMeal.kcal == pytest.approx(mealObject.kcal)
+        assert catalogMeal.protein == pytest.approx(mealObject.protein)
+    assert catalog.columns["mealMacros"][:-1, 0] == pytest.approx([mealObject.kcal for mealObject in mealObjectList[:-1]])
+    assert catalogMealList[-1].watchList == ["salt"] and catalogMealList[-1].postWorkout
+    assert [ingredient.name for ingredient in catalogMealList[-1].ingredientList][0] == "ingredient0"
+    assert not catalog.columns["entryAmount"].flags.writeable
+
+
+def test_catalogMealView_macrosMatchTheChoosenOptions(tmp_path):
+    ingredientDict = generateSyntheticIngredientDict(10)
+    mealDict = {"withOptions": {"ingredient0": 100, "options": [[{"ingredient1": 50}, {"ingredient2": 700}], \
+                                                                [{"ingredient3": 20}, {"ingredient4": 300}]]}}
+    ingredientObjectList, _ = convertCatalog(ingredientDict, {})
+    catalogPath = tmp_path / "catalog.glcat"
+    writeColumnarCatalog(catalogPath, mealDict, ingredientObjectList)
+    catalog = columnarCatalog.fromFile(catalogPath)
+
+    for mealView in [mealView for _ in range(20) for mealView in catalog.getMealViewList()]:
+        expectedMeal = meal(mealView.name, [], False, False, mealView.ingredientList)
+        expectedMeal.resolveMacros()
+        assert (mealView.kcal, mealView.fat) == pytest.approx((expectedMeal.kcal, expectedMeal.fat))
+
+    # the mapped catalog stays valid while a new export replaces the file
+    writeColumnarCatalog(catalogPath, {}, ingredientObjectList)
+    assert catalog.getMealName(0) == "withOptions"
+    assert columnarCatalog.fromFile(catalogPath).mealNumber == 0
+    assert [path.name for path in tmp_path.iterdir()] == ["catalog.glcat"]
+
+
+@pytest.mark.parametrize("unitMode, expectedKcal", [
+    # 200 gram Reis, 250 ml Milch, 2 Eier and 1 tablespoon Olivenoel
+    (UNITMODE.EXPLICIT, 2 * 350 + 2.5 * 40 + 2 * 75 + 120),
+    # the legacy guess reads 2 Eier and 1 Olivenoel as pieces and the rest as gram
+    (UNITMODE.LEGACY, 2 * 350 + 2.5 * 40 + 2 * 75 + 120),
+])
+def test_resolveMacros_followsTheUnitOfEveryIngredient(tmp_path, unitMode, expectedKcal):
+    ingredientDict = {
+        "Reis": {"kcal": 350, "carbs": 78, "protein": 7, "fat": 1},
+        "Milch": {"kcal": 40, "carbs": 5, "protein": 3, "fat": 1, "metric": "ml", "density": 1.03},
+        "Eier": {"kcal": 75, "carbs": 1, "protein": 6, "fat": 5, "metric": "piece", "pieceWeight": 60},
+        "Olivenoel": {"kcal": 120, "carbs": 0, "protein": 0, "fat": 13, "metric": "piece", "pieceWeight": 14},
+    }
+    mealDict = {"Pfanne": {"Reis": 200, "Milch": 250, "Eier": 2, "Olivenoel": 1}}
+    ingredientObjectList = [convertIngredientToObject(name, data) for name, data in ingredientDict.items()]
+    mealObject = convertMealToObject("Pfanne", copy.deepcopy(mealDict["Pfanne"]), ingredientObjectList, unitMode)
+    mealObject.resolveMacros()
+
+    writeColumnarCatalog(tmp_path / "catalog.glcat", mealDict, ingredientObjectList, unitMode)
+    catalog = columnarCatalog.fromFile(tmp_path / "catalog.glcat")
+    catalogMeal = resolveMealList(catalog.getMealObjectList())[0]
+
+    assert mealObject.kcal == pytest.approx(expectedKcal)
+    assert mealObject.fat == pytest.approx(2 * 1 + 2.5 * 1 + 2 * 5 + 13)
+    assert catalogMeal.kcal == pytest.approx(expectedKcal)
+    assert catalog.columns["mealMacros"][0, 0] == pytest.approx(expectedKcal)
+    gramFactors = {ingredientObject.name: ingredientObject.gramFactor for ingredientObject in mealObject.ingredientList}
+    if unitMode == UNITMODE.EXPLICIT:
+        assert gramFactors == {"Reis": 1, "Milch": 1.03, "Eier": 60, "Olivenoel": 14}
+    else:
+        assert gramFactors == {"Reis": 1, "Milch": 1, "Eier": 100, "Olivenoel": 100}
+
+
+def test_sharedCatalog_servesWorkerProcesses():
+    ingredientDict = generateSyntheticIngredientDict(30)
+    mealDict = generateSyntheticMealDict(100, ingredientDict)
+    ingredientObjectList, mealObjectList = convertCatalog(ingredientDict, mealDict)
+    resolveMealList(mealObjectList)
+    mealKcal = {mealObject.name: mealObject.kcal for mealObject in mealObjectList}
+
+    with sharedCatalog.fromMeals(mealDict, ingredientObjectList) as catalog:
+        with multiprocessing.get_context("fork").Pool(2) as pool:
+            results = pool.map(planWithSharedCatalog, [catalog.name] * 4)
+        mealViewList = catalog.getMealViewList()
+        assert [mealView.name for mealView in mealViewList] == list(mealDict)
+        assert copy.deepcopy(mealViewList[0]) is mealViewList[0]
+
+    for mealNames, planKcal, groceryDict in results:
+        assert planKcal == pytest.approx(sum(mealKcal[mealName] for mealName in mealNames))
+        assert planKcal >= 4000 - 200
+        assert set(groceryDict) <= set(ingredientDict)
+
+
+def test_sharedCatalog_outlivesUnrelatedWorkerProcesses():
+    ingredientDict = generateSyntheticIngredientDict(5)
+    mealDict = generateSyntheticMealDict(3, ingredientDict)
+    ingredientObjectList, _ = convertCatalog(ingredientDict, mealDict)
+
+    with sharedCatalog.fromMeals(mealDict, ingredientObjectList) as catalog:
+        # a process not started by multiprocessing has its own resource tracker
+        workerCode = "from Lib.sharedCatalog import sharedCatalog; catalog = sharedCatalog.attach({!r}); " \
+                     "print(catalog.mealNumber); catalog.close()".format(catalog.name)
+        worker = subprocess.run([sys.executable, "-c", workerCode], capture_output = True, text = True, \
+                                cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        assert worker.stdout.strip() == "3" and "resource_tracker" not in worker.stderr
+
+        with sharedCatalog.attach(catalog.name) as attachedCatalog:
+            assert attachedCatalog.mealNumber == 3
+
+
+def test_samplingSelector_warnsWithoutPlan(caplog):
+    workoutOnlyMealList = [createMeal("shake", 300, postWorkout = True)]
+
+    assert MEALSELECTORS["sampling"](workoutOnlyMealList, getPlanArgs(days = 1, kcal = 2000)) == []
+    assert "Sampling found no plan" in caplog.text
+
+
+def test_selectorBenchmark_isSeededAndFindsRegressions():
+    # the optimizer stops after its iterations, not after its time budget, so it is seeded as well
+    selectorNames = list(MEALSELECTORS)
+    results = runSelectorBenchmark(selectorNames, [300], ["maintenance", "lowcarb"], 2, 0, 100, 60)
+    repeatedResults = runSelectorBenchmark(selectorNames, [300], ["maintenance", "lowcarb"], 2, 0, 100, 60)
+
+    assert len(results) == 2 * len(selectorNames)
+    for result, repeatedResult in zip(results, repeatedResults):
+        assert result["kcalDeviation"] == repeatedResult["kcalDeviation"]
+        assert 0 < result["variety"] <= 1
+    assert not findRegressions(results, results)
+
+    slowerResults = [dict(result, runtime = result["runtime"] * 2 + 1) for result in results]
+    worseResults = [dict(result, variety = result["variety"] - 0.5) for result in results]
+    assert len(findRegressions(slowerResults, results)) == len(results)
+    assert all("variety" in regression for regression in findRegressions(worseResults, results))
+
+
+def test_nutritionImport_deduplicatesAndWritesIngredientYaml(tmp_path):
+    csvPath = tmp_path / "nutrition.csv"
+    csvPath.write_text("product;energy;carbohydrates;fat;protein\n"
+                       "Brokkoli;34;2,0;0,4;3,8\n"
+                       "  brokkoli ;99;1;1;1\n"
+                       "Yes;100;10;5;1\n"
+                       "Oel: extra;884;0;100;0\n"
+                       "Wasser;0;0;0;0\n"
+                       "Salz;;0;0;0\n"
+                       "Luft;nan;0;0;0\n"
+                       "Reis;350;77;0,6;7\n", encoding = "utf-8")
+    database = nutritionDatabase(tmp_path / "staging.sqlite", batchSize = 2)
+    columnMapping = parseColumnMapping("name=product,kcal=energy,carbs=carbohydrates")
+
+    assert database.importCsv(csvPath, columnMapping, ";", decimalComma = True) == (4, 3, 1)
+
+    database.writeIngredientYaml(tmp_path / "ingredients.yaml")
+    ingredientDict = yaml.safe_load((tmp_path / "ingredients.yaml").read_text(encoding = "utf-8"))
+    assert list(ingredientDict) == ["Brokkoli", "Yes", "Oel: extra", "Reis"]
+    assert ingredientDict["Brokkoli"] == {"carbs": 2, "fat": 0.4, "protein": 3.8, "kcal": 34}
+    assert all(convertIngredientToObject(name, data) for name, data in ingredientDict.items())
+
+    mealDict = {"Reispfanne": {"reis": 100, "options": [[{"BROKKOLI": 200}, {"Moehren": 100}]]}}
+    ingredientObjectList = database.getIngredientObjectList(getReferencedIngredientNames(mealDict))
+    assert [ingredientObject.name for ingredientObject in ingredientObjectList] == ["BROKKOLI", "reis"]
+    database.close()
+
+
+def test_nutritionImport_keepsTheUnitsOfTheIngredientYaml(tmp_path):
+    csvPath = tmp_path / "nutrition.csv"
+    csvPath.write_text("name,kcal,carbs,fat,protein\n"
+                       "Eier,150,1,10,13\n"
+                       "Milch,46,4.8,1.5,3.4\n"
+                       "Reis,350,77,0.00001,7\n", encoding = "utf-8")
+    database = nutritionDatabase(tmp_path / "staging.sqlite")
+    database.importCsv(csvPath)
+
+    # numbers like 1e-05 would read back as string without the yaml emitter
+    database.writeIngredientYaml(tmp_path / "ingredients.yaml")
+    assert yaml.safe_load((tmp_path / "ingredients.yaml").read_text(encoding = "utf-8"))["Reis"]["fat"] == 0.00001
+    assert [path.name for path in tmp_path.iterdir() if path.name.startswith(".")] == []
+
+    unitDict = {"Eier": {"kcal": 75, "metric": "piece", "pieceWeight": 60}, "Milch": {"metric": "ml", "density": 1.03}}
+    mealDict = {"Omelett": {"Eier": 2, "Milch": 100, "Reis": 100}}
+    ingredientObjectList = database.getIngredientObjectList(getReferencedIngredientNames(mealDict), unitDict)
+    writeColumnarCatalog(tmp_path / "catalog.glcat", mealDict, ingredientObjectList)
+    catalog = columnarCatalog.fromFile(tmp_path / "catalog.glcat")
+    database.close()
+
+    # 2 eggs of 60 gram and 100 ml milk of 1.03 gram per ml
+    assert catalog.getMealViewList()[0].kcal == pytest.approx(2 * 90 + 47 + 350, abs = 1)
+
+
+def test_backgroundWriter_runsJobsInOrderAndFlushes(tmp_path):
+    resultWriter = backgroundWriter(maxJobs = 2)
+    records = [(RESULTSECTION.GROCERIES, "ingredient{}".format(index), index) for index in range(50)]
+    for jobIndex in range(5):
+        sinks = getOutputSinks(["csv"], tmp_path, "groceryList{}".format(jobIndex))
+        resultWriter.submit(writeRecordsToSinks, records, sinks)
+    resultWriter.submit(lambda: 1 / 0)
+    resultWriter.close()
+
+    assert resultWriter.failedJobs == 1
+    for jobIndex in range(5):
+        assert len((tmp_path / "groceryList{}.csv".format(jobIndex)).read_text().splitlines()) == 51
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_outputSinks_writeResultLayouts(tmp_path):
+    records = [(RESULTSECTION.MEALS, "Reispfanne", None), (RESULTSECTION.MEALS, "Omelett", None), \
+               (RESULTSECTION.GROCERIES, "Eier", 4), (RESULTSECTION.GROCERIES, "Reis", 125.5)]
+    sections = (RESULTSECTION.MEALS, RESULTSECTION.GROCERIES, RESULTSECTION.WATCHLIST)
+    writeRecordsToSinks(records, getOutputSinks(["yaml", "jsonl", "csv"], tmp_path, "groceryList", sections = sections))
+
+    # the yaml sink keeps the layout of the original result file, empty sections included
+    resultsDict = {"choosen meals:": ["Reispfanne", "Omelett"], "grocery list:": {"Eier": 4, "Reis": 125.5}, \
+                   "watch list:": []}
+    assert (tmp_path / "groceryList.yaml").read_text() == yaml.dump(resultsDict, default_flow_style = False)
+    jsonLines = [json.loads(line) for line in (tmp_path / "groceryList.jsonl").read_text().splitlines()]
+    assert jsonLines[0] == {"section": "meals", "name": "Reispfanne", "amount": None}
+    assert jsonLines[-1] == {"section": "groceries", "name": "Reis", "amount": 125.5}
+    assert (tmp_path / "groceryList.csv").read_text().splitlines()[-1] == "groceries,Reis,125.5"
+
+
+def test_resultFiles_getThePermissionsOfARegularOpen(tmp_path):
+    previousUmask = os.umask(0o027)
+    try:
+        writeRecordsToSinks([(RESULTSECTION.GROCERIES, "Reis", 300)], getOutputSinks(["yaml"], tmp_path, "groceryList"))
+        writeGrocerySnapshot(tmp_path / "groceryListSnapshot.yaml", {"Reis": 300})
+        writeColumnarCatalog(tmp_path / "catalog.glcat", {}, [])
+    finally:
+        os.umask(previousUmask)
+
+    assert {path.name: path.stat().st_mode & 0o777 for path in tmp_path.iterdir()} == \
+           {"groceryList.yaml": 0o640, "groceryListSnapshot.yaml": 0o640, "catalog.glcat": 0o640}
+
+
+def test_writeRecordsToSinks_keepsPreviousResultsOnFailure(tmp_path):
+    records = [(RESULTSECTION.GROCERIES, "Reis", 300)]
+    writeRecordsToSinks(records, getOutputSinks(["yaml", "jsonl"], tmp_path, "groceryList"))
+    previousResults = {path.name: path.read_text() for path in tmp_path.iterdir()}
+    newRecords = [(RESULTSECTION.GROCERIES, "Brokkoli", 500)]
+
+    with pytest.raises(ValueError):
+        writeRecordsToSinks(generateFailingRecords(newRecords), getOutputSinks(["yaml", "jsonl"], tmp_path, "groceryList"))
+
+    # the second sink can not be opened, the first one already created its temporary file
+    (tmp_path / "blocked").write_text("")
+    sinks = getOutputSinks(["yaml"], tmp_path, "groceryList") + getOutputSinks(["csv"], tmp_path / "blocked", "groceryList")
+    with pytest.raises(OSError):
+        writeRecordsToSinks(newRecords, sinks)
+
+    assert {path.name: path.read_text() for path in tmp_path.iterdir() if path.name != "blocked"} == previousResults
+
+    # the result files replaced before the failing one keep the new results, no temporary file is left
+    sinks = getOutputSinks(["yaml", "jsonl"], tmp_path, "groceryList") + \
+            [failingCommitSink(tmp_path / "groceryList.csv")]
+    with pytest.raises(OSError):
+        writeRecordsToSinks(newRecords, sinks)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["blocked", "groceryList.jsonl", "groceryList.yaml"]
+    assert "Brokkoli" in (tmp_path / "groceryList.yaml").read_text()
+    assert "Brokkoli" in (tmp_path / "groceryList.jsonl").read_text()
+
+
+sortedIdLists = st.lists(st.integers(0, 60), unique = True).map(sorted)
+
+
+@given(sortedIdLists, sortedIdLists)
+def test_intersectSortedLists_matchesSetIntersection(shortList, longList):
+    assert intersectSortedLists(shortList, longList) == sorted(set(shortList) & set(longList))
+
+
+@given(catalogs(), st.integers(1, 3), st.integers(1, 1000))
+def test_ingredientIndex_findsAndRanksMealsByPantry(catalog, ingredientNumber, stock):
+    ingredientDict, mealDict = catalog
+    mealIndex = ingredientIndex(mealDict)
+    ingredientNames = list(ingredientDict)[:ingredientNumber]
+
+    assert mealIndex.getMealsWithAll(ingredientNames) == \
+           [mealName for mealName, mealData in mealDict.items() if all(name in mealData for name in ingredientNames)]
+
+    ranking = mealIndex.rankByPantry({ingredientName: stock for ingredientName in ingredientNames})
+    assert [coverage for _, coverage in ranking] == sorted((coverage for _, coverage in ranking), reverse = True)
+    expectedRanking = {}
+    for mealName, mealData in mealDict.items():
+        coveredAmounts = [min(stock / mealData[name], 1) for name in ingredientNames if name in mealData]
+        if coveredAmounts:
+            expectedRanking[mealName] = sum(coveredAmounts) / len(mealData)
+    assert dict(ranking) == pytest.approx(expectedRanking)
+
+
+def test_ingredientIndex_indexesOptionsButRanksBaseIngredients():
+    mealIndex = ingredientIndex({"Reispfanne": {"Reis": 100, "options": [[{"Brokkoli": 200}, {"Erbsen": 100}]], \
+                                                "optional": [{"Chili": 5}], "watchList": ["Salz"]}, \
+                                 "Milchreis": {"Reis": 100, "Milch": 500}})
+
+    assert mealIndex.getMealsWithAll(["Reis", "Brokkoli"]) == ["Reispfanne"]
+    assert mealIndex.getMealsWithAll(["Reis"]) == ["Reispfanne", "Milchreis"]
+    assert mealIndex.getMealsWithAll(["Reis", "Salz"]) == [] and mealIndex.getMealsWithAll([]) == []
+    assert mealIndex.getPostings("Erbsen") == [("Reispfanne", "option 1.2", 100)]
+    assert mealIndex.rankByPantry({"Reis": 50, "Brokkoli": 200}) == [("Reispfanne", 0.5), ("Milchreis", 0.25)]
+
+
+def test_pantry_isParsedConvertedAndSubtracted():
+    pantry = parsePantry("Eier=120g, Reis = 300,Milch=0.5")
+    assert pantry == {"Eier": (120, True), "Reis": (300, False), "Milch": (0.5, False)}
+    for pantryString in ("Eier=nan", "Eier=inf", "Eier=1e400", "Eier=-1", "Eier=0", "=5", "Eier", "Eier=g"):
+        with pytest.raises(SystemExit):
+            parsePantry(pantryString)
+
+    ingredientObjectList = [convertIngredientToObject("Eier", {"carbs": 1, "fat": 5, "protein": 7, "kcal": 75, \
+                                                               "metric": "piece", "pieceWeight": 60}), \
+                            convertIngredientToObject("Reis", {"carbs": 77, "fat": 1, "protein": 7, "kcal": 350})]
+    convertedPantry = convertPantryToMetric(pantry, ingredientObjectList)
+    assert convertedPantry == {"Eier": 2, "Reis": 300}
+    assert subtractPantry({"Eier": 4, "Reis": 250, "Brokkoli": 500}, convertedPantry) == {"Eier": 2, "Brokkoli": 500}
+
+
+def test_estimateGroceryCost_roundsUpToPackages():
+    ingredientObjectList = [convertIngredientToObject("Eier", {"carbs": 1, "fat": 5, "protein": 7, "kcal": 75, \
+                                                               "price": 2.79, "package": 10, "metric": "piece", \
+                                                               "pieceWeight": 60}), \
+                            convertIngredientToObject("Reis", {"carbs": 77, "fat": 1, "protein": 7, "kcal": 350, \
+                                                               "price": 1.5, "package": 500}), \
+                            convertIngredientToObject("Salz", {"carbs": 0, "fat": 0, "protein": 0, "kcal": 1})]
+
+    costDict, totalCost, unpricedItems = estimateGroceryCost({"Eier": 14, "Reis": 500, "Salz": 10, "Pfeffer": 3}, \
+                                                             ingredientObjectList)
+    assert costDict == {"Eier": 5.58, "Reis": 1.5}
+    assert totalCost == 7.08 and unpricedItems == ["Salz", "Pfeffer"]
+    assert estimateGroceryCost({"Salz": 10}, ingredientObjectList) == ({}, 0.0, ["Salz"])
+
+
+@given(pricedCatalogs(), st.integers(500, 6000), st.integers(1, 3000), st.sampled_from([1, 1.5, 2.3]), \
+       st.integers(0, 300), st.integers(0, 2))
+@settings(deadline = None)
+def test_chooseMealsWithinBudget_keepsPackageRoundedTotal(catalog, targetKcal, budgetCents, groceryScale, stock, fixedMeals):
+    ingredientDict, mealDict = catalog
+    ingredientObjectList, mealObjectList = convertCatalog(ingredientDict, mealDict)
+    resolveMealList(mealObjectList)
+    budget = budgetCents / 100
+    fixedMealList = mealObjectList[:fixedMeals]
+    pantry = {list(ingredientDict)[0]: stock}
+
+    choosenMealList = chooseMealsWithinBudget(mealObjectList, targetKcal, budget, fixedMealList, \
+                                              pantry = pantry, groceryScale = groceryScale)
+
+    # the result file computes the costs of the scaled grocery list without the stock
+    def getTotalCost(planMealList):
+        groceryDict = aggregateGroceryList(generateGroceryList(planMealList), groceryScale)
+        return estimateGroceryCost(subtractPantry(groceryDict, pantry), ingredientObjectList)[1]
+    assert getTotalCost(fixedMealList + choosenMealList) <= max(budget, getTotalCost(fixedMealList)) + 1e-6
+
+
+def test_chooseMealsWithinBudget_prefersPricedAndPreferredMeals():
+    ingredientDict = {"Reis": {"carbs": 77, "fat": 1, "protein": 7, "kcal": 350, "price": 1.0, "package": 1000}, \
+                      "Lachs": {"carbs": 0, "fat": 13, "protein": 20, "kcal": 200, "price": 4.0, "package": 200}, \
+                      "Kraeuter": {"carbs": 0, "fat": 0, "protein": 0, "kcal": 1}}
+    mealDict = {"Reis pur": {"Reis": 250}, "Lachs mit Reis": {"Reis": 125, "Lachs": 200}, \
+                "Reis mit Kraeutern": {"Reis": 250, "Kraeuter": 10}}
+    _, mealObjectList = convertCatalog(ingredientDict, mealDict)
+    resolveMealList(mealObjectList)
+
+    choosenMealList = chooseMealsWithinBudget(mealObjectList, 2000, 2.0, tolerance = 0)
+    assert [mealObject.name for mealObject in choosenMealList][:1] == ["Reis pur"]
+    assert "Lachs mit Reis" not in [mealObject.name for mealObject in choosenMealList]
+
+    choosenMealList = chooseMealsWithinBudget(mealObjectList, 2000, 10.0, preferredMealList = [mealObjectList[1]], \
+                                              tolerance = 0)
+    assert [mealObject.name for mealObject in choosenMealList][:2] == ["Lachs mit Reis", "Reis pur"]
+
+
+def test_chooseMealsWithinBudget_checksBoundedCandidates(monkeypatch):
+    ingredientDict = generateSyntheticIngredientDict(50)
+    for ingredientIndex, ingredientData in enumerate(ingredientDict.values()):
+        ingredientData.update(price = 0.5 + ingredientIndex % 7, package = 250)
+    _, mealObjectList = convertCatalog(ingredientDict, generateSyntheticMealDict(2000, ingredientDict))
+    resolveMealList(mealObjectList)
+
+    checkedMeals = []
+    getAdditionalCost = groceryCost.getAdditionalCost
+    monkeypatch.setattr(groceryCost, "getAdditionalCost", \
+                        lambda self, meal: checkedMeals.append(meal) or getAdditionalCost(self, meal))
+    choosenMealList = chooseMealsWithinBudget(mealObjectList, 9000, 200.0)
+
+    # one exact cost per checked candidate and step, one more per chosen meal when it is added
+    assert choosenMealList
+    assert len(checkedMeals) <= len(choosenMealList) * (CANDIDATELIMIT + 1) + CANDIDATELIMIT
+
+
+@given(st.lists(st.tuples(*[st.integers(0, 5)] * len(OBJECTIVES)), min_size = 1, max_size = 30))
+def test_getParetoFront_keepsExactlyTheNonDominatedPlans(objectiveTuples):
+    objectives = np.array(objectiveTuples, dtype = float)
+    front = set(getParetoFront(objectives).tolist())
+
+    for index, objective in enumerate(objectives):
+        dominated = any(np.all(other <= objective) and np.any(other < objective) for other in objectives)
+        assert (index in front) == (not dominated)
+
+
+@given(resolvedMealLists, st.integers(500, 6000), st.integers(0, 300))
+@settings(deadline = None, max_examples = 30)
+def test_optimizeMealPlans_returnsSortedParetoFront(mealList, targetKcal, targetCarb):
+    plans = optimizeMealPlans(mealList, targetKcal, targetCarb, iterations = 200, timeBudget = 60, seed = 0)
+
+    assert 1 <= len(plans) <= 5
+    objectives = np.array([[plan[objectiveName] for objectiveName in OBJECTIVES] for plan in plans])
+    assert len(getParetoFront(objectives)) == len(plans)
+    assert [plan["kcalError"] + plan["macroError"] for plan in plans] == \
+           sorted(plan["kcalError"] + plan["macroError"] for plan in plans)
+    for plan in plans:
+        planKcal = sum(mealObject.kcal for mealObject in plan["meals"])
+        assert plan["kcalError"] == pytest.approx(abs(planKcal - targetKcal) / targetKcal, abs = 1e-4)
+
+
+def test_optimizeMealPlans_handlesZeroAndInfeasibleTargets():
+    mealList = [createMeal("small", 500, 20)]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert optimizeMealPlans(mealList, 0, seed = 0) == []
+        assert optimizeMealPlans(mealList, -850, seed = 0) == []
+        choosenMealList = chooseMeals(mealList, getPlanArgs(days = 1, kcal = 1500, cheatmeals = 2, optimize = True))
+    assert choosenMealList == []
+
+    # two portions of the only meal are as close as the plan gets to the target
+    plans = optimizeMealPlans(mealList, 5000, iterations = 200, timeBudget = 60, seed = 0)
+    assert [mealObject.name for mealObject in plans[0]["meals"]] == ["small", "small"]
+    assert plans[0]["kcalError"] == pytest.approx(0.8)
+
+
+def test_planHistory_persistsRunsAndWeightsRecentAndFrequentMeals(tmp_path):
+    historyPath = tmp_path / "planHistory.sqlite"
+    history = planHistory(historyPath)
+    assert history.getWeight("Curry") == 1 and history.getLastChosen("Curry") is None
+
+    history.recordPlan(["Curry", "Salat"])
+    history.recordPlan(["Curry", "Curry"])
+    history.close()
+
+    history = planHistory(historyPath)
+    assert history.runCount == 2
+    assert history.timesChosen == {"Curry": 3, "Salat": 1}
+    assert history.getLastChosen("Curry") >= history.getLastChosen("Salat")
+    # chosen in the last run: full recency penalty, Salat one run ago: half of it
+    assert history.getPenalty("Curry") == pytest.approx(4.0 + 3 / 2)
+    assert history.getPenalty("Salat") == pytest.approx(2.0 + 1 / 2)
+    assert history.getWeight("Curry") < history.getWeight("Salat") < history.getWeight("Reis") == 1
+
+    history.recordPlan(["Reis"])
+    assert history.getPenalty("Salat") == pytest.approx(1.0 + 1 / 3)
+    history.close()
+
+
+def test_chooseMeals_weightsTheOptimizerByTheHistory(tmp_path):
+    mealList = [createMeal("Curry", 1000), createMeal("Salat", 1000)]
+    history = planHistory(tmp_path / "planHistory.sqlite")
+    history.recordPlan(["Curry"])
+
+    for _ in range(5):
+        choosenMealList = chooseMeals(mealList, getPlanArgs(days = 1, kcal = 1000, optimize = True), history = history)
+        assert [mealObject.name for mealObject in choosenMealList] == ["Salat"]
+    history.close()
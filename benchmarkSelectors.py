@@ -0,0 +1,120 @@
+###################################################################################################
+#                                Description                                                      #
+#    Runs every registered meal selector over the same seeded profiles and synthetic catalogs     #
+#    and reports runtime, kcal deviation, macro error and variety as table and json. Given a     #
+#    baseline json of an earlier run, regressions are listed and the script exits with 1.        #
+#                                                                                                 #
+###################################################################################################
+
+
+###################################################################################################
+#                                Imports                                                          #
+###################################################################################################
+
+import json
+import sys
+
+from argparse import ArgumentParser
+from pathlib import Path
+
+from Lib.prettyLogger import getPrettyLogger
+from Lib.prettyLogger import LOGMODUS
+from Lib.prettyLogger import FILELOGGING
+
+from Lib.helperFunctions import registerLoggers
+from Lib.mealPlanning import registerMealPlanningLogger
+from Lib.mealSelectors import MEALSELECTORS
+from Lib.mealSelectors import registerMealSelectorsLogger
+from Lib.selectorBenchmark import PROFILES
+from Lib.selectorBenchmark import findRegressions
+from Lib.selectorBenchmark import formatResultTable
+from Lib.selectorBenchmark import getFastestSelectors
+from Lib.selectorBenchmark import registerSelectorBenchmarkLogger
+from Lib.selectorBenchmark import runSelectorBenchmark
+
+
+###################################################################################################
+#                                Input Arguments                                                  #
+###################################################################################################
+# create parser object
+parser = ArgumentParser()
+
+# define input options
+parser.add_argument('--selectors', help = 'Selectors to compare', nargs = '+', \
+                    choices = list(MEALSELECTORS), default = list(MEALSELECTORS))
+parser.add_argument('--sizes', help = 'Meal counts of the synthetic catalogs', nargs = '+', type = int, \
+                    default = [500, 5000])
+parser.add_argument('--profiles', help = 'Plan profiles to run', nargs = '+', choices = list(PROFILES), \
+                    default = list(PROFILES))
+parser.add_argument('--repeats', help = 'Seeded runs per selector, catalog and profile', type = int, \
+                    default = 3)
+parser.add_argument('--seed', help = 'Seed of the catalogs and the first run', type = int, default = 0)
+parser.add_argument('--iterations', help = 'Maximum number of optimizer iterations', type = int, \
+                    default = 500)
+parser.add_argument('--timebudget', help = 'Maximum optimizer run time in seconds', type = float, \
+                    default = 1.0)
+parser.add_argument('--maxkcaldeviation', help = 'Quality bar of the fastest selector recommendation', \
+                    type = float, default = 200)
+parser.add_argument('--output', help = 'Path of the json report', type = Path, \
+                    default = Path.cwd() / "Results" / "selectorBenchmark.json")
+parser.add_argument('--baseline', help = 'Json report of an earlier run to check for regressions', \
+                    type = Path, default = None)
+parser.add_argument('--slowdown', help = 'Tolerated runtime growth against the baseline as share', \
+                    type = float, default = 0.5)
+parser.add_argument('--verbose', '-v', help='Show debug information', action="store_true", \
+                     default = False)
+
+# read input
+args = parser.parse_args()
+
+
+###################################################################################################
+#                                   Logger                                                        #
+###################################################################################################
+
+logLevel = LOGMODUS.VERBOSE if args.verbose else LOGMODUS.NORMAL
+logger = getPrettyLogger(Path(__file__).stem, logLevel, FILELOGGING.INACTIVE)
+
+
+###################################################################################################
+#                                Driver                                                           #
+###################################################################################################
+if __name__ == '__main__':
+
+    registerLoggers(logger)
+    # these modules import helperFunctions themselves, registerLoggers can not import them
+    registerMealPlanningLogger(logger)
+    registerMealSelectorsLogger(logger)
+    registerSelectorBenchmarkLogger(logger)
+
+    # read the baseline before the report is written, the report may replace it
+    if args.baseline:
+        if not args.baseline.is_file():
+            logger.error("Baseline {} does not exist".format(args.baseline))
+            sys.exit(1)
+        with open(args.baseline, "r") as fileDeskriptor:
+            baselineResults = json.load(fileDeskriptor)["results"]
+
+    logger.info("*** run selectors ***")
+    results = runSelectorBenchmark(args.selectors, args.sizes, args.profiles, args.repeats, args.seed, \
+                                   args.iterations, args.timebudget)
+
+    print(formatResultTable(results))
+    for catalogSize, selectorName in getFastestSelectors(results, args.maxkcaldeviation).items():
+        print("Fastest selector within {} kcal on {} meals: {}".format(args.maxkcaldeviation, catalogSize, \
+                                                                       selectorName))
+
+    logger.info("*** write report ***")
+    args.output.parent.mkdir(parents = True, exist_ok = True)
+    report = {"settings": {key: str(value) for key, value in vars(args).items()}, "results": results}
+    with open(args.output, "w") as fileDeskriptor:
+        json.dump(report, fileDeskriptor, indent = 2)
+
+    if args.baseline:
+        logger.info("*** check baseline ***")
+        regressions = findRegressions(results, baselineResults, args.slowdown)
+        for regression in regressions:
+            logger.error("Regression: {}".format(regression))
+        if regressions:
+            sys.exit(1)
+        logger.info("No regressions against {}".format(args.baseline))
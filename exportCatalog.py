@@ -0,0 +1,94 @@
+###################################################################################################
+#                                Description                                                      #
+#    Compiles the meal and ingredient yaml config files into a columnar catalog file. The         #
+#    grocery list generator maps this file into memory with --catalog instead of parsing the      #
+#    yaml files, so several planner processes share one copy and start without parsing.          #
+#                                                                                                 #
+###################################################################################################
+
+
+###################################################################################################
+#                                Imports                                                          #
+###################################################################################################
+
+from argparse import ArgumentParser
+from pathlib import Path
+
+from Lib.prettyLogger import getPrettyLogger
+from Lib.prettyLogger import LOGMODUS
+from Lib.prettyLogger import FILELOGGING
+
+from Lib.helperFunctions import *
+from Lib.columnarCatalog import writeColumnarCatalog
+
+from Class.ingredient import UNITMODE
+
+
+###################################################################################################
+#                                Input Arguments                                                  #
+###################################################################################################
+# create parser object
+parser = ArgumentParser()
+
+# define input options
+parser.add_argument('--output', help = 'Path of the catalog file', type = Path, \
+                    default = Path.cwd() / "Results" / "catalog.glcat")
+parser.add_argument('--legacyunits', help='Treat amounts above 10 as gram and smaller amounts as \
+                    pieces instead of using the metric of the ingredient yaml', \
+                    action="store_true", default = False)
+parser.add_argument('--verbose', '-v', help='Show debug information', action="store_true", \
+                     default = False)
+
+# read input
+args = parser.parse_args()
+
+
+###################################################################################################
+#                                   Logger                                                        #
+###################################################################################################
+
+logLevel = LOGMODUS.VERBOSE if args.verbose else LOGMODUS.NORMAL
+logger = getPrettyLogger(Path(__file__).stem, logLevel, FILELOGGING.INACTIVE)
+
+
+###################################################################################################
+#                                Global Variables                                                 #
+###################################################################################################
+
+# Path to meal list yaml config file
+mealDictFile = Path.cwd() / "Config" / "mealList.yaml"
+
+# Path to ingredient list yaml config file
+ingredientDictFile = Path.cwd() / "Config" / "ingredientList.yaml"
+
+# Path to pre workout meal yaml config file
+preWorkoutDictFile = Path.cwd() / "Config" / "preWorkout.yaml"
+
+# Path to post workout meal yaml config file
+postWorkoutDictFile = Path.cwd() / "Config" / "postWorkout.yaml"
+
+
+###################################################################################################
+#                                Driver                                                           # 
+###################################################################################################
+if __name__ == '__main__':
+
+    registerLoggers(logger)
+    checkConfigFileExist([mealDictFile, ingredientDictFile, preWorkoutDictFile, postWorkoutDictFile])
+
+    logger.info("*** Read yaml config files ***")
+    ingredientDict = readYamlFile(ingredientDictFile, "Ingredient")
+    mealDict = readYamlFile(mealDictFile, "Meal")
+    taggedPostWorkoutMealDict, taggedPreWorkoutMealDict = tagWorkoutMeals( \
+        readYamlFile(postWorkoutDictFile, "PostWorkout"), readYamlFile(preWorkoutDictFile, "Preworkout"))
+    mealDict.update(taggedPostWorkoutMealDict)
+    mealDict.update(taggedPreWorkoutMealDict)
+
+    logger.info("*** convert ingredients ***")
+    ingredientObjectList = [convertIngredientToObject(name, data) for name, data in ingredientDict.items()]
+    ingredientObjectList = [ingredientObject for ingredientObject in ingredientObjectList if ingredientObject]
+
+    logger.info("*** export catalog ***")
+    args.output.parent.mkdir(parents = True, exist_ok = True)
+    unitMode = UNITMODE.LEGACY if args.legacyunits else UNITMODE.EXPLICIT
+    writeColumnarCatalog(args.output, mealDict, ingredientObjectList, unitMode)
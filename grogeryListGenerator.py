@@ -19,22 +19,36 @@
 import logging
 import sys
 import yaml
-import copy
-import random
 
 from argparse import ArgumentParser
 from pathlib import Path
-from enum import Enum
-from operator import attrgetter
 
 from Lib.prettyLogger import getPrettyLogger
 from Lib.prettyLogger import LOGMODUS
 from Lib.prettyLogger import FILELOGGING
+from Lib.prettyLogger import ASYNCLOGGING
 
 from Lib.helperFunctions import *
-
-from Class.meal import meal
-from Class.ingredient import ingredient
+from Lib.backgroundWriter import backgroundWriter
+from Lib.columnarCatalog import columnarCatalog
+from Lib.costEstimation import estimateGroceryCost
+from Lib.energyBudget import CHEATMEALKCAL
+from Lib.groceryDiff import diffGroceryLists
+from Lib.groceryDiff import generateDiffRecords
+from Lib.groceryDiff import readGrocerySnapshot
+from Lib.groceryDiff import writeGrocerySnapshot
+from Lib.household import getHouseholdDiet
+from Lib.household import getHouseholdMembers
+from Lib.household import getPortionFactors
+from Lib.mealPlanning import *
+from Lib.planHistory import planHistory
+from Lib.outputSinks import OUTPUTSINKS
+from Lib.outputSinks import RESULTSECTION
+from Lib.outputSinks import getOutputSinks
+from Lib.outputSinks import writeRecordsToSinks
+
+from Class.ingredient import UNITMODE
+from Class.ingredientIndex import ingredientIndex
 
 
 ###################################################################################################
@@ -46,16 +60,57 @@ parser = ArgumentParser()
 # define input options
 parser.add_argument('--days', help = 'Number of days the grogerys should last', type = int, \
                     required = True)
-parser.add_argument('--kcal', help = 'Number of calories required for a day without sport', \
-                    type = int, required = True)
+parser.add_argument('--kcal', help = 'Number of calories required for a day without sport. Not \
+                    needed with --household', type = int, default = None)
 parser.add_argument('--lowcarb', help = 'Make the generator filter out high carb meals', \
                     action="store_true", default=False)
 parser.add_argument('--keto', help = 'Make the generator filter out carb meals', \
                     action="store_true", default=False)
-parser.add_argument('--workout', help='Number of workouts during the choosen period of time', \
-                    type = int, default = False)
+parser.add_argument('--workout', help='Number of workouts during the choosen period of time. Every \
+                    workout adds a pre and a post workout meal', type = int, default = 0)
 parser.add_argument('--cheatmeals', help='Number of meals that are taken outside during the \
-                     choosen period', type = int, default = False)
+                     choosen period. Their kcal are subtracted from the target', type = int, default = 0)
+parser.add_argument('--cheatkcal', help='Estimated kcal of one cheat meal', type = int, \
+                    default = CHEATMEALKCAL)
+parser.add_argument('--household', help='Yaml file with the kcal count and diet flags per household \
+                    member. The meals are shared and the portions scaled per member', type = Path, \
+                    default = None)
+parser.add_argument('--have', help='Ingredients in stock, e.g. Brokkoli=500,Eier=4,Reis=300. Amounts \
+                    are in the metric of the ingredient, append g for gram, e.g. Eier=120g. Meals using \
+                    them are preferred and the stock is subtracted from the grocery list', \
+                    type = parsePantry, default = {})
+parser.add_argument('--budget', help='Maximum grocery costs. Meals are chosen by their costs per \
+                    kcal instead of randomly', type = float, default = None)
+parser.add_argument('--optimize', help='Optimize the meal plan for kcal and macro targets and list \
+                    the best alternatives', action="store_true", default = False)
+parser.add_argument('--protein', help='Daily protein target in gram for --optimize', type = int, \
+                    default = 0)
+parser.add_argument('--carbs', help='Daily carb target in gram for --optimize', type = int, \
+                    default = 0)
+parser.add_argument('--fat', help='Daily fat target in gram for --optimize', type = int, \
+                    default = 0)
+parser.add_argument('--iterations', help='Maximum number of optimizer iterations', type = int, \
+                    default = 2000)
+parser.add_argument('--timebudget', help='Maximum optimizer run time in seconds', type = float, \
+                    default = 2.0)
+parser.add_argument('--alternatives', help='Number of distinct meal plans to sample at once. Every \
+                    plan is written to its own numbered result file', type = int, default = None)
+parser.add_argument('--nohistory', help='Neither read nor extend the history of previous plans', \
+                    action="store_true", default = False)
+parser.add_argument('--legacyunits', help='Treat amounts above 10 as gram and smaller amounts as \
+                    pieces instead of using the metric of the ingredient yaml', \
+                    action="store_true", default = False)
+parser.add_argument('--catalog', help='Read meals and ingredients from a columnar catalog file \
+                    created by exportCatalog.py instead of the yaml config files', type = Path, \
+                    default = None)
+parser.add_argument('--format', help='Output formats of the results', nargs = '+', \
+                    choices = list(OUTPUTSINKS), default = ['yaml'])
+parser.add_argument('--diff', help='Only output what to add, drop or change compared to the grocery \
+                    list of the previous run', action="store_true", default = False)
+parser.add_argument('--rundir', help='Write the results into a new directory per run', \
+                    action="store_true", default = False)
+parser.add_argument('--async', help='Write log output and result files in background threads', \
+                    dest = 'asyncOutput', action="store_true", default = False)
 parser.add_argument('--verbose', '-v', help='Show debug information', action="store_true", \
                      default = False)
 parser.add_argument('--quiet', '-q', help='Show minimalistic output', action="store_true", \
@@ -80,7 +135,8 @@ else:
     logLevel = LOGMODUS.NORMAL
 
 loggerName = Path(__file__).stem
-logger = getPrettyLogger(loggerName, logLevel, FILELOGGING.INACTIVE)
+asyncLogging = ASYNCLOGGING.ACTIVE if args.asyncOutput else ASYNCLOGGING.INACTIVE
+logger = getPrettyLogger(loggerName, logLevel, FILELOGGING.INACTIVE, asyncLogging)
 
 
 ###################################################################################################
@@ -102,8 +158,23 @@ postWorkoutDictFile = Path.cwd() / "Config" / "postWorkout.yaml"
 # list of all input config files
 configFiles = [mealDictFile, ingredientDictFile, preWorkoutDictFile, postWorkoutDictFile]
 
-# Path to generation results
-resultPath = Path.cwd() / "Results" / "groceryList.yaml"
+# Directory of generation results
+resultDirectory = Path.cwd() / "Results"
+
+# File name of generation results without extension
+resultName = "groceryList"
+
+# Path to the history of previous plans
+historyPath = Path.cwd() / "Results" / "planHistory.sqlite"
+
+# Writer thread for the result files, only used with --async
+resultWriter = None
+
+# Portion factor per household member, empty without --household
+portionFactors = {}
+
+# Stock of the --have option in the metric of every ingredient
+pantry = {}
 
 # List of ingredients extracted from yaml
 ingredientList = []
@@ -126,15 +197,6 @@ watchList = []
 # -------------------------------------------------------------------------------------------------
 groceryList = {}
 
-###################################################################################################
-#                                private classes                                                  # 
-###################################################################################################
-
-# Kcal per carb treshold
-class TRESHOLD(Enum):
-    LOWCARB = 8
-    KETO = 3
-
 ###################################################################################################
 #                                private functions                                                # 
 ###################################################################################################
@@ -147,6 +209,7 @@ def initialize():
     checkPythonVersion()
     checkConfigFileExist(configFiles)
     registerLoggers(logger)
+    registerMealPlanningLogger(logger)
 
 
 def readYamlFiles():
@@ -179,7 +242,7 @@ def readYamlFiles():
                                 fat: amount,
                                 protein: amount,
                                 kcal: amount,
-                                metric: {gram, unit} (optional)
+                                metric: {gram, ml, piece} (optional)
                             },
                 
                 Ingredient2 ...
@@ -223,14 +286,17 @@ def readYamlFiles():
     # add the tagged pre and postworkout meals to the regular meal list
     mealDict.update(taggedPostWorkoutMealDict)
     mealDict.update(taggedPreWorkoutMealDict)
-    logger.info(yaml.dump(mealDict))
+    # dumping the whole catalog is expensive, only do it if the log shows it
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(yaml.dump(mealDict))
 
     return mealDict, ingredientDict
 
 
-def generateMealObjectList(mealDict, ingredientObjectList):
+def generateMealObjectList(mealDict, ingredientObjectList, unitMode = UNITMODE.EXPLICIT):
     """
-    Generates and returns a list of meal objects from the given meal dictionary.
+    Generates and returns a list of meal objects from the given meal dictionary. The units of
+    all ingredient amounts are resolved according to the given UNITMODE.
 
     input: dictionary
         Meal1 {
@@ -257,7 +323,7 @@ def generateMealObjectList(mealDict, ingredientObjectList):
 
     # Conversion
     for mealName, mealData in mealDict.items():
-        mealObject = convertMealToObject(mealName, mealData, ingredientObjectList)
+        mealObject = convertMealToObject(mealName, mealData, ingredientObjectList, unitMode)
         # make sure an object was created
         if mealObject:
             mealObjectListInit.append(mealObject)
@@ -268,8 +334,9 @@ def generateMealObjectList(mealDict, ingredientObjectList):
         sys.exit(1)
 
     # add debug information
-    mealNames = [meal.name for meal in mealObjectListInit]
-    logger.info("Extracted meals: \n{}".format(yaml.dump(mealNames)))
+    if logger.isEnabledFor(logging.INFO):
+        mealNames = [meal.name for meal in mealObjectListInit]
+        logger.info("Extracted meals: \n{}".format(yaml.dump(mealNames)))
 
     return mealObjectListInit
 
@@ -284,7 +351,7 @@ def generateIngredientObjectList(ingredientDict):
                         fat: amount,
                         protein: amount,
                         kcal: amount,
-                        metric: {gram, unit} (optional)
+                        metric: {gram, ml, piece} (optional)
                     },
                 
         Ingredient2 ...
@@ -305,105 +372,12 @@ def generateIngredientObjectList(ingredientDict):
     return ingredientObjectListInit
 
 
-def resolveMealList(mealObjectList):
-    for meal in list(mealObjectList):
-        meal.resolveMacros()
-    return mealObjectList
-
-def applyLowcarbFilter(mealObjectList):
+def outputResults(choosenMealList, groceryObjectList, ingredientObjectList, outputName = resultName):
     """
-    Filters non lowcarb meals from the given list and returns the reduced list.
-    Lowcarb meals have a kcal to carb ratio that exceed the defined treshold.
-    """
-    lowCarbMealObjectList = []
-    filteredMealNames = []
-    for meal in mealObjectList:
-        if meal.kcal / meal.carb > TRESHOLD.LOWCARB:
-            lowCarbMealObjectList.append(meal)
-        else:
-            filteredMealNames.append(meal.name)
-    logger.info("Meals removed by lowcarb filter: \n{}".format(yaml.dump(filteredMealNames)))
-    return lowCarbMealObjectList
-
-
-def applyKetoFilter(mealObjectList):
-    """
-    Filters non keto meals from the given list and returns the reduced list.
-    Lowcarb meals have a kcal to carb ratio that exceed the defined treshold.
-    """
-    ketoMealObjectList = []
-    filteredMealNames = []
-    for meal in mealObjectList:
-        if meal.kcal / meal.carb > TRESHOLD.LOWCARB:
-            ketoMealObjectList.append(meal)
-        else:
-            filteredMealNames.append(meal.name)
-    logger.info("Meals removed by lowcarb filter: \n{}".format(yaml.dump(filteredMealNames)))
-    return ketoMealObjectList
-
-
-def chooseMeals(mealList):
-    """
-    Randomly chooses meals from the given meal list until the target kcal count is reached. 
-    The tolerated kcal deviation in both directions is 200 Kcal. The function tries to meet
-    this requirement.
-    #TODO [FEATURE] Currently, the choosing function is pretty dump. Create some smarter
-                    algorithm that matches the target kcal better
-    #TODO [MNT] This function does too much at once and is pretty dirty overall. Refactor!
-    """
-    postWorkoutMealList, preWorkoutMealList, mealList = separateMeals(mealList)
-
-    mealListCopy = list(mealList)
-    choosenMealList = []
-    targetKcal = args.days * args.kcal
-    currentKcal = 0
-    mealsDuplicated = False
-
-    # add post workout meals
-    for i in range(args.workout):
-        chooseMeal = random.choice(postWorkoutMealList)
-        currentKcal += chooseMeal.kcal
-        choosenMealList.append(chooseMeal)
-
-    # add meals until target kcal is reached
-    while currentKcal < targetKcal - 200:
-        choosenMeal = random.choice(mealListCopy)
-        choosenMealList.append(copy.deepcopy(choosenMeal))
-        currentKcal += choosenMeal.kcal
-        mealListCopy.remove(choosenMeal)
-        if not mealListCopy:
-            mealListCopy = list(mealList)
-            mealsDuplicated = True
-    if currentKcal - targetKcal > 200:
-        choosenMealList = improveChoosenMealList(mealList, choosenMealList)
-
-    if mealsDuplicated:
-        logger.warning("Not enough meals specified to meet the given amounts of days and kcal without repetition")
-
-    # add pre workout meals
-    for i in range(args.workout):
-        print(preWorkoutMealList)
-        chooseMeal = random.choice(preWorkoutMealList)
-        choosenMealList.append(chooseMeal)
-
-    return choosenMealList
-
-
-def generateGroceryList(mealList): 
-    """
-    Generates and returns the final grocery list by looking up and adding the proper amount 
-    of every ingrdient for each chose meal.
-    #TODO [FEATURE] The grocery list currently contains duplicates. Merge those duplicates
-    """
-    groceryList = []
-    for meal in mealList:
-        groceryList.extend(meal.ingredientList)
-    return groceryList
-
-
-def outputResults(choosenMealList, groceryObjectList):
-    """
-    Outputs the generated results
+    Outputs the generated results to every sink selected by the format option. The records are
+    streamed section by section into the sinks. The result files are named after outputName.
+    With the diff option only the changes of the grocery list since the previous run are
+    written, to outputName with the suffix Diff.
     #TODO [FEATURE] Create the option to print output to google docs instead of local file
     """
     resultsDict = {
@@ -417,26 +391,70 @@ def outputResults(choosenMealList, groceryObjectList):
         if meal.watchList:
             watchList.extend(meal.watchList)
 
-    mealNames = [meal.name for meal in choosenMealList]
-    ingredientNameList = [ingredient.name for ingredient in groceryObjectList]
-    amountList = [ingredient.amount for ingredient in groceryObjectList]
-    
-    resultsDict['choosen meals:'] = mealNames
-    for ingredientName, amount in zip(ingredientNameList, amountList):
-        if ingredientName in resultsDict['grocery list:']:
-            resultsDict['grocery list:'][ingredientName] += amount
-        else:
-            resultsDict['grocery list:'][ingredientName] = amount
+    resultsDict['choosen meals:'] = [meal.name for meal in choosenMealList]
+    resultsDict['grocery list:'] = aggregateGroceryList(groceryObjectList, sum(portionFactors.values()) or 1)
+    if portionFactors:
+        resultsDict['portions:'] = {memberName: round(factor, 2) for memberName, factor in portionFactors.items()}
     
     if watchList:
         # delete duplicates
         watchList = list(set(watchList))
         resultsDict['watch list:'] = watchList
 
-    with open(resultPath, 'w+') as fileDeskriptor:
-        yaml.dump(resultsDict, fileDeskriptor, default_flow_style=False)
+    if pantry:
+        resultsDict['grocery list:'] = subtractPantry(resultsDict['grocery list:'], pantry)
+
+    costDict, totalCost, _ = estimateGroceryCost(resultsDict['grocery list:'], ingredientObjectList)
+    if costDict:
+        costDict['total'] = totalCost
+        resultsDict['estimated cost:'] = costDict
+
+    # the snapshot is the base of the next diff, it is read before anything is written
+    snapshotPath = resultDirectory / "{}Snapshot.yaml".format(outputName)
+    if args.diff:
+        previousGroceryDict = readGrocerySnapshot(snapshotPath, resultDirectory / "{}.yaml".format(outputName))
+        groceryDiff = diffGroceryLists(previousGroceryDict, resultsDict['grocery list:'])
+        records = generateDiffRecords(groceryDiff)
+        sinks = getOutputSinks(args.format, resultDirectory, "{}Diff".format(outputName), args.rundir, \
+                               (RESULTSECTION.ADDED, RESULTSECTION.DROPPED, RESULTSECTION.CHANGED))
+    else:
+        records = generateResultRecords(resultsDict)
+        sinks = getOutputSinks(args.format, resultDirectory, outputName, args.rundir, \
+                               (RESULTSECTION.MEALS, RESULTSECTION.GROCERIES, RESULTSECTION.WATCHLIST))
+
+    if resultWriter:
+        resultWriter.submit(writeResults, list(records), sinks, snapshotPath, resultsDict['grocery list:'])
+    else:
+        writeResults(records, sinks, snapshotPath, resultsDict['grocery list:'])
 
-    logger.info(yaml.dump(resultsDict))
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(yaml.dump(resultsDict))
+
+
+def writeResults(records, sinks, snapshotPath, groceryDict):
+    """
+    Writes the records to the sinks and afterwards the grocery snapshot of every run. If a sink
+    fails, the snapshot is kept, so the next diff still compares against the last written list.
+    """
+    writeRecordsToSinks(records, sinks)
+    writeGrocerySnapshot(snapshotPath, groceryDict)
+
+
+def generateResultRecords(resultsDict):
+    """
+    Yields the result records (section, name, amount) grouped by section in the order of the 
+    yaml result file.
+    """
+    for mealName in resultsDict['choosen meals:']:
+        yield (RESULTSECTION.MEALS, mealName, None)
+    for memberName, factor in resultsDict.get('portions:', {}).items():
+        yield (RESULTSECTION.PORTIONS, memberName, factor)
+    for ingredientName in sorted(resultsDict['grocery list:']):
+        yield (RESULTSECTION.GROCERIES, ingredientName, resultsDict['grocery list:'][ingredientName])
+    for watchItem in sorted(resultsDict['watch list:'], key = str):
+        yield (RESULTSECTION.WATCHLIST, watchItem, None)
+    for ingredientName, cost in resultsDict.get('estimated cost:', {}).items():
+        yield (RESULTSECTION.COSTS, ingredientName, cost)
 
 
 ###################################################################################################
@@ -446,14 +464,49 @@ if __name__ == '__main__':
 
     logger.info("*** initialize ***")
     initialize()
+    if args.asyncOutput:
+        resultWriter = backgroundWriter()
+
+    if args.household:
+        logger.info("*** read household members ***")
+        checkConfigFileExist([args.household])
+        members = getHouseholdMembers(readYamlFile(args.household, "Household"))
+        # the plan is chosen for the member with the highest kcal count, everyone else eats less
+        args.kcal = max(member["kcal"] for member in members.values())
+        householdLowcarb, householdKeto = getHouseholdDiet(members)
+        args.keto = args.keto or householdKeto
+        args.lowcarb = args.lowcarb or householdLowcarb
+        portionFactors = getPortionFactors(members, args.kcal)
+        logger.info("Portions per member: \n{}".format(yaml.dump(portionFactors)))
+
+    if args.catalog:
+        logger.info("*** map columnar catalog ***")
+        catalog = columnarCatalog.fromFile(args.catalog)
+        ingredientObjectListInit = catalog.getSharedIngredientObjectList()
+        # the views read the macros from the catalog and create ingredients only for chosen meals
+        mealObjectListInit = catalog.getMealViewList()
+        if not mealObjectListInit:
+            logger.error("No valid meals could be read from the catalog {}. Please check your catalog. Terminating ...".format(args.catalog))
+            sys.exit(1)
+        pantry = convertPantryToMetric(args.have, ingredientObjectListInit)
+        pantryRanking = []
+
+    else:
+        logger.info("*** Read yaml config files ***")
+        mealDict, ingredientDict = readYamlFiles()
 
-    logger.info("*** Read yaml config files ***")
-    mealDict, ingredientDict = readYamlFiles()
+        logger.info("*** create initial meal list ***")
+        ingredientObjectListInit = generateIngredientObjectList(ingredientDict)
+        pantry = convertPantryToMetric(args.have, ingredientObjectListInit)
 
-    logger.info("*** create initial meal list ***")
-    ingredientObjectListInit = generateIngredientObjectList(ingredientDict)
+        logger.info("*** index ingredient usage ***")
+        mealIndex = ingredientIndex(mealDict)
+        pantryRanking = mealIndex.rankByPantry(pantry)
+        if pantry:
+            logger.info("Meals ranked by stock coverage: \n{}".format(yaml.dump(dict(pantryRanking), sort_keys = False)))
 
-    mealObjectListInit = generateMealObjectList(mealDict, ingredientObjectListInit)
+        unitMode = UNITMODE.LEGACY if args.legacyunits else UNITMODE.EXPLICIT
+        mealObjectListInit = generateMealObjectList(mealDict, ingredientObjectListInit, unitMode)
 
     logger.info("*** calculate macro nutrition of each meal ***")
     mealObjectListResolved = resolveMealList(mealObjectListInit)
@@ -467,12 +520,40 @@ if __name__ == '__main__':
     else:
         mealObjectFilteredList = mealObjectListResolved
 
-    logger.info("*** create meal plan  ***")
-    choosenMealList = chooseMeals(mealObjectFilteredList)    
+    history = None if args.nohistory else planHistory(historyPath)
+    if args.alternatives:
+        logger.info("*** sample alternative meal plans  ***")
+        alternativeMealLists = chooseAlternativeMeals(mealObjectFilteredList, args, history)
+        if not alternativeMealLists:
+            logger.error("No meal plan within the tolerance could be sampled. Please check your config files. Terminating ...")
+            sys.exit(1)
+
+        logger.info("*** create grocery lists and generate output ***")
+        for alternativeIndex, choosenMealList in enumerate(alternativeMealLists, start = 1):
+            groceryList = generateGroceryList(choosenMealList)
+            outputResults(choosenMealList, groceryList, ingredientObjectListInit, \
+                          "{}_{}".format(resultName, alternativeIndex))
+
+        # the history only learns plans that are actually cooked, which is unknown here
+        if history:
+            history.close()
+
+    else:
+        logger.info("*** create meal plan  ***")
+        choosenMealList = chooseMeals(mealObjectFilteredList, args, \
+                                      [mealName for mealName, _ in pantryRanking], history, \
+                                      pantry, sum(portionFactors.values()) or 1)
+
+        logger.info("*** create grocery list ***")
+        groceryList = generateGroceryList(choosenMealList)
+
+        logger.info("*** generate output ***")
+        outputResults(choosenMealList, groceryList, ingredientObjectListInit)
 
-    logger.info("*** create grocery list ***")
-    groceryList = generateGroceryList(choosenMealList)
+        if history:
+            history.recordPlan([meal.name for meal in choosenMealList])
+            history.close()
 
-    logger.info("*** generate output ***")
-    outputResults(choosenMealList, groceryList)
+    if resultWriter:
+        resultWriter.close()
 
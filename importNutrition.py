@@ -0,0 +1,144 @@
+###################################################################################################
+#                                Description                                                      #
+#    Imports ingredient nutrition data from a csv export into the ingredient yaml format or      #
+#    directly into a columnar catalog of the meal yaml files. The csv is streamed row by row     #
+#    through an on disk staging database, so memory use does not depend on the input size.      #
+#                                                                                                 #
+###################################################################################################
+
+
+###################################################################################################
+#                                Imports                                                          #
+###################################################################################################
+
+import sys
+import tempfile
+
+from argparse import ArgumentParser
+from pathlib import Path
+
+from Lib.prettyLogger import getPrettyLogger
+from Lib.prettyLogger import LOGMODUS
+from Lib.prettyLogger import FILELOGGING
+
+from Lib.helperFunctions import *
+from Lib.columnarCatalog import writeColumnarCatalog
+from Lib.nutritionImport import DEFAULTCOLUMNS
+from Lib.nutritionImport import getReferencedIngredientNames
+from Lib.nutritionImport import nutritionDatabase
+from Lib.nutritionImport import parseColumnMapping
+from Lib.nutritionImport import registerNutritionImportLogger
+
+from Class.ingredient import UNITMODE
+
+
+###################################################################################################
+#                                Input Arguments                                                  #
+###################################################################################################
+# create parser object
+parser = ArgumentParser()
+
+# define input options
+parser.add_argument('--input', help = 'Csv file with the nutrition data per 100 gram', type = Path, \
+                    required = True)
+parser.add_argument('--columns', help = 'Csv columns of the fields name, kcal, carbs, fat and protein, \
+                    e.g. name=product_name,kcal=energy_kcal_100g. Unmentioned fields use their name', \
+                    type = parseColumnMapping, default = dict(DEFAULTCOLUMNS))
+parser.add_argument('--delimiter', help = 'Field delimiter of the csv file', default = ',')
+parser.add_argument('--decimalcomma', help = 'Numbers use a decimal comma instead of a point', \
+                    action="store_true", default = False)
+parser.add_argument('--format', help = 'Write an ingredient yaml or a columnar catalog of the meals', \
+                    choices = ['yaml', 'catalog'], default = 'yaml')
+parser.add_argument('--output', help = 'Path of the result file', type = Path, default = None)
+parser.add_argument('--legacyunits', help='Treat amounts above 10 as gram and smaller amounts as \
+                    pieces when compiling a catalog', action="store_true", default = False)
+parser.add_argument('--verbose', '-v', help='Show debug information', action="store_true", \
+                     default = False)
+
+# read input
+args = parser.parse_args()
+
+
+###################################################################################################
+#                                   Logger                                                        #
+###################################################################################################
+
+logLevel = LOGMODUS.VERBOSE if args.verbose else LOGMODUS.NORMAL
+logger = getPrettyLogger(Path(__file__).stem, logLevel, FILELOGGING.INACTIVE)
+
+
+###################################################################################################
+#                                Global Variables                                                 #
+###################################################################################################
+
+# Path to ingredient yaml config file, source of the units of the meal amounts
+ingredientDictFile = Path.cwd() / "Config" / "ingredientList.yaml"
+
+# Path to meal list yaml config file
+mealDictFile = Path.cwd() / "Config" / "mealList.yaml"
+
+# Path to pre workout meal yaml config file
+preWorkoutDictFile = Path.cwd() / "Config" / "preWorkout.yaml"
+
+# Path to post workout meal yaml config file
+postWorkoutDictFile = Path.cwd() / "Config" / "postWorkout.yaml"
+
+# Default result file per format
+defaultOutputs = {
+    "yaml": Path.cwd() / "Results" / "importedIngredients.yaml",
+    "catalog": Path.cwd() / "Results" / "catalog.glcat",
+}
+
+
+###################################################################################################
+#                                Driver                                                           #
+###################################################################################################
+if __name__ == '__main__':
+
+    registerLoggers(logger)
+    registerNutritionImportLogger(logger)
+    checkConfigFileExist([args.input])
+    output = args.output or defaultOutputs[args.format]
+    output.parent.mkdir(parents = True, exist_ok = True)
+
+    with tempfile.TemporaryDirectory() as stagingDirectory:
+        database = nutritionDatabase(Path(stagingDirectory) / "nutrition.sqlite")
+
+        logger.info("*** stream csv into staging database ***")
+        database.importCsv(args.input, args.columns, args.delimiter, args.decimalcomma)
+        if not database.getIngredientCount():
+            logger.error("No ingredients could be imported from {}. {} is not replaced. Terminating ...".format(args.input, output))
+            database.close()
+            sys.exit(1)
+
+        if args.format == "yaml":
+            logger.info("*** write ingredient yaml ***")
+            database.writeIngredientYaml(output)
+            logger.info("Wrote {} ingredients to {}".format(database.getIngredientCount(), output))
+
+        else:
+            logger.info("*** Read meal yaml config files ***")
+            checkConfigFileExist([mealDictFile, preWorkoutDictFile, postWorkoutDictFile])
+            mealDict = readYamlFile(mealDictFile, "Meal")
+            taggedPostWorkoutMealDict, taggedPreWorkoutMealDict = tagWorkoutMeals( \
+                readYamlFile(postWorkoutDictFile, "PostWorkout"), readYamlFile(preWorkoutDictFile, "Preworkout"))
+            mealDict.update(taggedPostWorkoutMealDict)
+            mealDict.update(taggedPreWorkoutMealDict)
+
+            # the csv has no units, the meal amounts keep the units of the ingredient yaml
+            unitDict = readYamlFile(ingredientDictFile, "Ingredient") if ingredientDictFile.is_file() else {}
+
+            logger.info("*** export catalog of the referenced ingredients ***")
+            ingredientObjectList = database.getIngredientObjectList(getReferencedIngredientNames(mealDict), unitDict)
+            # meals with ingredients missing in the csv are skipped, a catalog without meals is useless
+            ingredientNames = {ingredientObject.name for ingredientObject in ingredientObjectList}
+            if not any(getReferencedIngredientNames({mealName: mealData}) <= ingredientNames \
+                       for mealName, mealData in mealDict.items()):
+                logger.error("No meal could be exported, {} lacks their ingredients. {} is not replaced. Terminating ..." \
+                             .format(args.input, output))
+                database.close()
+                sys.exit(1)
+            unitMode = UNITMODE.LEGACY if args.legacyunits else UNITMODE.EXPLICIT
+            writeColumnarCatalog(output, mealDict, ingredientObjectList, unitMode)
+
+        database.close()